@@ -7,7 +7,7 @@ try:
 except Exception:
     from watchdog.observers.polling import PollingObserver as _Obs
 
-from scripts import db
+from scripts import db, metrics
 
 ROOT = Path(__file__).resolve().parent
 CONTENT = ROOT / "content"
@@ -27,9 +27,14 @@ IGNORE_EXT = {".tmp", ".part", ".crdownload"}
 VALID_EXT  = {".mp4", ".mov", ".jpg", ".jpeg", ".png"}
 
 PENDING = {}
+SEEN = {}  # path -> epoch seconds of the first event (PENDING is bumped on every write)
 LOCK = threading.Lock()
 DEBOUNCE_SEC = 1.0
 
+METRICS = metrics.Registry("watcher")
+METRICS.track_rate("enqueued_total")
+METRICS.gauge_fn("debounce_backlog", lambda: len(PENDING), "files waiting to settle")
+
 def _detect_client_type(path: Path) -> tuple[str|None, str]:
     try:
         rel = path.resolve().relative_to(CONTENT)
@@ -43,55 +48,75 @@ def _detect_client_type(path: Path) -> tuple[str|None, str]:
         ctype = "reels"
     return client, ctype
 
-def handle_new_file(path: Path):
-    if not path.is_file(): return
+def _job_for_file(path: Path, seen: float | None = None) -> dict | None:
+    if not path.is_file(): return None
     name = path.name.lower()
-    if name in IGNORE_NAMES: return
-    if path.suffix.lower() not in VALID_EXT: return
-    if name.startswith(IGNORE_PREFIX) or path.suffix.lower() in IGNORE_EXT: return
+    if name in IGNORE_NAMES: return None
+    if path.suffix.lower() not in VALID_EXT: return None
+    if name.startswith(IGNORE_PREFIX) or path.suffix.lower() in IGNORE_EXT: return None
 
     client, ctype = _detect_client_type(path)
     if not client:
         log(f"⚠️ Ignoring file outside content/<Client>/<type>/: {path}")
-        return
+        return None
 
-    full = str(path.resolve())
     caption = f"🔥 New drop • {datetime.now():%b %d}\nFollow @VectorManagement"
+    return {"client": client, "path": str(path.resolve()), "content_type": ctype,
+            "caption": caption, "extras": {"source": "watcher", "seen_ms": int((seen or time.time()) * 1000)}}
 
+def handle_new_files(paths: list[Path], seen: dict | None = None):
+    """Enqueue every settled file from one debounce tick in a single transaction."""
+    seen = seen or {}
+    jobs = [j for j in (_job_for_file(p, seen.get(p)) for p in paths) if j]
+    METRICS.inc("files_settled_total", len(paths))
+    if not jobs: return
+    t = time.perf_counter()
     try:
-        db.init_db()
-        existing = db.get_job_by_path(client, full)
-        if existing:
-            log(f"🔁 Duplicate ignored (already in DB status={existing['status']}): {path.name}")
-            return
-
-        job_id = db.add_job(client, full, content_type=ctype, caption=caption, extras={"source":"watcher"})
-        log(f"📦 QUEUED job#{job_id}: {path.name} (client={client}, type={ctype})")
+        inserted, skipped = db.add_jobs(jobs)
+        METRICS.observe("db_call_seconds", time.perf_counter() - t, op="add_jobs")
     except Exception as e:
-        log(f"❌ Failed enqueue {path}: {e}")
+        METRICS.inc("enqueue_errors_total", len(jobs), error=type(e).__name__)
+        log(f"❌ Failed enqueue of {len(jobs)} file(s): {e}")
+        return
+    for j in jobs:
+        key, name = (j["client"], j["path"]), Path(j["path"]).name
+        if key in inserted:
+            METRICS.inc("enqueued_total", client=j["client"], content_type=j["content_type"])
+            log(f"📦 QUEUED job#{inserted[key]}: {name} (client={j['client']}, type={j['content_type']})")
+        elif key in skipped:
+            METRICS.inc("duplicates_total", client=j["client"])
+            log(f"🔁 Duplicate ignored (already in DB job#{skipped[key]}): {name}")
+
+def handle_new_file(path: Path):
+    handle_new_files([path])
 
 class Handler(FileSystemEventHandler):
     def on_created(self, event):
         if event.is_directory: return
         p = Path(event.src_path)
-        with LOCK: PENDING[p] = time.time()
+        with LOCK:
+            PENDING[p] = time.time()
+            SEEN.setdefault(p, PENDING[p])
     def on_modified(self, event):
         if event.is_directory: return
         p = Path(event.src_path)
-        with LOCK: PENDING[p] = time.time()
+        with LOCK:
+            PENDING[p] = time.time()
+            SEEN.setdefault(p, PENDING[p])
 
 def debouncer_loop():
     while True:
         time.sleep(0.5)
         now = time.time()
-        emit = []
+        emit, seen = [], {}
         with LOCK:
             for p, t0 in list(PENDING.items()):
                 if now - t0 >= DEBOUNCE_SEC:
                     emit.append(p)
+                    seen[p] = SEEN.pop(p, t0)
                     del PENDING[p]
-        for p in emit:
-            handle_new_file(p)
+        if emit:
+            handle_new_files(emit, seen)
 
 def main():
     CONTENT.mkdir(parents=True, exist_ok=True)
@@ -99,6 +124,9 @@ def main():
     with open(LOGS / "watcher.pid", "w", encoding="utf-8") as f:
         f.write(str(os.getpid()))
     log("Watcher startup OK.")
+    port = metrics.port_for("watcher", metrics.WATCHER_PORT)
+    if port and metrics.serve(METRICS, port, db):
+        log(f"📈 Metrics on http://127.0.0.1:{port}/metrics")
     observer = _Obs()
     handler = Handler()
     observer.schedule(handler, str(CONTENT), recursive=True)
@@ -28,7 +28,7 @@ def main():
     content = ROOT / "content"
     db.init_db()
     target = {sys.argv[1]} if len(sys.argv) > 1 else None
-    added = skipped = 0
+    jobs = []
 
     for p in content.rglob("*"):
         if not p.is_file(): continue
@@ -36,13 +36,18 @@ def main():
         client, ctype = detect_client_type(p)
         if not client: continue
         if target and client not in target: continue
-        full = str(p.resolve())
-        if db.get_job_by_path(client, full):
-            print(f"SKIP duplicate: {client} {p.name}"); skipped += 1; continue
-        jid = db.add_job(client, full, content_type=ctype, caption="(backfill)", extras={"source":"backfill"})
-        print(f"QUEUED job#{jid}: {p.name} (client={client}, type={ctype})"); added += 1
-
-    print(f"Backfill complete. Queued {added}, skipped {skipped} duplicates.")
+        jobs.append({"client": client, "path": str(p.resolve()), "content_type": ctype,
+                     "caption": "(backfill)", "extras": {"source": "backfill"}})
+
+    inserted, skipped = db.add_jobs(jobs)
+    for j in jobs:
+        key, name = (j["client"], j["path"]), Path(j["path"]).name
+        if key in inserted:
+            print(f"QUEUED job#{inserted[key]}: {name} (client={j['client']}, type={j['content_type']})")
+        else:
+            print(f"SKIP duplicate: {j['client']} {name}")
+
+    print(f"Backfill complete. Queued {len(inserted)}, skipped {len(skipped)} duplicates.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,77 @@
+# scripts/bench_db_conn.py
+# Micro-benchmark: per-call sqlite3.connect() (old db.py) vs the shared, tuned connection.
+# Runs against a throwaway DB in a temp folder; never touches data/autoposter.db.
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PY = PROJECT_ROOT / "scripts" / "db.py"
+
+def load_db(db_file: Path):
+    os.environ["AUTOPOSTER_DB"] = str(db_file)
+    spec = importlib.util.spec_from_file_location("db", DB_PY)
+    db = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, "Failed to prepare db module spec"
+    spec.loader.exec_module(db)  # type: ignore[attr-defined]
+    return db
+
+def legacy_conn(db_file: Path):
+    # What every db.py call used to do
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def run_ops(get_conn, n: int, close: bool) -> float:
+    """Insert, read back and update n rows, one commit per op; returns ops/sec."""
+    now = "2025-01-01T00:00:00+00:00"
+    t0 = time.perf_counter()
+    for i in range(n):
+        c = get_conn()
+        with c:
+            c.execute(
+                "INSERT OR IGNORE INTO jobs (client, path, content_type, caption, eta, status, created_at, extras) "
+                "VALUES (?, ?, 'feed', NULL, ?, 'queued', ?, '{}')",
+                (f"C{i % 4}", f"/bench/{id(get_conn)}/{i}.jpg", now, now),
+            )
+        if close: c.close()
+        c = get_conn()
+        c.execute("SELECT * FROM jobs WHERE status='queued' AND client=? LIMIT 1", (f"C{i % 4}",)).fetchone()
+        if close: c.close()
+        c = get_conn()
+        with c:
+            c.execute("UPDATE jobs SET status='done' WHERE client=? AND path=?", (f"C{i % 4}", f"/bench/{id(get_conn)}/{i}.jpg"))
+        if close: c.close()
+    return (3 * n) / (time.perf_counter() - t0)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare per-call connections with the shared tuned connection.")
+    ap.add_argument("-n", type=int, default=2000, help="iterations (each = insert + select + update)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / "bench.db"
+        db = load_db(db_file)
+        db.init_db()
+
+        # Legacy first so it runs on a rollback-journal DB, like the old code did
+        db.close_all()
+        c = sqlite3.connect(db_file); c.execute("PRAGMA journal_mode=DELETE"); c.close()
+        legacy = run_ops(lambda: legacy_conn(db_file), args.n, close=True)
+
+        shared = run_ops(db._conn, args.n, close=False)
+        db.close_all()
+
+    print(f"[bench] iterations={args.n} (3 ops each)")
+    print(f"[bench] per-call connect : {legacy:10.0f} ops/sec")
+    print(f"[bench] shared + WAL     : {shared:10.0f} ops/sec")
+    print(f"[bench] speedup          : {shared / legacy:10.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# scripts/bench_group_commit.py
+# Status writes/sec (mark_in_progress + reschedule + mark_done) for each db.WRITE_MODE.
+# Runs against a throwaway DB in a temp folder; never touches data/autoposter.db.
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PY = PROJECT_ROOT / "scripts" / "db.py"
+
+def load_db(db_file: Path, full_sync: bool):
+    os.environ["AUTOPOSTER_DB"] = str(db_file)
+    spec = importlib.util.spec_from_file_location("db", DB_PY)
+    db = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, "Failed to prepare db module spec"
+    spec.loader.exec_module(db)  # type: ignore[attr-defined]
+    if full_sync:  # fsync on every commit, like a rollback-journal DB
+        db.PRAGMAS = tuple(p.replace("synchronous=NORMAL", "synchronous=FULL") for p in db.PRAGMAS)
+    return db
+
+def run(mode: str, n: int, threads: int, full_sync: bool) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = load_db(Path(tmp) / "bench.db", full_sync)
+        db.init_db()
+        now = db._now_ms()
+        ids = list(db.add_jobs(
+            {"client": f"Client{i % 10}", "path": f"/bench/{i}.jpg", "content_type": "stories", "eta": now}
+            for i in range(n)
+        )[0].values())
+        db.set_write_mode(mode)
+
+        def worker(part):
+            for job_id in part:
+                db.mark_in_progress(job_id)
+                db.reschedule(job_id, now + 60_000, "bench")
+                db.mark_done(job_id)
+
+        parts = [ids[i::threads] for i in range(threads)]
+        t0 = time.perf_counter()
+        ts = [threading.Thread(target=worker, args=(p,)) for p in parts]
+        for t in ts: t.start()
+        for t in ts: t.join()
+        db.flush()
+        elapsed = time.perf_counter() - t0
+        commits = db._writer.commits if db._writer else 3 * n
+        done = db._conn().execute("SELECT COUNT(*) FROM jobs WHERE status='done'").fetchone()[0]
+        assert done == n, f"{mode}: only {done}/{n} jobs done"
+        db.close_all()
+    return 3 * n / elapsed, commits
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Status writes/sec with and without the group-commit writer.")
+    ap.add_argument("-n", type=int, default=3000, help="jobs (3 status writes each)")
+    ap.add_argument("--threads", type=int, default=4, help="concurrent callers for the threaded runs")
+    ap.add_argument("--full-sync", action="store_true", help="PRAGMA synchronous=FULL (fsync every commit)")
+    args = ap.parse_args()
+
+    print(f"[bench] jobs={args.n} writes={3 * args.n} synchronous={'FULL' if args.full_sync else 'NORMAL'}")
+    base = None
+    for mode, threads in (("sync", 1), ("sync", args.threads), ("group", 1), ("group", args.threads),
+                          ("async", 1), ("async", args.threads)):
+        rate, commits = run(mode, args.n, threads, args.full_sync)
+        base = base or rate
+        print(f"[bench] {mode:<5} x{threads:<2} : {rate:10.0f} writes/sec  {commits:6d} commits  {rate / base:6.2f}x")
+
+if __name__ == "__main__":
+    main()
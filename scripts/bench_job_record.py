@@ -0,0 +1,97 @@
+# scripts/bench_job_record.py
+# Memory and end-to-end cost (fetch + field access) of scanning N jobs as sqlite3.Row,
+# dict, or db.Job.
+# Runs against a throwaway DB in a temp folder; never touches data/autoposter.db.
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PY = PROJECT_ROOT / "scripts" / "db.py"
+
+def load_db(db_file: Path):
+    os.environ["AUTOPOSTER_DB"] = str(db_file)
+    spec = importlib.util.spec_from_file_location("db", DB_PY)
+    db = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, "Failed to prepare db module spec"
+    spec.loader.exec_module(db)  # type: ignore[attr-defined]
+    return db
+
+def fill(db, n: int) -> None:
+    db.init_db()
+    now = db._now_ms()
+    db.add_jobs(
+        {"client": f"Client{i % 10}", "path": f"/bench/{i}.jpg", "content_type": "feed",
+         "caption": f"caption {i}", "eta": now - i, "extras": {"source": "bench", "i": i}}
+        for i in range(n)
+    )
+
+def measure(kinds: dict, repeat: int) -> None:
+    # median of `repeat` rounds, the kinds interleaved in each round so drift (page cache,
+    # CPU clocks) doesn't favour whichever runs first; they are within a few % of each other
+    runs: dict = {label: [] for label in kinds}
+    for _ in range(repeat):
+        for label, (fetch, access) in kinds.items():
+            gc.collect()
+            t0 = time.perf_counter()
+            rows = fetch()
+            t1 = time.perf_counter()
+            access(rows)
+            runs[label].append((t1 - t0, time.perf_counter() - t1))
+            del rows
+    for label, (fetch, access) in kinds.items():
+        t_fetch = sorted(r[0] for r in runs[label])[repeat // 2]
+        t_access = sorted(r[1] for r in runs[label])[repeat // 2]
+        gc.collect()
+        # one more pass under tracemalloc, which would distort the timings above
+        tracemalloc.start()
+        rows = fetch()
+        mem, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:<12} rows={len(rows):>7}  held={mem / 1e6:7.1f} MB  fetch={t_fetch * 1000:7.1f} ms  "
+              f"access={t_access * 1000:6.1f} ms  total={(t_fetch + t_access) * 1000:7.1f} ms  (check={access(rows)})")
+        del rows
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare sqlite3.Row / dict / Job for a large scan.")
+    ap.add_argument("-n", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=7)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = load_db(Path(tmp) / "bench.db")
+        fill(db, args.n)
+        sql, params = db.DUE_SQL, db.due_params(db._now_ms(), args.n)
+        c = db._conn()
+
+        def fetch_row():
+            return c.execute(sql, params).fetchall()
+
+        def fetch_dict():
+            return [dict(r) for r in c.execute(sql, params)]
+
+        def fetch_job():
+            return db._jobs(c, sql, params)
+
+        # the runner's per-job field reads: by key on rows/dicts, as attributes on Job
+        def access_mapping(rows):
+            return sum(r["id"] + len(r["client"]) + len(r["path"]) + len(r["content_type"]) + r["eta_ms"] % 7 for r in rows)
+
+        def access_job(rows):
+            return sum(j.id + len(j.client) + len(j.path) + len(j.content_type) + j.eta_ms % 7 for j in rows)
+
+        print(f"[bench] scanning {args.n} queued jobs")
+        measure({"sqlite3.Row": (fetch_row, access_mapping), "dict": (fetch_dict, access_mapping),
+                 "Job": (fetch_job, access_job)}, args.repeat)
+        db.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# scripts/bench_runner.py
+# End-to-end runner benchmark: the real daemon loop, fair scheduler, upload pool, rate
+# limiter and DB writes, with the uploader swapped for
+#   fake  sleeps for a per-type latency (log-normal around LATENCY_MS), fails at a given rate
+#   http  uploaders.HttpUploader against scripts/fake_ig_server.py started in-process:
+#         real files, chunked HTTP, the server's latency / 429s / 5xx
+# Everything lives in a temp folder (DB, config/, media); data/ and config/ are not touched.
+#   python scripts/bench_runner.py                          -> drain 2000 due jobs, 10 clients
+#   python scripts/bench_runner.py --eta uniform --span 20  -> arrivals spread over 20s
+#   python scripts/bench_runner.py --uploader http --media-kb 2048
+#   python scripts/bench_runner.py --json > before.json     -> compare across commits
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import importlib.util
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# median fake upload time per type (ms), and the share of jobs
+LATENCY_MS = {"stories": 20, "feed": 40, "weekly": 40, "reels": 250}
+MIX = {"stories": 5, "feed": 3, "weekly": 1, "reels": 1}
+ETA_SHAPES = ("now", "uniform", "burst")
+
+# db / limiter calls the runner makes; their wall time is "DB time"
+DB_CALLS = ("claim_due_jobs", "renew_lease", "mark_upload_started", "mark_done", "fail_job",
+            "reschedule_many", "upcoming_etas", "data_version")
+
+def load_mod(name: str):
+    spec = importlib.util.spec_from_file_location(name, PROJECT_ROOT / "scripts" / f"{name}.py")
+    mod = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, f"Failed to prepare {name} module spec"
+    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    return mod
+
+def load_runner(db_file: Path):
+    os.environ["AUTOPOSTER_DB"] = str(db_file)
+    return load_mod("queue_runner")
+
+class Timers:
+    """Wall time per wrapped call, summed over every thread."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sec: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+
+    def wrap(self, owner, name: str, label: str | None = None) -> None:
+        fn = getattr(owner, name)
+        label = label or name
+
+        def timed(*a, **kw):
+            t = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                with self.lock:
+                    self.sec[label] += time.perf_counter() - t
+                    self.calls[label] += 1
+        setattr(owner, name, timed)
+
+class FakeUploader:
+    name = "fake"
+
+    def __init__(self, scale: float, errors: float, permanent: float, seed: int):
+        self.scale, self.errors, self.permanent = scale, errors, permanent
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sec = 0.0
+        self.calls = 0
+
+    def upload(self, kind: str, client: str, path: str, caption: str | None) -> bool:
+        with self.lock:  # random.Random is not thread-safe
+            seconds = self.rnd.lognormvariate(0, 0.5) * LATENCY_MS[kind] * self.scale / 1000
+            roll = self.rnd.random()
+        time.sleep(seconds)
+        with self.lock:
+            self.sec += seconds
+            self.calls += 1
+        if roll < self.permanent:
+            raise ValueError("unsupported media (fake)")
+        if roll < self.permanent + self.errors:
+            raise ConnectionError("503 from fake uploader")
+        return True
+
+    def close(self) -> None:
+        pass
+
+class TimedUploader:
+    """Wall time spent inside another uploader's upload() (HTTP round trips, server sleeps)."""
+    def __init__(self, inner):
+        self.inner, self.name = inner, inner.name
+        self.lock = threading.Lock()
+        self.sec = 0.0
+        self.calls = 0
+
+    def upload(self, kind, client, path, caption):
+        t = time.perf_counter()
+        try:
+            return self.inner.upload(kind, client, path, caption)
+        finally:
+            with self.lock:
+                self.sec += time.perf_counter() - t
+                self.calls += 1
+
+    def close(self) -> None:
+        self.inner.close()
+
+def make_config(root: Path, clients: int) -> list[str]:
+    names = [f"Bench{i}" for i in range(clients)]
+    (root / "schedule.json").parent.mkdir(parents=True, exist_ok=True)
+    (root / "schedule.json").write_text(json.dumps({"timezone": "UTC"}), encoding="utf-8")
+    for n in names:
+        d = root / "clients" / n
+        d.mkdir(parents=True)
+        (d / "client.json").write_text(json.dumps({"weight": 1}), encoding="utf-8")
+    return names
+
+def make_media(root: Path, kb: int) -> dict[str, Path]:
+    # one real file per kind, hard-linked per job: (client, path) must be unique, the bytes needn't be
+    root.mkdir()
+    src = {}
+    for kind in MIX:
+        src[kind] = root / f"src_{kind}.{'mp4' if kind == 'reels' else 'jpg'}"
+        head = b"\x00\x00\x00\x18ftypmp42" if kind == "reels" else b"\xff\xd8\xff\xe0"  # passes prefetch's checks
+        src[kind].write_bytes(head + os.urandom(kb * 1024 * (8 if kind == "reels" else 1) - len(head)))
+    return src
+
+def make_jobs(names: list[str], n: int, shape: str, span_ms: int, t0: int, seed: int, media: dict | None = None):
+    rnd = random.Random(seed)
+    kinds = [k for k, w in MIX.items() for _ in range(w)]
+    for i in range(n):
+        if shape == "now":
+            off = 0
+        elif shape == "uniform":
+            off = rnd.randrange(span_ms + 1)
+        else:  # burst: three posting slots, everything lands on one of them
+            off = rnd.choice((0, span_ms // 2, span_ms))
+        kind = rnd.choice(kinds)
+        path = f"/bench/{i}.jpg"
+        if media:
+            path = str(media[kind].with_name(f"{i}{media[kind].suffix}"))
+            os.link(media[kind], path)
+        yield {"client": rnd.choice(names), "path": path, "content_type": kind,
+               "eta": t0 + off, "extras": {"source": "bench"}}
+
+def pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)  # bytes on macOS, KB on Linux
+
+def git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def bench(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = load_runner(Path(tmp) / "bench.db")
+        db = runner.db
+        db.set_write_mode(args.write_mode)
+        # a throwaway config/: no quotas or posting windows, so only the runner is measured
+        names = make_config(Path(tmp) / "config", args.clients)
+        db.config_service.CONFIG = runner.CONFIG = db.config_service.ConfigService(Path(tmp) / "config")
+        db.init_db()
+
+        media = make_media(Path(tmp) / "media", args.media_kb) if args.uploader == "http" else None
+        t0 = db._now_ms() + 200
+        db.add_jobs(make_jobs(names, args.jobs, args.eta, int(args.span * 1000), t0, args.seed, media))
+        db.flush()
+        t0 = max(t0, db._now_ms())  # hard-linking thousands of files can take longer than the lead
+
+        timers = Timers()
+        for name in DB_CALLS:
+            timers.wrap(db, name)
+        timers.wrap(runner.LIMITER, "acquire", "ratelimit.acquire")
+        server = ig = None
+        if args.uploader == "http":
+            server, ig = load_mod("fake_ig_server").start(
+                latency_ms=args.ig_latency_ms, bandwidth_mbps=args.ig_mbps, configure_scale=args.latency_scale,
+                fail=args.errors, posts_per_min=args.ig_posts_per_min, max_parallel=args.per_account, seed=args.seed)
+            uploader = TimedUploader(runner.uploaders.HttpUploader(f"http://127.0.0.1:{server.server_address[1]}"))
+        else:
+            uploader = FakeUploader(args.latency_scale, args.errors, args.permanent, args.seed)
+        runner.UPLOADER = uploader
+        if args.prefetch_window:
+            runner.PREFETCH = runner.prefetch.Prefetcher(db, runner.discover_clients, args.prefetch_window,
+                                                         args.prefetch_jobs, args.prefetch_mb).start()
+
+        ns = argparse.Namespace(client=None, clients=None, shard=None, batch=args.batch, dry_run=False,
+                                lookahead=args.lookahead, resync=args.resync)
+        pool = runner.UploadPool(args.workers, args.per_account)
+        sched = runner.DeficitRoundRobin()
+        owner = "bench:runner"
+        conn = db._conn()
+
+        def run() -> int:
+            cfgs = {c: runner.load_client_config(c) for c in runner.discover_clients()}
+            sched.set_weights({c: cfg.weight for c, cfg in cfgs.items()})
+            return runner.run_fair(conn, ns, cfgs, sched, pool, owner, args.jobs)
+
+        stop = threading.Event()
+        log = io.StringIO()  # the runner's per-job prints would dominate the timing
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            loop = threading.Thread(target=runner.daemon, args=(ns, run, stop), name="daemon")
+            loop.start()
+            # finished: nothing in flight and no first-attempt job left queued (retries are
+            # scheduled a minute or more out and are reported, not waited for)
+            watch = db._open()
+            deadline = time.monotonic() + args.timeout
+            while time.monotonic() < deadline:
+                left = watch.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status='in_progress' OR (status='queued' AND attempts=0)"
+                ).fetchone()[0]
+                if not left:
+                    break
+                time.sleep(0.05)
+            stop.set()
+            loop.join()
+            pool.close()
+            if runner.PREFETCH:
+                runner.PREFETCH.stop()
+            db.flush()
+        wall = time.perf_counter() - started
+        watch.close()
+        uploader.close()
+        if server:
+            server.shutdown()
+            server.server_close()
+
+        c = db._conn()
+        counts = dict(c.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        retrying = c.execute("SELECT COUNT(*) FROM jobs WHERE status='queued' AND attempts>0").fetchone()[0]
+        lat = [r[0] for r in c.execute("SELECT posted_ms - eta_ms FROM jobs WHERE status='done'")]
+        first, last = c.execute("SELECT MIN(eta_ms), MAX(posted_ms) FROM jobs WHERE status='done'").fetchone()
+        db.close_all()
+
+    done = counts.get("done", 0)
+    active = max((last - first) / 1000, 1e-9) if done else 0.0
+    return {
+        "commit": git_rev(),
+        "params": {k: getattr(args, k) for k in ("uploader", "clients", "jobs", "eta", "span", "workers", "per_account",
+                                                 "batch", "write_mode", "latency_scale", "errors", "permanent",
+                                                 "media_kb", "ig_latency_ms", "ig_mbps", "ig_posts_per_min",
+                                                 "prefetch_window")},
+        "done": done,
+        "failed": counts.get("failed", 0),
+        "retrying": retrying,
+        "unfinished": args.jobs - done - counts.get("failed", 0) - retrying,
+        "wall_sec": round(wall, 3),
+        "jobs_per_sec": round(done / active, 1) if done else 0.0,
+        "eta_to_done_ms": {"p50": pct(lat, 50), "p95": pct(lat, 95), "p99": pct(lat, 99), "max": max(lat, default=0)},
+        "upload_sec": round(uploader.sec, 3),
+        "db_sec": round(sum(timers.sec.values()), 3),
+        "db_calls": {k: {"calls": timers.calls[k], "sec": round(v, 3)} for k, v in sorted(timers.sec.items())},
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None,
+        "runner_errors": log.getvalue().count("crashed"),
+        "server": dict(ig.stats) if ig else None,
+        "prefetch": runner.PREFETCH.stats() if runner.PREFETCH else None,
+    }
+
+def print_text(r: dict) -> None:
+    p = r["params"]
+    print(f"[bench] {p['jobs']} jobs / {p['clients']} clients, uploader={p['uploader']}, eta={p['eta']} span={p['span']}s, "
+          f"workers={p['workers']} per_account={p['per_account']} batch={p['batch']} write_mode={p['write_mode']}"
+          f"  (commit {r['commit'] or '?'})")
+    print(f"[bench] done={r['done']} failed={r['failed']} retrying={r['retrying']} unfinished={r['unfinished']}"
+          f"  wall={r['wall_sec']}s  throughput={r['jobs_per_sec']} jobs/s")
+    lat = r["eta_to_done_ms"]
+    print(f"[bench] eta->done ms  p50={lat['p50']}  p95={lat['p95']}  p99={lat['p99']}  max={lat['max']}")
+    # upload time is summed over parallel workers, DB time over every thread that called in
+    print(f"[bench] upload time {r['upload_sec']}s (sum over workers)  db time {r['db_sec']}s")
+    for name, d in r["db_calls"].items():
+        per = d["sec"] / d["calls"] * 1000 if d["calls"] else 0
+        print(f"[bench]   {name:<22} {d['calls']:6d} calls  {d['sec']:7.3f}s  {per:6.2f} ms/call")
+    print(f"[bench] peak RSS {r['peak_rss_mb'] if r['peak_rss_mb'] is not None else 'n/a'} MB"
+          + (f"  runner errors: {r['runner_errors']}" if r["runner_errors"] else ""))
+    if r["server"]:
+        print(f"[bench] fake IG server: {r['server']}")
+    if r["prefetch"]:
+        print(f"[bench] prefetch: {r['prefetch']['hits']} hits, {r['prefetch']['misses']} misses")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Runner throughput/latency with a fake uploader, on a temp DB.")
+    ap.add_argument("--uploader", choices=("fake", "http"), default="fake")
+    ap.add_argument("--clients", type=int, default=10)
+    ap.add_argument("--jobs", type=int, default=2000)
+    ap.add_argument("--eta", choices=ETA_SHAPES, default="now", help="now = backlog drain; uniform/burst over --span")
+    ap.add_argument("--span", type=float, default=10.0, help="seconds the ETAs are spread over")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--per-account", type=int, default=1)
+    ap.add_argument("--batch", type=int, default=5)
+    ap.add_argument("--write-mode", default="group", help="db.WRITE_MODES")
+    ap.add_argument("--latency-scale", type=float, default=1.0, help="multiplies LATENCY_MS (http: the server's CONFIGURE_MS)")
+    ap.add_argument("--errors", type=float, default=0.02, help="share of uploads failing transiently (http: server 5xx rate)")
+    ap.add_argument("--permanent", type=float, default=0.005, help="share failing permanently (dead-lettered; fake only)")
+    ap.add_argument("--media-kb", type=int, default=256, help="--uploader http: photo size (reels 8x)")
+    ap.add_argument("--ig-latency-ms", type=float, default=5, help="--uploader http: server per-request latency")
+    ap.add_argument("--ig-mbps", type=float, default=200, help="--uploader http: server bandwidth per stream")
+    ap.add_argument("--ig-posts-per-min", type=float, default=0, help="--uploader http: server post limit per account")
+    ap.add_argument("--prefetch-window", type=float, default=0, help="--uploader http: runner prefetch look-ahead (s); 0 = off")
+    ap.add_argument("--prefetch-jobs", type=int, default=16)
+    ap.add_argument("--prefetch-mb", type=float, default=256)
+    ap.add_argument("--resync", type=float, default=0.05, help="daemon change-check interval (s)")
+    ap.add_argument("--lookahead", type=int, default=256)
+    ap.add_argument("--timeout", type=float, default=600, help="give up after this many seconds")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--json", action="store_true", help="one JSON object on stdout")
+    args = ap.parse_args()
+    if args.prefetch_window and args.uploader != "http":
+        ap.error("--prefetch-window needs --uploader http (the fake uploader has no media files)")
+
+    r = bench(args)
+    if args.json:
+        print(json.dumps(r, indent=2))
+    else:
+        print_text(r)
+
+if __name__ == "__main__":
+    main()
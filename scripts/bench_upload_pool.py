@@ -0,0 +1,96 @@
+# scripts/bench_upload_pool.py
+# Upload throughput: the old one-at-a-time loop vs UploadPool, with a fake uploader
+# that sleeps for realistic per-type latencies (scaled down by --scale). Also checks
+# that no account ever has more than --per-account uploads in flight.
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+import importlib.util
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+spec = importlib.util.spec_from_file_location("upload_pool", PROJECT_ROOT / "scripts" / "upload_pool.py")
+upload_pool = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare upload_pool module spec"
+spec.loader.exec_module(upload_pool)  # type: ignore[attr-defined]
+
+# seconds at scale 1: (min, max) as seen from a home connection
+LATENCY = {"stories": (1.5, 4.0), "feed": (3.0, 8.0), "reels": (45.0, 120.0)}
+MIX = {"stories": 6, "feed": 3, "reels": 1}
+
+class FakeUploader:
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.active: dict[str, int] = defaultdict(int)
+        self.peak: dict[str, int] = defaultdict(int)
+
+    def upload(self, account: str, kind: str, seconds: float) -> None:
+        with self.lock:
+            self.active[account] += 1
+            self.peak[account] = max(self.peak[account], self.active[account])
+        time.sleep(seconds * self.scale)
+        with self.lock:
+            self.active[account] -= 1
+
+def make_jobs(accounts: int, per_account: int, seed: int) -> list[tuple[str, str, float]]:
+    rnd = random.Random(seed)
+    kinds = [k for k, n in MIX.items() for _ in range(n)]
+    jobs = []
+    for i in range(per_account):
+        for a in range(accounts):
+            kind = rnd.choice(kinds)
+            jobs.append((f"Account{a}", kind, rnd.uniform(*LATENCY[kind])))
+    return jobs
+
+def pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def run(jobs, workers: int | None, per_account: int, scale: float):
+    up = FakeUploader(scale)
+    waits: dict[str, list[float]] = defaultdict(list)
+    t0 = time.perf_counter()
+
+    def one(account, kind, seconds, queued_at):
+        up.upload(account, kind, seconds)
+        waits[kind].append(time.perf_counter() - queued_at)
+
+    if workers is None:  # the old loop
+        for job in jobs:
+            one(*job, t0)
+    else:
+        pool = upload_pool.UploadPool(workers, per_account)
+        for account, kind, seconds in jobs:
+            pool.submit(account, one, account, kind, seconds, t0)
+        pool.close()
+    return time.perf_counter() - t0, waits, max(up.peak.values())
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serial uploads vs UploadPool with a fake uploader.")
+    ap.add_argument("--accounts", type=int, default=6)
+    ap.add_argument("--jobs", type=int, default=10, help="jobs per account")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    ap.add_argument("--per-account", type=int, default=1)
+    ap.add_argument("--scale", type=float, default=0.005, help="fraction of real latency to sleep")
+    args = ap.parse_args()
+
+    jobs = make_jobs(args.accounts, args.jobs, seed=7)
+    print(f"[bench] {len(jobs)} uploads over {args.accounts} accounts, latency scale {args.scale}")
+    base = None
+    for workers in [None, *args.workers]:
+        elapsed, waits, peak = run(jobs, workers, args.per_account, args.scale)
+        base = base or elapsed
+        label = "serial" if workers is None else f"pool x{workers}"
+        stories = waits["stories"]
+        print(f"[bench] {label:<9}: {len(jobs) / elapsed:8.1f} jobs/s  {base / elapsed:5.2f}x  "
+              f"story done p50={pct(stories, 50):.2f}s p95={pct(stories, 95):.2f}s  peak/account={peak}")
+        assert peak <= args.per_account, f"{label}: {peak} uploads in flight for one account"
+
+if __name__ == "__main__":
+    main()
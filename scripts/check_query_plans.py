@@ -0,0 +1,111 @@
+# scripts/check_query_plans.py
+# Builds a large synthetic jobs table in a temp folder and runs EXPLAIN QUERY PLAN on every
+# hot query. Exits 1 if any of them falls back to a full scan of the jobs table.
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = PROJECT_ROOT / "scripts"
+
+def load_mod(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, f"Failed to prepare {name} module spec"
+    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    return mod
+
+# "SCAN jobs" on its own is a full table scan; "SCAN jobs USING COVERING INDEX ..." is not.
+FULL_SCAN = re.compile(r"\bSCAN (jobs|quota_usage|latency_hist)\b(?! USING)")
+
+def build(db, rows: int, clients: int) -> None:
+    db.init_db()
+    now = db._now_ms()
+    kinds = ("feed", "reels", "stories", "weekly")
+    rnd = random.Random(42)
+    minute = 60_000
+
+    def gen():
+        for i in range(rows):
+            created = now - rnd.randint(0, 60 * 24 * 365) * minute
+            status = rnd.choices(("done", "queued", "in_progress"), weights=(90, 9, 1))[0]
+            eta = created + rnd.randint(0, 48 * 60) * minute
+            posted = eta + rnd.randint(1, 600) * 1000 if status == "done" else None
+            lease = now + 5 * minute if status == "in_progress" else None
+            kind = rnd.choice(kinds)
+            yield (f"Client{i % clients}", f"/synthetic/{i}.jpg", kind, db.ms_to_iso(eta), eta,
+                   status, db.ms_to_iso(created), created, db.ms_to_iso(posted), posted, lease,
+                   db.PRIORITY_DEFAULTS[kind])
+
+    c = db._conn()
+    with c:
+        c.executemany(
+            "INSERT INTO jobs (client, path, content_type, eta, eta_ms, status, created_at, created_ms, "
+            "posted_at, posted_ms, lease_expires_ms, priority) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            gen(),
+        )
+    c.execute("ANALYZE")
+
+def hot_queries(db, health, metrics) -> dict[str, tuple[str, tuple]]:
+    now = db._now_ms()
+    today = datetime.now(timezone.utc).date().isoformat()
+    return {
+        "due (all clients)": (db.DUE_SQL, db.due_params(now, 50)),
+        "due (one client)": (db.DUE_CLIENT_SQL, db.due_params(now, 50, "Client3")),
+        "claim": (db._claim_sql(True), ("bench", now, now, *db.due_params(now, 5, "Client3"))),
+        "upcoming etas (all clients)": (db.UPCOMING_SQL, (256,)),
+        "upcoming etas (one client)": (db.UPCOMING_CLIENT_SQL, ("Client3", 256)),
+        "bulk reschedule (client, type)": (db.RESCHEDULE_SCOPE_SQL.format(scope=" AND client=? AND content_type=?"),
+                                           ("", now, "quota", now, "Client3", "feed")),
+        "bulk reschedule (all clients)": (db.RESCHEDULE_SCOPE_SQL.format(scope=""), ("", now, "egress", now)),
+        "release expired leases": (db.RELEASE_EXPIRED_SQL, (now,)),
+        "hold expired leases (maybe posted)": (db.HOLD_EXPIRED_SQL, (now,)),
+        "adopt unleased in_progress": (db.ADOPT_UNLEASED_SQL, (now,)),
+        "heartbeat lease renewal": (db.RENEW_OWNED_SQL, (now, "bench")),
+        "quota used today": (db.QUOTA_SQL, ("Client3", "feed", today)),
+        "get_job_by_path": ("SELECT * FROM jobs WHERE client=? AND path=? LIMIT 1", ("Client3", "/synthetic/3.jpg")),
+        "health_report recent": (health.RECENT_SQL, (now, now)),
+        "latency histograms (24h)": (db.LATENCY_SQL, (now - 86_400_000,)),
+        "metrics queue depth": (metrics.QUEUE_DEPTH_SQL, ("queued",)),
+    }
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Fail if any hot jobs query does a full table scan.")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--clients", type=int, default=25)
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["AUTOPOSTER_DB"] = str(Path(tmp) / "plans.db")
+        db = load_mod("db", SCRIPTS / "db.py")
+        health = load_mod("health_report", SCRIPTS / "health_report.py")
+        metrics = load_mod("metrics", SCRIPTS / "metrics.py")
+        print(f"[plans] building synthetic DB ({args.rows} rows, {args.clients} clients)...")
+        build(db, args.rows, args.clients)
+
+        c = db._conn()
+        failures = 0
+        for name, (sql, params) in hot_queries(db, health, metrics).items():
+            plan = [r["detail"] for r in c.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+            bad = [p for p in plan if FULL_SCAN.search(p)]
+            failures += bool(bad)
+            print(f"[plans] {'FAIL' if bad else 'ok  '} {name}")
+            if bad or args.verbose:
+                for p in plan:
+                    print(f"         {p}")
+        db.close_all()
+
+    print(f"[plans] {'all hot queries use indexes' if not failures else f'{failures} query(s) do a full table scan'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,9 +20,9 @@ def main(client: str = "Luchiano") -> None:
     # Find rows that have a non-empty error field
     rows = conn.execute(
         """
-        SELECT id, extras, error
+        SELECT id, extras, last_error
         FROM jobs
-        WHERE client = ? AND error IS NOT NULL AND error <> ''
+        WHERE client = ? AND last_error IS NOT NULL AND last_error <> ''
         """,
         (client,),
     ).fetchall() or []
@@ -40,13 +40,12 @@ def main(client: str = "Luchiano") -> None:
         except Exception:
             extras = {"_raw": extras_raw}
         # Preserve the old error inside extras
-        extras["error_note"] = r["error"]
-        extras["source"] = "demo-clean"
+        extras["error_note"] = r["last_error"]
 
         conn.execute(
             """
             UPDATE jobs
-            SET status='done', error=NULL, extras=?
+            SET status='done', last_error=NULL, source='demo-clean', extras=?
             WHERE id = ?
             """,
             (json.dumps(extras, ensure_ascii=False), jid),
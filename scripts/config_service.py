@@ -0,0 +1,251 @@
+# scripts/config_service.py
+# One in-memory view of config/: schedule.json, clients.json, client_limits.json and
+# every config/clients/<Client>/client.json, merged into typed objects.
+#   - each file is parsed once and re-parsed only when its mtime/size changes
+#   - files are stat'ed at most once per CHECK_SEC, so hot paths never touch the disk
+#   - the historical schemas are merged here, in one place:
+#       per-type day quota : quotas.<type>_per_day  >  max_per_day.<type>
+#       account 24h total  : rate.per_24h  >  daily_quota  >  client_limits.json (entry, or
+#                            default_daily_quota for clients without per-type quotas)
+#       timezone           : hours.timezone  >  schedule.json timezone  >  UTC
+#       posting hours      : hours_24  >  schedule.json best_times
+# Problems (bad numbers, unparsable JSON) are printed once per file version, not raised.
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time as _time
+from datetime import time, timezone, tzinfo
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = ROOT / "config"
+CLIENTS_DIR = CONFIG_DIR / "clients"
+CHECK_SEC = 1.0
+
+CONTENT_TYPES = ("feed", "reels", "stories", "weekly")
+DEFAULT_HOURS = [11, 15, 19]
+
+def _pos_int(v) -> Optional[int]:
+    try:
+        v = int(v)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+def _pos_float(v) -> Optional[float]:
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+def _hhmm(value) -> Optional[time]:
+    try:
+        h, m = str(value).split(":")[:2]
+        return time(int(h), int(m))
+    except (TypeError, ValueError):
+        return None
+
+def _hours(value) -> list[int]:
+    if not isinstance(value, list):
+        return []
+    return sorted({int(h) for h in value if isinstance(h, int) and 0 <= h <= 23})
+
+_ZONES: Dict[str, tzinfo] = {}
+
+def _zone(name: str | None) -> tzinfo:
+    if not name:
+        return timezone.utc
+    if name not in _ZONES:
+        try:
+            from zoneinfo import ZoneInfo
+            _ZONES[name] = ZoneInfo(name)
+        except Exception:
+            _ZONES[name] = timezone.utc  # no tzdata (Windows without the tzdata package)
+    return _ZONES[name]
+
+# ----- typed model
+class ScheduleConfig:
+    __slots__ = ("timezone", "tz", "best_times", "egress", "safe_mode", "raw")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self.timezone: Optional[str] = raw.get("timezone")
+        self.tz = _zone(self.timezone)
+        self.best_times: Dict[str, Any] = raw.get("best_times") or {}
+        self.egress: Dict[str, Any] = raw.get("egress") or {}
+        self.safe_mode = bool(raw.get("safe_mode", True))
+
+    def hours_for(self, content_type: str) -> list[int]:
+        bt = self.best_times
+        return _hours(bt.get(f"{content_type}_hours_24")) or _hours(bt.get("default_hours_24")) or DEFAULT_HOURS[:]
+
+class ClientConfig:
+    __slots__ = ("name", "live", "timezone", "tz", "window", "hours_24", "quotas", "per_24h",
+                 "per_hour", "burst", "weight", "ig_username", "ig_password", "raw", "warnings")
+
+    def __init__(self, name: str, raw: Dict[str, Any], schedule: ScheduleConfig, limit_default: Optional[int]):
+        self.name = name
+        self.raw = raw
+        self.warnings: list[str] = []
+        self.live = bool(raw.get("live", False))
+        hours = raw.get("hours") or {}
+        self.timezone: Optional[str] = hours.get("timezone") or schedule.timezone
+        self.tz = _zone(self.timezone)
+        start, end = _hhmm(hours.get("start")), _hhmm(hours.get("end"))
+        if (hours.get("start") or hours.get("end")) and not (start and end):
+            self.warnings.append(f"hours.start/end not HH:MM: {hours.get('start')!r}/{hours.get('end')!r}")
+        self.window: Optional[Tuple[time, time]] = (start, end) if start and end and start != end else None
+        self.hours_24 = _hours(raw.get("hours_24"))
+
+        quotas = raw.get("quotas") or {}
+        legacy = raw.get("max_per_day") or {}
+        self.quotas: Dict[str, int] = {}
+        for ctype in CONTENT_TYPES:
+            v = quotas.get(f"{ctype}_per_day", legacy.get(ctype))
+            if v is None:
+                continue
+            if _pos_int(v) is None:
+                self.warnings.append(f"quota for {ctype} is not a positive number: {v!r}")
+            else:
+                self.quotas[ctype] = _pos_int(v)
+
+        rate = raw.get("rate") or {}
+        self.per_24h = _pos_int(rate.get("per_24h")) or _pos_int(raw.get("daily_quota")) or limit_default
+        self.per_hour = _pos_float(rate.get("per_hour"))
+        self.burst = _pos_int(rate.get("burst")) or 1
+        w = raw.get("weight", 1)
+        self.weight = _pos_float(w) or 1.0
+        if _pos_float(w) is None:
+            self.warnings.append(f"weight must be > 0: {w!r}")
+        self.ig_username: Optional[str] = raw.get("IG_USERNAME")
+        self.ig_password: Optional[str] = raw.get("IG_PASSWORD")
+
+    def quota(self, content_type: str) -> Optional[int]:
+        return self.quotas.get(content_type)
+
+    def get(self, key: str, default=None):
+        # dict-style access for callers that still think in client.json keys
+        return self.raw.get(key, default)
+
+    def __repr__(self) -> str:  # never show credentials
+        return (f"ClientConfig({self.name!r}, live={self.live}, tz={self.timezone}, window={self.window}, "
+                f"quotas={self.quotas}, per_24h={self.per_24h}, per_hour={self.per_hour}, "
+                f"burst={self.burst}, weight={self.weight:g})")
+
+# ----- cache
+class _File:
+    __slots__ = ("stamp", "checked", "data")
+
+    def __init__(self):
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.checked = 0.0
+        self.data: Any = None
+
+class ConfigService:
+    def __init__(self, config_dir: Path = CONFIG_DIR, check_sec: float = CHECK_SEC):
+        self.config_dir = Path(config_dir)
+        self.check_sec = check_sec
+        self._files: Dict[Path, _File] = {}
+        self._models: Dict[Any, Tuple[tuple, Any]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0  # JSON parses so far (bench/tests)
+
+    def _json(self, path: Path) -> Dict[str, Any]:
+        """
+        Parsed file contents ({} if missing); re-read only when mtime or size changed. A new
+        version is parsed aside and swapped in under the lock, so readers never see a
+        half-done reload; if it doesn't parse, the last good contents stay in use.
+        """
+        now = _time.monotonic()
+        f = self._files.get(path) or self._files.setdefault(path, _File())
+        if f.data is not None and now - f.checked < self.check_sec:
+            return f.data
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if f.data is not None and stamp == f.stamp:
+            with self._lock:
+                f.checked = now
+            return f.data
+        data = {} if stamp is None or f.data is None else f.data
+        if stamp is not None:
+            try:
+                parsed = json.loads(path.read_text(encoding="utf-8-sig"))
+                data = parsed if isinstance(parsed, dict) else {}
+            except (OSError, ValueError) as e:
+                print(f"[config] {path}: {e}")
+        with self._lock:
+            if stamp is not None:
+                self.loads += 1
+            f.data, f.stamp, f.checked = data, stamp, now
+            return f.data
+
+    def _model(self, key, sources: tuple, build: Callable[[], Any]):
+        # rebuilt only if one of its source dicts was re-read (identity changes on reload)
+        with self._lock:
+            hit = self._models.get(key)
+            if hit and len(hit[0]) == len(sources) and all(a is b for a, b in zip(hit[0], sources)):
+                return hit[1]
+            model = build()
+            self._models[key] = (sources, model)
+            return model
+
+    def schedule(self) -> ScheduleConfig:
+        raw = self._json(self.config_dir / "schedule.json")
+        return self._model("schedule", (raw,), lambda: ScheduleConfig(raw))
+
+    def client(self, name: str) -> ClientConfig:
+        raw = self._json(self.config_dir / "clients" / name / "client.json")
+        limits = self._json(self.config_dir / "client_limits.json")
+        sched = self.schedule()
+
+        def build() -> ClientConfig:
+            # client_limits.json: the client's own entry, else the default, but only for
+            # clients without per-type quotas (those were set deliberately)
+            listed = (limits.get("clients") or {}).get(name)
+            has_quotas = bool(raw.get("quotas") or raw.get("max_per_day"))
+            default = _pos_int(listed) or (None if has_quotas else _pos_int(limits.get("default_daily_quota")))
+            cfg = ClientConfig(name, raw, sched, default)
+            for w in cfg.warnings:
+                print(f"[config] {name}: {w}")
+            return cfg
+        return self._model(("client", name), (raw, limits, sched), build)
+
+    def client_names(self) -> list[str]:
+        """Every client with a config/clients/<name>/client.json."""
+        d = self.config_dir / "clients"
+        if not d.exists():
+            return []
+        return sorted(p.name for p in d.iterdir() if (p / "client.json").exists())
+
+    def registry(self) -> Dict[str, Any]:
+        """config/clients.json (switch_client.py's list)."""
+        return self._json(self.config_dir / "clients.json")
+
+    def current_client(self) -> Optional[str]:
+        try:
+            return (self.config_dir / "current_client.txt").read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+CONFIG = ConfigService()
+
+def client(name: str) -> ClientConfig:
+    return CONFIG.client(name)
+
+def schedule() -> ScheduleConfig:
+    return CONFIG.schedule()
+
+def client_names() -> list[str]:
+    return CONFIG.client_names()
+
+if __name__ == "__main__":
+    print(f"schedule: tz={schedule().timezone} egress={schedule().egress}")
+    for n in client_names():
+        print(repr(client(n)))
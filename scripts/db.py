@@ -1,23 +1,177 @@
 
 from __future__ import annotations
-import sqlite3, json
+import sqlite3, json, os, threading, atexit, time, importlib.util
+from itertools import islice
+from operator import itemgetter
+from typing import Iterable
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timezone, tzinfo
 
 ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
-DB_PATH = DATA_DIR / "autoposter.db"
+DB_PATH = Path(os.environ.get("AUTOPOSTER_DB") or DATA_DIR / "autoposter.db")
 
-def _conn():
-    conn = sqlite3.connect(DB_PATH)
+# typed, mtime-cached config/ (scripts/config_service.py); other scripts reach it as db.config_service
+_spec = importlib.util.spec_from_file_location("config_service", ROOT / "scripts" / "config_service.py")
+config_service = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(config_service)  # type: ignore[union-attr]
+
+# ----- connection layer
+# One connection per thread, opened lazily and reused for the life of the process.
+# Pragmas are applied once per connection instead of paying connect + setup on every call.
+BUSY_TIMEOUT_MS = 10_000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # readers never block the writer (watcher + runner)
+    "PRAGMA synchronous=NORMAL",      # fsync at checkpoints only; safe with WAL
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",       # ~16 MB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+_all_conns: list[sqlite3.Connection] = []
+_all_lock = threading.Lock()
+_generation = 0
+
+def _open(path: Path | str | None = None) -> sqlite3.Connection:
+    # check_same_thread=False only so close_all() can close them at exit;
+    # each connection is still used by the thread that opened it.
+    conn = sqlite3.connect(str(path or DB_PATH), timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _conn() -> sqlite3.Connection:
+    """Return this thread's shared connection (created on first use)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.key != (str(DB_PATH), _generation):
+        conn = _open()
+        _local.conn, _local.key = conn, (str(DB_PATH), _generation)
+        with _all_lock:
+            _all_conns.append(conn)
     return conn
 
+def close_all() -> None:
+    """Flush pending writes, then close every connection opened by this process (registered atexit)."""
+    global _generation
+    flush()
+    with _all_lock:
+        conns = _all_conns[:]
+        _all_conns.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.execute("PRAGMA optimize")  # refresh planner stats the indexes rely on
+            conn.close()
+        except Exception:
+            pass
+
+atexit.register(close_all)
+
+# ----- time
+# eta/created/posted/lease times are stored as integer epoch milliseconds (*_ms columns)
+# so comparisons are numeric and index keys stay small. The ISO text columns are kept
+# as a readable mirror for older scripts; the API still accepts ISO strings at the edges.
 def _now_iso():
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+def to_ms(value) -> int | None:
+    """Epoch ms from an ISO string, datetime or number. Naive times are UTC, as in _ISO_TO_MS."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return round(value.timestamp() * 1000)
+    raise TypeError(f"not a timestamp: {value!r}")
+
+def ms_to_iso(ms: int | None) -> str | None:
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec="milliseconds")
+
+def ms_to_dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc)
+
+def _ensure_columns(c, table: str, cols: dict[str, str]) -> set[str]:
+    """ALTER TABLE ADD COLUMN for anything missing (older DBs predate these columns)."""
+    have = {r[1] for r in c.execute(f"PRAGMA table_xinfo({table})").fetchall()}  # xinfo: includes generated columns
+    added = set()
+    for name, decl in cols.items():
+        if name not in have:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+            added.add(name)
+    return added
+
+# SQL twin of to_ms() for ISO text written by hand or by older scripts. julianday() reads
+# an ISO string without an offset as UTC, so to_ms() does too: both paths must agree.
+_ISO_TO_MS = "CAST(round((julianday({col}) - 2440587.5) * 86400000) AS INTEGER)"
+
+# ----- priority lanes
+# Higher priority = taken earlier among due jobs: each level is a PRIORITY_STEP_MS head
+# start in the due order (never before its eta). Per-job override: extras["priority"].
+PRIORITY_STEP_MS = 10 * 60_000
+PRIORITY_MAX = 5
+PRIORITY_DEFAULTS = {"stories": 2, "feed": 1, "weekly": 1, "reels": 0}
+
+def clamp_priority(value) -> int:
+    try:
+        return max(0, min(PRIORITY_MAX, int(value)))
+    except (TypeError, ValueError):
+        return 0
+
+def _seed_priorities(c) -> None:
+    # rows that predate the column get their content type's default
+    for ctype, prio in PRIORITY_DEFAULTS.items():
+        c.execute("UPDATE jobs SET priority=? WHERE content_type=? AND status<>'done'", (prio, ctype))
+
+# name -> CREATE statement; _sync_indexes() rebuilds any whose definition changed
+INDEXES = {
+    # HARD DEDUPE: one row per (client, path); also serves client-only lookups
+    "ux_jobs_client_path": "CREATE UNIQUE INDEX ux_jobs_client_path ON jobs(client, path)",
+    # due / claim: status='queued' [AND client=?] AND eta_ms<=?
+    "idx_jobs_due_client": "CREATE INDEX idx_jobs_due_client ON jobs(status, client, eta_ms)",  # + upcoming / bulk reschedule
+    "idx_jobs_due": "CREATE INDEX idx_jobs_due ON jobs(status, eta_ms)",
+    # due / claim in lane order: rank_ms range, eta_ms checked from the index, LIMIT stops early
+    "idx_jobs_rank_client": "CREATE INDEX idx_jobs_rank_client ON jobs(status, client, rank_ms, eta_ms)",
+    "idx_jobs_rank": "CREATE INDEX idx_jobs_rank ON jobs(status, rank_ms, eta_ms)",
+    # expired leases: only ever a handful of in_progress rows
+    "idx_jobs_lease": "CREATE INDEX idx_jobs_lease ON jobs(lease_expires_ms) WHERE status='in_progress'",
+    # health_report: posted_ms>=? / eta_ms>=?; eta_ms IS NULL finds rows left to migrate
+    "idx_jobs_eta": "CREATE INDEX idx_jobs_eta ON jobs(eta_ms)",
+    "idx_jobs_posted": "CREATE INDEX idx_jobs_posted ON jobs(posted_ms)",
+}
+# superseded indexes: single-column status/client, the COUNT(*) quota index, ISO-text keys
+OBSOLETE_INDEXES = ("idx_jobs_status", "idx_jobs_client", "idx_jobs_quota", "idx_jobs_posted_at")
 
-def init_db():
+def _sync_indexes(c) -> None:
+    have = {r["name"]: r["sql"] for r in c.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name='jobs'")}
+    for name in OBSOLETE_INDEXES:
+        if name in have:
+            c.execute(f"DROP INDEX {name}")
+    for name, sql in INDEXES.items():
+        if name in have and have[name] != sql:
+            c.execute(f"DROP INDEX {name}")
+            del have[name]
+    cols = {r[1] for r in c.execute("PRAGMA table_info(jobs)").fetchall()}
+    if "lease_expires" in cols:  # ISO lease column, replaced by lease_expires_ms
+        c.execute("ALTER TABLE jobs DROP COLUMN lease_expires")
+    for name, sql in INDEXES.items():
+        if name not in have:
+            c.execute(sql)
+
+def init_db(backfill: bool = True):
+    """Create/upgrade the schema. backfill=False leaves migrate_epoch() to the caller."""
     with _conn() as c:
         c.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
@@ -33,67 +187,999 @@ def init_db():
           extras       TEXT
         )
         """)
-        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_client ON jobs(client)")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_eta ON jobs(eta)")
-        # HARD DEDUPE: one row per (client, path)
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_client_path ON jobs(client, path)")
+        added = _ensure_columns(c, "jobs", {
+            "lease_owner":      "TEXT",     # runner id holding the job while in_progress
+            "eta_ms":           "INTEGER",  # epoch ms twins of eta / created_at / posted_at
+            "created_ms":       "INTEGER",
+            "posted_ms":        "INTEGER",
+            "lease_expires_ms": "INTEGER",  # past this the job goes back to the pool
+            "upload_started_ms": "INTEGER", # set (and committed) right before the upload call
+            # lifecycle stamps for latency_hist (with created_ms, eta_ms, upload_started_ms, posted_ms)
+            "seen_ms":           "INTEGER", # the watcher first saw the file (before its debounce)
+            "claimed_ms":        "INTEGER",
+            "upload_ended_ms":   "INTEGER",
+            # hot metadata that used to live in the extras JSON
+            "source":            "TEXT",    # watcher / backfill / dry-test ...
+            "reschedule_reason": "TEXT",
+            "attempts":          "INTEGER NOT NULL DEFAULT 0",
+            "last_error":        "TEXT",
+            # due-order lanes: rank_ms = eta_ms minus the priority's head start (see PRIORITY_STEP_MS)
+            "priority":          "INTEGER NOT NULL DEFAULT 0",
+            "rank_ms":           f"INTEGER GENERATED ALWAYS AS (eta_ms - priority * {PRIORITY_STEP_MS}) VIRTUAL",
+        })
+        if "priority" in added:
+            _seed_priorities(c)
+        if "source" in added:
+            # one-time lift of the promoted keys out of extras (JSON1)
+            c.execute("""
+            UPDATE jobs SET source = json_extract(extras, '$.source'),
+                            reschedule_reason = json_extract(extras, '$.reschedule_reason'),
+                            extras = json_remove(extras, '$.source', '$.reschedule_reason')
+            WHERE json_valid(extras) AND (json_extract(extras, '$.source') IS NOT NULL
+                                          OR json_extract(extras, '$.reschedule_reason') IS NOT NULL)
+            """)
+        _sync_indexes(c)
+        # Writers that only touch the ISO columns (hand SQL, older scripts) keep the
+        # *_ms twins in step. db.py writes both, so NEW.x_ms differs and these skip.
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_jobs_ms_insert AFTER INSERT ON jobs WHEN NEW.eta_ms IS NULL
+        BEGIN
+          UPDATE jobs SET eta_ms = {_ISO_TO_MS.format(col="NEW.eta")},
+                          created_ms = {_ISO_TO_MS.format(col="NEW.created_at")},
+                          posted_ms = {_ISO_TO_MS.format(col="NEW.posted_at")}
+          WHERE id = NEW.id;
+        END""")
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_jobs_ms_eta AFTER UPDATE OF eta ON jobs WHEN NEW.eta_ms IS OLD.eta_ms
+        BEGIN
+          UPDATE jobs SET eta_ms = {_ISO_TO_MS.format(col="NEW.eta")} WHERE id = NEW.id;
+        END""")
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_jobs_ms_posted AFTER UPDATE OF posted_at ON jobs WHEN NEW.posted_ms IS OLD.posted_ms
+        BEGIN
+          UPDATE jobs SET posted_ms = {_ISO_TO_MS.format(col="NEW.posted_at")} WHERE id = NEW.id;
+        END""")
+        # per-day post counters, bumped by mark_done; quota checks are a primary-key lookup
+        new_counters = not c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='quota_usage'").fetchone()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS quota_usage (
+          client       TEXT NOT NULL,
+          content_type TEXT NOT NULL,
+          day          TEXT NOT NULL,   -- YYYY-MM-DD in the client's timezone
+          used         INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (client, content_type, day)
+        ) WITHOUT ROWID
+        """)
+        _init_events(c)
+        # scripts/ratelimit.py state: token buckets and sliding-window hits survive restarts
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+          key        TEXT PRIMARY KEY,   -- 'acct:<client>' or 'global'
+          tokens     REAL NOT NULL,
+          updated_ms INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS rate_hits (
+          key   TEXT NOT NULL,
+          ts_ms INTEGER NOT NULL
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_rate_hits ON rate_hits(key, ts_ms)")
+        # per-hour latency histograms, filled by mark_done (see LATENCY_METRICS)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS latency_hist (
+          hour_ms      INTEGER NOT NULL,   -- UTC hour the job was marked done
+          client       TEXT NOT NULL,
+          content_type TEXT NOT NULL,
+          metric       TEXT NOT NULL,
+          bucket       INTEGER NOT NULL,   -- hist_bucket(): value in ms, 2 significant digits
+          n            INTEGER NOT NULL,
+          PRIMARY KEY (hour_ms, client, content_type, metric, bucket)
+        ) WITHOUT ROWID
+        """)
+        # live runner processes (see heartbeat())
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS runners (
+          runner_id    TEXT PRIMARY KEY,   -- host:pid, the lease_owner of its jobs
+          started_ms   INTEGER NOT NULL,
+          heartbeat_ms INTEGER NOT NULL,
+          serving      TEXT                -- client name or 'all clients'
+        ) WITHOUT ROWID
+        """)
         c.commit()
+    if not backfill:
+        return
+    migrate_epoch()  # no-op once every row has eta_ms
+    if new_counters:
+        rebuild_quota_usage()  # first run after upgrade: seed counters from history
 
-def get_job_by_path(client: str, path: str):
-    with _conn() as c:
-        return c.execute("SELECT * FROM jobs WHERE client=? AND path=? LIMIT 1", (client, path)).fetchone()
+# ----- event log
+# job_events is append-only: triggers record every insert, status change and
+# reschedule no matter who writes (db.py, older scripts, hand SQL); runners add
+# their own events (upload start/end...) through log_event(). Finished jobs are
+# moved here by archive_done_jobs(), and old events are rolled into gzip files
+# under exports/events/ by scripts/event_archive.py.
+_SQL_NOW_MS = "CAST(round((julianday('now') - 2440587.5) * 86400000) AS INTEGER)"
+_EVENT_DATA = (
+    "json_object('eta_ms', NEW.eta_ms, 'owner', NEW.lease_owner, 'reason', NEW.reschedule_reason, "
+    "'attempts', NEW.attempts, 'error', NEW.last_error)"
+)
 
-def add_job(client: str, path: str, *, content_type: str, caption: str|None=None, eta: str|None=None, extras: dict|None=None) -> int:
-    eta = eta or _now_iso()
-    ex = json.dumps(extras or {}, ensure_ascii=False)
+def _init_events(c) -> None:
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS job_events (
+      id           INTEGER PRIMARY KEY,
+      job_id       INTEGER NOT NULL,
+      client       TEXT NOT NULL,
+      content_type TEXT,
+      event        TEXT NOT NULL,   -- queued / claimed / rescheduled / done / archived / ...
+      ts_ms        INTEGER NOT NULL,
+      data         TEXT             -- JSON details; the full job row for 'archived'
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON job_events(ts_ms)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_job ON job_events(job_id, ts_ms)")
+    # archived jobs keep their (client, path) here so the file is never enqueued twice
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS archived_keys (
+      client    TEXT NOT NULL,
+      path      TEXT NOT NULL,
+      job_id    INTEGER NOT NULL,
+      posted_ms INTEGER,
+      PRIMARY KEY (client, path)
+    ) WITHOUT ROWID
+    """)
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_ev_insert AFTER INSERT ON jobs
+    BEGIN
+      INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data)
+      VALUES (NEW.id, NEW.client, NEW.content_type, 'queued', {_SQL_NOW_MS},
+              json_object('eta_ms', NEW.eta_ms, 'source', NEW.source));
+    END""")
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_ev_status AFTER UPDATE OF status ON jobs WHEN NEW.status IS NOT OLD.status
+    BEGIN
+      INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data)
+      VALUES (NEW.id, NEW.client, NEW.content_type,
+              CASE WHEN NEW.status = 'in_progress' THEN 'claimed'
+                   WHEN NEW.status = 'queued' AND NEW.eta_ms IS NOT OLD.eta_ms THEN 'rescheduled'
+                   ELSE NEW.status END,
+              {_SQL_NOW_MS}, {_EVENT_DATA});
+    END""")
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_ev_eta AFTER UPDATE OF eta_ms ON jobs
+    WHEN NEW.status IS OLD.status AND OLD.eta_ms IS NOT NULL AND NEW.eta_ms IS NOT OLD.eta_ms
+    BEGIN
+      INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data)
+      VALUES (NEW.id, NEW.client, NEW.content_type, 'rescheduled', {_SQL_NOW_MS}, {_EVENT_DATA});
+    END""")
+
+def log_event(job_id: int, client: str, event: str, *, content_type: str | None = None,
+              data: dict | None = None, ts_ms: int | None = None) -> None:
+    """Append an event the triggers can't see (e.g. upload_start / upload_end)."""
     with _conn() as c:
-        cur = c.cursor()
-        cur.execute(
-            "INSERT OR IGNORE INTO jobs (client, path, content_type, caption, eta, status, created_at, extras) "
-            "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
-            (client, path, content_type, caption, eta, _now_iso(), ex)
+        c.execute(
+            "INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, client, content_type, event, ts_ms or _now_ms(),
+             json.dumps(data, ensure_ascii=False) if data else None),
         )
+
+def job_events(job_id: int) -> list[sqlite3.Row]:
+    return _conn().execute(
+        "SELECT * FROM job_events WHERE job_id=? ORDER BY ts_ms, id", (job_id,)
+    ).fetchall()
+
+_ARCHIVE_ROW = (
+    "json_object('id', id, 'client', client, 'path', path, 'content_type', content_type, "
+    "'caption', caption, 'status', status, 'eta_ms', eta_ms, 'created_ms', created_ms, "
+    "'posted_ms', posted_ms, 'source', source, 'reschedule_reason', reschedule_reason, "
+    "'attempts', attempts, 'last_error', last_error, 'priority', priority, 'extras', extras)"
+)
+
+def archive_done_jobs(older_than_days: float = 30, batch: int = 1000) -> int:
+    """
+    Move done jobs posted more than `older_than_days` ago out of the hot jobs table:
+    an 'archived' event carries the full row, archived_keys keeps the dedupe key.
+    Runs in short batches; returns how many jobs moved.
+    """
+    cutoff = _now_ms() - int(older_than_days * 86_400_000)
+    moved = 0
+    c = _conn()
+    while True:
+        with c:
+            if not c.in_transaction:
+                c.execute("BEGIN IMMEDIATE")
+            ids = [r["id"] for r in c.execute(
+                "SELECT id FROM jobs WHERE status='done' AND posted_ms < ? LIMIT ?", (cutoff, batch))]
+            if not ids:
+                break
+            qmarks = ",".join("?" for _ in ids)
+            c.execute(
+                "INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data) "
+                f"SELECT id, client, content_type, 'archived', {_SQL_NOW_MS}, {_ARCHIVE_ROW} "
+                f"FROM jobs WHERE id IN ({qmarks})", ids)
+            c.execute(
+                "INSERT OR REPLACE INTO archived_keys (client, path, job_id, posted_ms) "
+                f"SELECT client, path, id, posted_ms FROM jobs WHERE id IN ({qmarks})", ids)
+            c.execute(f"DELETE FROM jobs WHERE id IN ({qmarks})", ids)
+        moved += len(ids)
+    return moved
+
+def migrate_epoch(batch: int = 1000, pause: float = 0.0, progress=None) -> int:
+    """
+    Online backfill of the *_ms columns from the ISO text columns, `batch` rows per
+    short transaction so the watcher and runners keep writing in between.
+    Unparseable eta falls back to created time (or now) so every row makes progress.
+    """
+    total = 0
+    c = _conn()
+    while True:
+        with c:
+            rows = c.execute(
+                "SELECT id, eta, created_at, posted_at FROM jobs WHERE eta_ms IS NULL LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            now = _now_ms()
+            updates = []
+            for r in rows:
+                created = _lenient_ms(r["created_at"]) or now
+                updates.append((_lenient_ms(r["eta"]) or created, created, _lenient_ms(r["posted_at"]), r["id"]))
+            c.executemany("UPDATE jobs SET eta_ms=?, created_ms=?, posted_ms=? WHERE id=?", updates)
+        total += len(rows)
+        if progress:
+            progress(total)
+        if pause:
+            time.sleep(pause)
+    return total
+
+def _lenient_ms(value) -> int | None:
+    try:
+        return to_ms(value)
+    except (TypeError, ValueError):
+        return None
+
+# ----- Job record
+# Every job query returns Job objects: a sqlite3.Row built in C by the cursor (no Python
+# __init__ per row, same memory as a Row), with each column also readable as a typed
+# attribute. The attributes are property(itemgetter(i)) over the row, so j.eta_ms stays
+# in C too. bench_job_record.py (100k rows, fetch + field access): even with a plain Row.
+JOB_COLS = (
+    "id", "client", "path", "content_type", "caption", "status",
+    "eta_ms", "created_ms", "posted_ms", "lease_owner", "lease_expires_ms",
+    "source", "reschedule_reason", "attempts", "last_error", "priority", "extras_json",
+)
+_JOB_SELECT = ", ".join(JOB_COLS).replace("extras_json", "extras AS extras_json")
+
+class Job(sqlite3.Row):
+    __slots__ = ()
+
+    id: int
+    client: str
+    path: str
+    content_type: str
+    caption: str | None
+    status: str
+    eta_ms: int
+    created_ms: int | None
+    posted_ms: int | None
+    lease_owner: str | None
+    lease_expires_ms: int | None
+    source: str | None
+    reschedule_reason: str | None
+    attempts: int
+    last_error: str | None
+    priority: int
+    extras_json: str | None
+
+    @property
+    def extras(self) -> dict:
+        """Decoded on every read (nothing on the hot path reads it)."""
+        try:
+            return json.loads(self.extras_json) if self.extras_json else {}
+        except ValueError:
+            return {}
+
+    # ISO views for display; comparisons should use the *_ms fields
+    @property
+    def eta(self) -> str | None:
+        return ms_to_iso(self.eta_ms)
+
+    @property
+    def created_at(self) -> str | None:
+        return ms_to_iso(self.created_ms)
+
+    @property
+    def posted_at(self) -> str | None:
+        return ms_to_iso(self.posted_ms)
+
+    # older scripts use row.get(...) as on a dict
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self) -> str:
+        return f"Job(id={self.id}, client={self.client!r}, type={self.content_type}, status={self.status}, eta={self.eta})"
+
+for _i, _col in enumerate(JOB_COLS):
+    setattr(Job, _col, property(itemgetter(_i)))
+
+def _jobs(c, sql: str, params=()) -> list[Job]:
+    cur = c.cursor()
+    cur.row_factory = Job
+    return cur.execute(sql, params).fetchall()
+
+def get_job_by_path(client: str, path: str) -> Job | None:
+    flush()
+    rows = _jobs(_conn(), f"SELECT {_JOB_SELECT} FROM jobs WHERE client=? AND path=? LIMIT 1", (client, path))
+    return rows[0] if rows else None
+
+def get_job(job_id: int) -> Job | None:
+    flush()
+    rows = _jobs(_conn(), f"SELECT {_JOB_SELECT} FROM jobs WHERE id=?", (job_id,))
+    return rows[0] if rows else None
+
+def list_queue(client: str | None = None, limit: int = 500) -> list[Job]:
+    """Queued jobs in posting order (status.py, db_queue_inspect.py)."""
+    flush()
+    return _jobs(_conn(), DUE_CLIENT_SQL if client else DUE_SQL, due_params(2**62, limit, client))
+
+_INSERT_SQL = (
+    "INSERT OR IGNORE INTO jobs (client, path, content_type, caption, eta, eta_ms, status, created_at, created_ms, "
+    "source, priority, seen_ms, extras) "
+    "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?)"
+)
+
+def _insert_row(client: str, path: str, content_type: str, caption, eta, extras, now_ms: int) -> tuple:
+    eta_ms = to_ms(eta) if eta is not None else now_ms
+    extras = dict(extras or {})
+    source = extras.pop("source", None)  # stored in their own columns
+    priority = clamp_priority(extras.pop("priority", PRIORITY_DEFAULTS.get(content_type, 0)))
+    seen_ms = to_ms(extras.pop("seen_ms", None))
+    return (client, path, content_type, caption, ms_to_iso(eta_ms), eta_ms, ms_to_iso(now_ms), now_ms,
+            source, priority, seen_ms, json.dumps(extras, ensure_ascii=False))
+
+def add_job(client: str, path: str, *, content_type: str, caption: str|None=None, eta: str|int|datetime|None=None, extras: dict|None=None) -> int:
+    with _conn() as c:
+        row = c.execute("SELECT job_id FROM archived_keys WHERE client=? AND path=?", (client, path)).fetchone()
+        if row:  # posted and archived long ago
+            return int(row["job_id"])
+        cur = c.execute(_INSERT_SQL, _insert_row(client, path, content_type, caption, eta, extras, _now_ms()))
+        if cur.rowcount == 1:
+            return int(cur.lastrowid)
+        # already queued: (client, path) is unique
         row = c.execute("SELECT id FROM jobs WHERE client=? AND path=? LIMIT 1", (client, path)).fetchone()
-        c.commit()
         return int(row["id"])
 
-def get_due_jobs(limit: int = 50, client: str | None = None, now_iso: str | None = None):
-    now_iso = now_iso or _now_iso()
+ADD_CHUNK = 500
+
+def _ids_for(c, keys: list[tuple[str, str]], *, archived: bool = False) -> dict[tuple[str, str], int]:
+    by_client: dict[str, list[str]] = {}
+    for client, path in keys:
+        by_client.setdefault(client, []).append(path)
+    found: dict[tuple[str, str], int] = {}
+    sources = ["SELECT id, path FROM jobs"]
+    if archived:
+        sources.append("SELECT job_id AS id, path FROM archived_keys")
+    for client, paths in by_client.items():
+        qmarks = ",".join("?" for _ in paths)
+        for src in sources:
+            for r in c.execute(f"{src} WHERE client=? AND path IN ({qmarks})", (client, *paths)):
+                found[(client, r["path"])] = int(r["id"])
+    return found
+
+def add_jobs(jobs: Iterable[dict], *, chunk_size: int = ADD_CHUNK) -> tuple[dict, dict]:
+    """
+    Bulk enqueue in a single transaction, chunk_size rows per executemany.
+    Each item takes add_job's fields: client, path, content_type, caption, eta, extras
+    (extras["source"] / extras["priority"] go to their columns).
+    Returns (inserted, skipped), both {(client, path): job_id}; skipped = already queued
+    (or posted and archived).
+    """
+    now = _now_ms()
+    inserted: dict[tuple[str, str], int] = {}
+    skipped: dict[tuple[str, str], int] = {}
+    c = _conn()
+    with c:
+        if not c.in_transaction:
+            c.execute("BEGIN IMMEDIATE")
+        for chunk in _chunked(jobs, chunk_size):
+            keys = list(dict.fromkeys((j["client"], j["path"]) for j in chunk))
+            existing = _ids_for(c, keys, archived=True)
+            rows, fresh = [], {}
+            for j in chunk:
+                key = (j["client"], j["path"])
+                if key in existing or key in inserted or key in fresh:
+                    continue
+                fresh[key] = None
+                rows.append(_insert_row(j["client"], j["path"], j["content_type"], j.get("caption"),
+                                        j.get("eta"), j.get("extras"), now))
+            c.executemany(_INSERT_SQL, rows)
+            inserted.update(_ids_for(c, list(fresh)))
+            skipped.update({k: v for k, v in existing.items() if k not in inserted})
+    return inserted, skipped
+
+def _chunked(items: Iterable, size: int):
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+# ----- hot queries (kept as constants so scripts/check_query_plans.py checks the real SQL)
+# Due jobs come out in lane order, rank_ms = eta_ms - priority * PRIORITY_STEP_MS: a story
+# (priority 2) is taken ahead of a reel that came due up to 2 steps earlier, but no
+# further, so waiting is the aging that keeps low lanes from starving. Ordering by the
+# index order means no sort step; the rank_ms bound (now + the largest head start) keeps
+# it one range scan that LIMIT stops early. Params: ([client,] rank_bound, now, limit),
+# see due_params().
+DUE_SQL = (
+    f"SELECT {_JOB_SELECT} FROM jobs WHERE status='queued' AND rank_ms <= ? AND eta_ms <= ? "
+    "ORDER BY rank_ms ASC, eta_ms ASC, id ASC LIMIT ?"
+)
+DUE_CLIENT_SQL = (
+    f"SELECT {_JOB_SELECT} FROM jobs WHERE status='queued' AND client=? AND rank_ms <= ? AND eta_ms <= ? "
+    "ORDER BY rank_ms ASC, eta_ms ASC, id ASC LIMIT ?"
+)
+QUOTA_SQL = "SELECT used FROM quota_usage WHERE client=? AND content_type=? AND day=?"
+# runner daemon: the next ETAs only, straight off the index (no row lookups)
+UPCOMING_SQL = "SELECT eta_ms, id FROM jobs WHERE status='queued' ORDER BY eta_ms, id LIMIT ?"
+UPCOMING_CLIENT_SQL = "SELECT eta_ms, id FROM jobs WHERE status='queued' AND client=? ORDER BY eta_ms, id LIMIT ?"
+
+def due_params(now_ms: int, limit: int, client: str | None = None) -> tuple:
+    """Parameters for DUE_SQL / DUE_CLIENT_SQL."""
+    bound = (now_ms + PRIORITY_MAX * PRIORITY_STEP_MS, now_ms, limit)
+    return (client, *bound) if client else bound
+
+def get_due_jobs(limit: int = 50, client: str | None = None, now_iso: str | int | None = None) -> list[Job]:
+    flush()
+    now = to_ms(now_iso) or _now_ms()
+    return _jobs(_conn(), DUE_CLIENT_SQL if client else DUE_SQL, due_params(now, limit, client))
+
+def upcoming_etas(client: str | None = None, limit: int = 256) -> list[tuple[int, int]]:
+    """(eta_ms, id) of the next `limit` queued jobs, earliest first (due ones included)."""
+    flush()
+    if client:
+        return [tuple(r) for r in _conn().execute(UPCOMING_CLIENT_SQL, (client, limit))]
+    return [tuple(r) for r in _conn().execute(UPCOMING_SQL, (limit,))]
+
+def data_version() -> int:
+    """Changes whenever another connection commits to the DB (watcher, other scripts, our writer)."""
+    return _conn().execute("PRAGMA data_version").fetchone()[0]
+
+# ----- quota counters
+# quota_usage(client, content_type, day) is maintained by mark_done; "day" is the calendar
+# day in the client's timezone (client.json hours.timezone, else schedule.json timezone;
+# served from memory by config_service, which notices edits to either file).
+def client_tz(client: str) -> tzinfo:
+    return config_service.client(client).tz
+
+def client_day(client: str, when: datetime | None = None) -> str:
+    return (when or datetime.now(timezone.utc)).astimezone(client_tz(client)).date().isoformat()
+
+def _bump_quota(c, client: str, content_type: str, day: str, n: int = 1) -> None:
+    c.execute(
+        "INSERT INTO quota_usage (client, content_type, day, used) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(client, content_type, day) DO UPDATE SET used = used + excluded.used",
+        (client, content_type, day, n),
+    )
+
+# ----- latency histograms
+# Every done job adds one sample per metric to latency_hist, in the same transaction:
+#   enqueue_lag  watcher saw the file -> row inserted (watcher jobs only)
+#   eta_slip     became due (max of eta and enqueue time) -> upload started
+#   upload       upload started -> upload ended
+# All stamps are epoch ms (written by different processes, so not time.monotonic()).
+# Buckets are HDR-style: values keep 2 significant digits (<= 10% error) whatever
+# their magnitude, so an hour of one client/type/metric is a few dozen rows.
+LATENCY_METRICS = ("enqueue_lag", "eta_slip", "upload")
+HIST_KEEP_DAYS = 7
+_HOUR_MS = 3_600_000
+_hist_pruned = 0  # hour last pruned by this process
+
+def hist_bucket(ms: int) -> int:
+    """Round down to 2 significant digits: 0..99 exact, 1234 -> 1200, 98765 -> 98000."""
+    ms = max(0, int(ms))
+    if ms < 100:
+        return ms
+    step = 10 ** (len(str(ms)) - 2)
+    return ms - ms % step
+
+def _latency_samples(row) -> dict[str, int]:
+    out = {}
+    if row["seen_ms"] is not None and row["created_ms"] is not None:
+        out["enqueue_lag"] = row["created_ms"] - row["seen_ms"]
+    started = row["upload_started_ms"]
+    if started is not None:
+        out["eta_slip"] = started - max(row["eta_ms"] or 0, row["created_ms"] or 0)
+        if row["upload_ended_ms"] is not None:
+            out["upload"] = row["upload_ended_ms"] - started
+    return out
+
+def _record_latency(c, row, now: int) -> None:
+    global _hist_pruned
+    hour = now - now % _HOUR_MS
+    c.executemany(
+        "INSERT INTO latency_hist (hour_ms, client, content_type, metric, bucket, n) VALUES (?, ?, ?, ?, ?, 1) "
+        "ON CONFLICT(hour_ms, client, content_type, metric, bucket) DO UPDATE SET n = n + 1",
+        [(hour, row["client"], row["content_type"], m, hist_bucket(v)) for m, v in _latency_samples(row).items()],
+    )
+    if hour != _hist_pruned:  # rolling: drop whole hours past HIST_KEEP_DAYS, once an hour
+        _hist_pruned = hour
+        c.execute("DELETE FROM latency_hist WHERE hour_ms < ?", (hour - HIST_KEEP_DAYS * 24 * _HOUR_MS,))
+
+def hist_percentile(buckets: list[tuple[int, int]], p: float) -> int:
+    """p-th percentile (0-100) of sorted (bucket, n) pairs; returns the bucket value."""
+    total = sum(n for _, n in buckets)
+    rank, seen = p / 100 * total, 0
+    for bucket, n in buckets:
+        seen += n
+        if seen >= rank:
+            return bucket
+    return buckets[-1][0] if buckets else 0
+
+LATENCY_SQL = (
+    "SELECT client, content_type, metric, bucket, SUM(n) AS n FROM latency_hist WHERE hour_ms >= ? "
+    "GROUP BY client, content_type, metric, bucket ORDER BY client, content_type, metric, bucket"
+)
+
+def latency_summary(hours: float = 24) -> dict[tuple[str, str, str], dict[str, int]]:
+    """{(client, content_type, metric): {n, p50, p95, p99}} over the last `hours`."""
+    flush()
+    since = _now_ms() - int(hours * _HOUR_MS)
+    groups: dict[tuple[str, str, str], list[tuple[int, int]]] = {}
+    for r in _conn().execute(LATENCY_SQL, (since - since % _HOUR_MS,)):
+        groups.setdefault((r["client"], r["content_type"], r["metric"]), []).append((r["bucket"], r["n"]))
+    return {k: {"n": sum(n for _, n in b), **{f"p{p}": hist_percentile(b, p) for p in (50, 95, 99)}}
+            for k, b in groups.items()}
+
+def quota_used(client: str, content_type: str, day: str | None = None) -> int:
+    """Posts marked done for client/content_type on `day` (default: today in the client's tz)."""
+    flush()
+    row = _conn().execute(QUOTA_SQL, (client, content_type, day or client_day(client))).fetchone()
+    return int(row["used"]) if row else 0
+
+def rebuild_quota_usage() -> int:
+    """Recompute every counter from the done rows in jobs; returns the number of counters."""
+    counts: dict[tuple[str, str, str], int] = {}
+    c = _conn()
+    with c:
+        if not c.in_transaction:
+            c.execute("BEGIN IMMEDIATE")
+        for r in c.execute("SELECT client, content_type, posted_ms FROM jobs WHERE status='done' AND posted_ms IS NOT NULL"):
+            key = (r["client"], r["content_type"], client_day(r["client"], ms_to_dt(r["posted_ms"])))
+            counts[key] = counts.get(key, 0) + 1
+        c.execute("DELETE FROM quota_usage")
+        c.executemany(
+            "INSERT INTO quota_usage (client, content_type, day, used) VALUES (?, ?, ?, ?)",
+            [(*k, n) for k, n in counts.items()],
+        )
+    return len(counts)
+
+# ----- leases
+# A runner claims due jobs by flipping them to in_progress with its owner id and a
+# lease expiry, all in one write transaction, so two runners never get the same row.
+# While it is alive its heartbeat() keeps those leases fresh; if it dies they run out
+# and the sweep (on every claim, and periodically from each runner) takes them back:
+#   - upload never started  -> queued again (reason 'lease_expired')
+#   - upload had started    -> 'failed' with reason 'maybe_posted': the post may be live,
+#                              so a human checks the account before requeue_failed.py
+LEASE_SEC = 300
+HEARTBEAT_SEC = 30  # well inside LEASE_SEC: a few missed beats don't lose a lease
+
+RELEASE_EXPIRED_SQL = (
+    "UPDATE jobs SET status='queued', lease_owner=NULL, lease_expires_ms=NULL, "
+    "reschedule_reason='lease_expired' "
+    "WHERE status='in_progress' AND lease_expires_ms <= ? AND upload_started_ms IS NULL"
+)
+HOLD_EXPIRED_SQL = (
+    "UPDATE jobs SET status='failed', lease_owner=NULL, lease_expires_ms=NULL, "
+    "reschedule_reason='maybe_posted', last_error='runner lost while uploading (started ' || "
+    "strftime('%Y-%m-%dT%H:%M:%SZ', upload_started_ms / 1000, 'unixepoch') || "
+    "'); check the account before requeueing' "
+    "WHERE status='in_progress' AND lease_expires_ms <= ? AND upload_started_ms IS NOT NULL"
+)
+# in_progress rows written without a lease (older scripts, hand SQL) would never expire
+ADOPT_UNLEASED_SQL = "UPDATE jobs SET lease_expires_ms=? WHERE status='in_progress' AND lease_expires_ms IS NULL"
+
+def _release_expired(c, now_ms: int) -> tuple[int, int]:
+    c.execute(ADOPT_UNLEASED_SQL, (now_ms + LEASE_SEC * 1000,))
+    return c.execute(RELEASE_EXPIRED_SQL, (now_ms,)).rowcount, c.execute(HOLD_EXPIRED_SQL, (now_ms,)).rowcount
+
+def release_expired_leases(now: str | int | None = None) -> tuple[int, int]:
+    """Sweep expired leases; returns (requeued, held as maybe posted)."""
     with _conn() as c:
-        if client:
-            return c.execute(
-                "SELECT * FROM jobs WHERE status='queued' AND client=? AND (eta IS NULL OR eta <= ?) "
-                "ORDER BY id ASC LIMIT ?",
-                (client, now_iso, limit)
-            ).fetchall()
-        return c.execute(
-            "SELECT * FROM jobs WHERE status='queued' AND (eta IS NULL OR eta <= ?) "
-            "ORDER BY id ASC LIMIT ?",
-            (now_iso, limit)
-        ).fetchall()
+        return _release_expired(c, to_ms(now) or _now_ms())
 
-def mark_in_progress(job_id: int):
+def _claim_sql(per_client: bool) -> str:
+    pick = (DUE_CLIENT_SQL if per_client else DUE_SQL).replace(_JOB_SELECT, "id", 1)
+    return (
+        "UPDATE jobs SET status='in_progress', lease_owner=?, lease_expires_ms=?, claimed_ms=? "
+        f"WHERE id IN ({pick}) RETURNING {_JOB_SELECT}"
+    )
+
+def claim_due_jobs(owner: str, limit: int = 10, *, client: str | None = None,
+                   lease_sec: float = LEASE_SEC, now: str | int | None = None) -> list[Job]:
+    """
+    Atomically lease up to `limit` due jobs to `owner`.
+    Expired leases are returned to the pool first, in the same transaction.
+    """
+    flush()
+    now_ms = to_ms(now) or _now_ms()
+    expires = now_ms + int(lease_sec * 1000)
+    params = due_params(now_ms, limit, client)
+    c = _conn()
+    with c:
+        if not c.in_transaction:
+            c.execute("BEGIN IMMEDIATE")
+        _release_expired(c, now_ms)
+        rows = _jobs(c, _claim_sql(bool(client)), (owner, expires, now_ms, *params))
+    return sorted(rows, key=lambda j: (j.eta_ms - j.priority * PRIORITY_STEP_MS, j.eta_ms, j.id))
+
+def renew_lease(job_id: int, owner: str, lease_sec: float = LEASE_SEC) -> bool:
+    """Extend a lease we still hold (long uploads); False if it was lost."""
     with _conn() as c:
-        c.execute("UPDATE jobs SET status='in_progress' WHERE id=?", (job_id,))
-        c.commit()
+        cur = c.execute(
+            "UPDATE jobs SET lease_expires_ms=? WHERE id=? AND status='in_progress' AND lease_owner=?",
+            (_now_ms() + int(lease_sec * 1000), job_id, owner),
+        )
+        return cur.rowcount == 1
 
-def mark_done(job_id: int):
+def mark_upload_started(job_id: int, owner: str) -> bool:
+    """
+    Record that the upload is about to start, committed before returning (never queued
+    behind the group-commit writer). False if our lease was lost: don't upload then.
+    """
+    now = _now_ms()
     with _conn() as c:
-        c.execute("UPDATE jobs SET status='done', posted_at=? WHERE id=?", (_now_iso(), job_id))
-        c.commit()
+        row = c.execute(
+            "UPDATE jobs SET upload_started_ms=? WHERE id=? AND status='in_progress' AND lease_owner=? "
+            "RETURNING client, content_type",
+            (now, job_id, owner),
+        ).fetchone()
+        if row:
+            c.execute(
+                "INSERT INTO job_events (job_id, client, content_type, event, ts_ms, data) VALUES (?, ?, ?, 'upload_start', ?, ?)",
+                (job_id, row["client"], row["content_type"], now, json.dumps({"owner": owner})),
+            )
+        return row is not None
+
+def release_lease(job_id: int, owner: str, error: str, retry_at: str|int|datetime|None) -> str | None:
+    """
+    Hand back a lease whose worker crashed. Like fail_job (retry at retry_at, dead-letter
+    if None) unless the upload had started: then it is held as maybe posted, as the sweep
+    would. Returns 'retry', 'failed', 'held', or None if the lease was no longer ours.
+    """
+    flush()
+    now = _now_ms()
+    c = _conn()
+    with c:
+        if not c.in_transaction:
+            c.execute("BEGIN IMMEDIATE")
+        row = c.execute("SELECT upload_started_ms FROM jobs WHERE id=? AND status='in_progress' AND lease_owner=?",
+                        (job_id, owner)).fetchone()
+        if row is None:
+            return None
+        if row["upload_started_ms"] is not None:
+            c.execute("UPDATE jobs SET lease_expires_ms=? WHERE id=?", (now, job_id))
+            c.execute(HOLD_EXPIRED_SQL + " AND id=?", (now, job_id))
+            return "held"
+        retry_ms = to_ms(retry_at)
+        _fail_job(c, job_id, error, retry_ms, "retry:crash" if retry_ms is not None else None)
+        return "retry" if retry_ms is not None else "failed"
 
-def reschedule(job_id: int, new_eta: str, reason: str|None=None):
+# ----- runners
+# One row per live runner process; heartbeat() also renews the leases it holds, so a
+# lease only runs out when its runner stopped beating.
+RENEW_OWNED_SQL = "UPDATE jobs SET lease_expires_ms=? WHERE status='in_progress' AND lease_owner=?"
+
+def heartbeat(owner: str, *, serving: str | None = None, lease_sec: float = LEASE_SEC) -> int:
+    """Register/refresh this runner and extend all its leases; returns how many were renewed."""
+    now = _now_ms()
     with _conn() as c:
-        if reason:
-            row = c.execute("SELECT extras FROM jobs WHERE id=?", (job_id,)).fetchone()
-            old = {}
-            if row and row["extras"]:
-                try: old = json.loads(row["extras"])
-                except Exception: old = {}
-            old["reschedule_reason"] = reason
-            ex = json.dumps(old, ensure_ascii=False)
-            c.execute("UPDATE jobs SET eta=?, status='queued', extras=? WHERE id=?", (new_eta, ex, job_id))
-        else:
-            c.execute("UPDATE jobs SET eta=?, status='queued' WHERE id=?", (new_eta, job_id))
-        c.commit()
+        c.execute(
+            "INSERT INTO runners (runner_id, started_ms, heartbeat_ms, serving) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(runner_id) DO UPDATE SET heartbeat_ms=excluded.heartbeat_ms, "
+            "serving=COALESCE(excluded.serving, serving)",
+            (owner, now, now, serving),
+        )
+        c.execute("DELETE FROM runners WHERE heartbeat_ms < ?", (now - 86_400_000,))  # killed a day ago
+        return c.execute(RENEW_OWNED_SQL, (now + int(lease_sec * 1000), owner)).rowcount
+
+def runner_exit(owner: str) -> None:
+    with _conn() as c:
+        c.execute("DELETE FROM runners WHERE runner_id=?", (owner,))
+
+def runners() -> list[sqlite3.Row]:
+    """Registered runners, most recent heartbeat first (stale ones crashed or were killed)."""
+    flush()
+    return _conn().execute("SELECT * FROM runners ORDER BY heartbeat_ms DESC").fetchall()
+
+# ----- group commit
+# Status transitions go through one writer thread that commits whatever has queued up
+# in a single transaction, instead of one commit per call. WRITE_MODE picks durability:
+#   sync  - commit in the calling thread, one transaction per call (old behaviour)
+#   group - hand off to the writer and wait for the commit; concurrent callers share it
+#   async - write-behind: return at once, commit every GROUP_INTERVAL or GROUP_MAX ops;
+#           a crash loses at most that window. The job/quota reads and claim_due_jobs
+#           flush() first, and close_all() (atexit) flushes before closing.
+WRITE_MODES = ("sync", "group", "async")
+WRITE_MODE = os.environ.get("AUTOPOSTER_WRITE_MODE", "group")
+GROUP_INTERVAL = 0.05
+GROUP_MAX = 256
+
+class _Op:
+    __slots__ = ("fn", "args", "done", "error", "result")
+
+    def __init__(self, fn, args, wait: bool):
+        self.fn, self.args = fn, args
+        self.done = threading.Event() if wait else None
+        self.error: BaseException | None = None
+        self.result = None
+
+class _Writer(threading.Thread):
+    def __init__(self):
+        super().__init__(name="db-writer", daemon=True)
+        self.cond = threading.Condition()
+        self.pending: list[_Op] = []
+        self.urgent = False
+        self.busy = False  # a taken batch is being committed
+        self.commits = 0
+
+    def submit(self, op: _Op, urgent: bool) -> None:
+        with self.cond:
+            self.pending.append(op)
+            self.urgent |= urgent or len(self.pending) >= GROUP_MAX
+            self.cond.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                deadline = time.monotonic() + GROUP_INTERVAL
+                while not self.urgent and (left := deadline - time.monotonic()) > 0:
+                    self.cond.wait(left)
+                batch, self.pending, self.urgent, self.busy = self.pending, [], False, True
+            try:
+                self._commit(batch)
+            finally:
+                self.busy = False
+
+    def _commit(self, batch: list[_Op]) -> None:
+        c = _conn()
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                # one bad op must not take the rest of the group down with it
+                c.execute("SAVEPOINT op")
+                try:
+                    op.result = op.fn(c, *op.args)
+                    c.execute("RELEASE op")
+                except Exception as e:
+                    op.error = e
+                    c.execute("ROLLBACK TO op")
+                    c.execute("RELEASE op")
+            c.commit()
+            self.commits += 1
+        except Exception as e:
+            if c.in_transaction:
+                c.rollback()
+            for op in batch:
+                op.error = op.error or e
+        for op in batch:
+            if op.done:
+                op.done.set()
+            elif op.error and op.fn is not _noop:
+                print(f"[db] write-behind {op.fn.__name__}{op.args} failed: {op.error}")
+
+_writer: _Writer | None = None
+_writer_lock = threading.Lock()
+
+def _noop(c) -> None:
+    pass
+
+def _get_writer() -> _Writer:
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = _Writer()
+            _writer.start()
+        return _writer
+
+def set_write_mode(mode: str) -> None:
+    """Switch durability mode at runtime (pending write-behind ops are flushed first)."""
+    global WRITE_MODE
+    if mode not in WRITE_MODES:
+        raise ValueError(f"write mode must be one of {WRITE_MODES}, not {mode!r}")
+    flush()
+    WRITE_MODE = mode
+
+def _write(fn, *args):
+    """Run fn(c, *args) per WRITE_MODE; returns its result (always None in async mode)."""
+    if WRITE_MODE == "sync" or threading.current_thread() is _writer:
+        with _conn() as c:
+            return fn(c, *args)
+    wait = WRITE_MODE == "group"
+    op = _Op(fn, args, wait)
+    # group: nobody gains from waiting out the interval while we block, so commit now
+    _get_writer().submit(op, urgent=wait)
+    if wait:
+        op.done.wait()
+        if op.error:
+            raise op.error
+        return op.result
+    return None
+
+def flush() -> None:
+    """Block until every write-behind op queued so far is committed."""
+    w = _writer
+    if w is None or not (w.pending or w.busy):
+        return
+    op = _Op(_noop, (), True)
+    w.submit(op, urgent=True)
+    op.done.wait()
+
+# ----- status transitions
+def _mark_in_progress(c, job_id: int, expires_ms: int) -> None:
+    # callers outside claim_due_jobs get a lease too, so the sweep can recover the row
+    c.execute("UPDATE jobs SET status='in_progress', lease_expires_ms=COALESCE(lease_expires_ms, ?) WHERE id=?",
+              (expires_ms, job_id))
+
+# owner given: only while that runner still holds the job's lease. A runner whose lease was
+# swept (and maybe re-claimed elsewhere) must not move, fail or finish the row under the new holder.
+LEASE_HELD = " AND status='in_progress' AND lease_owner=?"
+
+def _held(owner: str | None) -> tuple[str, tuple]:
+    return (LEASE_HELD, (owner,)) if owner else ("", ())
+
+def _mark_done(c, job_id: int, now: int, upload_ended_ms: int | None, owner: str | None = None) -> bool:
+    held, params = _held(owner)
+    row = c.execute(
+        "UPDATE jobs SET status='done', posted_at=?, posted_ms=?, lease_owner=NULL, lease_expires_ms=NULL, "
+        "upload_ended_ms=COALESCE(?, upload_ended_ms) "
+        f"WHERE id=? AND status<>'done'{held} "
+        "RETURNING client, content_type, seen_ms, created_ms, eta_ms, upload_started_ms, upload_ended_ms",
+        (ms_to_iso(now), now, upload_ended_ms, job_id, *params),
+    ).fetchone()
+    if row:  # same transaction, so the counter can never drift from the jobs table
+        _bump_quota(c, row["client"], row["content_type"], client_day(row["client"], ms_to_dt(now)))
+        _record_latency(c, row, now)
+    return row is not None
+
+def _reschedule(c, job_id: int, eta_ms: int, reason: str | None, owner: str | None = None) -> int:
+    # reason is a real column now: one in-place UPDATE, no extras read-modify-write
+    held, params = _held(owner)
+    return c.execute(
+        "UPDATE jobs SET eta=?, eta_ms=?, status='queued', reschedule_reason=COALESCE(?, reschedule_reason), "
+        f"lease_owner=NULL, lease_expires_ms=NULL, upload_started_ms=NULL WHERE id=?{held}",
+        (ms_to_iso(eta_ms), eta_ms, reason, job_id, *params),
+    ).rowcount
+
+# throttled work: the blocked job plus everything queued behind it in the same scope
+# moves to the moment the limit frees up, in one statement (not one +1h retry per job)
+RESCHEDULE_SCOPE_SQL = (
+    "UPDATE jobs SET eta=?, eta_ms=?, reschedule_reason=? "
+    "WHERE status='queued' AND eta_ms < ?{scope}"
+)
+# a token bucket frees one post per interval, so its backlog is spread out instead: the
+# k-th job in claim order gets the k-th release time after the blocked job(s). A slot
+# at or past `closes` (the posting window's end) goes to `reopens` and is spread again there.
+_STAGGER_ETA = "CASE WHEN :eta + (:first + ROW_NUMBER() OVER w - 1) * :spacing < :closes " \
+               "THEN :eta + (:first + ROW_NUMBER() OVER w - 1) * :spacing ELSE :reopens END"
+RESCHEDULE_STAGGER_SQL = (
+    "UPDATE jobs SET eta_ms=s.eta_ms, "
+    "eta=strftime('%Y-%m-%dT%H:%M:%S', s.eta_ms / 1000, 'unixepoch') || printf('.%03d+00:00', s.eta_ms % 1000), "
+    "reschedule_reason=:reason "
+    f"FROM (SELECT id, {_STAGGER_ETA} AS eta_ms FROM jobs "
+    "      WHERE status='queued' AND eta_ms < :eta{scope} "
+    "      WINDOW w AS (ORDER BY rank_ms, eta_ms, id)) AS s "
+    "WHERE jobs.id = s.id"
+)
+
+def _reschedule_many(c, job_ids: tuple, eta_ms: int, reason: str | None,
+                     client: str | None, content_type: str | None, scoped: bool, owner: str | None,
+                     spacing_ms: int = 0, closes_ms: int | None = None, reopens_ms: int | None = None) -> int:
+    if owner and job_ids:
+        # a lease we no longer hold: touch nothing, the scope belongs to whoever has the job now
+        marks = ",".join("?" * len(job_ids))
+        held = c.execute(f"SELECT COUNT(*) FROM jobs WHERE id IN ({marks}){LEASE_HELD}", (*job_ids, owner))
+        if held.fetchone()[0] < len(job_ids):
+            return 0
+    n = 0
+    for k, job_id in enumerate(job_ids):
+        n += _reschedule(c, job_id, eta_ms + k * spacing_ms, reason, owner)
+    if scoped and spacing_ms:
+        scope, named = "", {"eta": eta_ms, "first": len(job_ids), "spacing": spacing_ms, "reason": reason,
+                            "closes": closes_ms or 2**62, "reopens": reopens_ms or 2**62}
+        if client:
+            scope += " AND client=:client"
+            named["client"] = client
+        if content_type:
+            scope += " AND content_type=:content_type"
+            named["content_type"] = content_type
+        n += c.execute(RESCHEDULE_STAGGER_SQL.format(scope=scope), named).rowcount
+    elif scoped:
+        scope, params = "", [ms_to_iso(eta_ms), eta_ms, reason, eta_ms]
+        if client:
+            scope += " AND client=?"
+            params.append(client)
+        if content_type:
+            scope += " AND content_type=?"
+            params.append(content_type)
+        n += c.execute(RESCHEDULE_SCOPE_SQL.format(scope=scope), params).rowcount
+    return n
+
+def _fail_job(c, job_id: int, error: str, retry_ms: int | None, reason: str | None,
+              owner: str | None = None) -> int:
+    held, params = _held(owner)
+    return c.execute(
+        "UPDATE jobs SET attempts=attempts+1, last_error=?, lease_owner=NULL, lease_expires_ms=NULL, upload_started_ms=NULL, "
+        "status=CASE WHEN ? IS NULL THEN 'failed' ELSE 'queued' END, "
+        "eta=COALESCE(?, eta), eta_ms=COALESCE(?, eta_ms), reschedule_reason=COALESCE(?, reschedule_reason) "
+        f"WHERE id=?{held}",
+        (error, retry_ms, ms_to_iso(retry_ms), retry_ms, reason, job_id, *params),
+    ).rowcount
+
+def _requeue_failed(c, client: str | None, eta_ms: int, reset_attempts: bool,
+                    job_ids: tuple, include_maybe_posted: bool) -> int:
+    sql = ("UPDATE jobs SET status='queued', eta=?, eta_ms=?, reschedule_reason='requeued', upload_started_ms=NULL"
+           + (", attempts=0" if reset_attempts else "") + " WHERE status='failed'")
+    params: list = [ms_to_iso(eta_ms), eta_ms]
+    if client:
+        sql += " AND client=?"
+        params.append(client)
+    if job_ids:
+        sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+        params.extend(job_ids)
+    if not include_maybe_posted:
+        sql += " AND reschedule_reason IS NOT 'maybe_posted'"
+    return c.execute(sql, params).rowcount
+
+def set_priority(job_id: int, priority: int) -> None:
+    with _conn() as c:
+        c.execute("UPDATE jobs SET priority=? WHERE id=?", (clamp_priority(priority), job_id))
+
+def mark_in_progress(job_id: int):
+    _write(_mark_in_progress, job_id, _now_ms() + LEASE_SEC * 1000)
+
+def mark_done(job_id: int, *, upload_ended_ms: int | None = None, owner: str | None = None) -> bool | None:
+    """Record the post. With owner: False if that lease was lost (None in async write mode)."""
+    # posted time is when we were told, not when committed
+    return _write(_mark_done, job_id, _now_ms(), upload_ended_ms, owner)
+
+def reschedule(job_id: int, new_eta: str|int|datetime, reason: str|None=None):
+    _write(_reschedule, job_id, to_ms(new_eta), reason)
+
+def fail_job(job_id: int, error: str, retry_at: str|int|datetime|None = None, reason: str | None = "retry",
+             *, owner: str | None = None) -> int | None:
+    """
+    Record a failed attempt: attempts+1 and last_error, then back to the queue at
+    retry_at, or dead-lettered (status 'failed') when retry_at is None. With owner, only
+    while that runner holds the lease; returns the rows changed (0 = lease lost, None
+    in async write mode).
+    """
+    return _write(_fail_job, job_id, error, to_ms(retry_at), reason if retry_at is not None else None, owner)
+
+def requeue_failed(client: str | None = None, eta: str|int|datetime|None = None, *, reset_attempts: bool = True,
+                   job_ids: Iterable[int] = (), include_maybe_posted: bool = False) -> int | None:
+    """
+    Put dead-lettered jobs back in the queue (all, one client's, or job_ids) at eta
+    (default now). Jobs held as maybe_posted (the runner died mid-upload, the post may be
+    live) are left alone unless include_maybe_posted: requeueing them can post twice.
+    """
+    return _write(_requeue_failed, client, to_ms(eta) or _now_ms(), reset_attempts,
+                  tuple(job_ids), include_maybe_posted)
+
+def reschedule_many(new_eta: str|int|datetime, reason: str|None = None, *, job_ids: Iterable[int] = (),
+                    client: str | None = None, content_type: str | None = None, scoped: bool = True,
+                    owner: str | None = None, spacing_ms: int = 0,
+                    closes_ms: int | None = None, reopens_ms: int | None = None) -> int | None:
+    """
+    Requeue job_ids at new_eta and, if scoped, move every queued job of `client`
+    (and `content_type`; None = all) due before new_eta to it as well, in one
+    transaction. With spacing_ms (a token bucket's interval) they are spread one
+    interval apart in claim order instead; a slot at or past closes_ms goes to
+    reopens_ms. With owner, nothing moves unless that runner still holds every
+    job_ids lease. Returns the number of rows moved (None in async write mode).
+    """
+    return _write(_reschedule_many, tuple(job_ids), to_ms(new_eta), reason, client, content_type, scoped, owner,
+                  int(spacing_ms), closes_ms, reopens_ms)
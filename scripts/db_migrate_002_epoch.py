@@ -0,0 +1,33 @@
+# scripts/db_migrate_002_epoch.py
+# Online migration: fill eta_ms / created_ms / posted_ms from the ISO text columns.
+# Safe to run while the watcher and runner are up: each batch is its own short
+# transaction. init_db() does the same backfill unpaced; use this on big DBs.
+from __future__ import annotations
+
+import argparse
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
+
+spec = importlib.util.spec_from_file_location("db", DB_PATH)
+db = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare db module spec"
+spec.loader.exec_module(db)  # type: ignore[attr-defined]
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Backfill integer epoch-ms timestamp columns in batches.")
+    ap.add_argument("--batch", type=int, default=1000, help="rows per transaction")
+    ap.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    args = ap.parse_args()
+
+    db.init_db(backfill=False)  # columns, indexes, triggers only
+    todo = db._conn().execute("SELECT COUNT(*) AS n FROM jobs WHERE eta_ms IS NULL").fetchone()["n"]
+    print(f"[migrate] rows to backfill: {todo}")
+    n = db.migrate_epoch(args.batch, args.pause, progress=lambda t: print(f"[migrate] {t}/{todo} rows"))
+    counters = db.rebuild_quota_usage()  # quota days come from posted_ms
+    print(f"[migrate] done: {n} rows backfilled, {counters} quota counter(s) rebuilt")
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ def main():
     print(f"Queued items: {len(rows)}\n")
     for r in rows:
         cap = r["caption"].replace("\n"," / ")
-        print(f"{r['id']:>4} | {r['eta']} | client={r['client']} | file={os.path.basename(r['path'])}")
+        print(f"{r['id']:>4} | {r.eta} | client={r['client']} | file={os.path.basename(r['path'])}")
         print(f"      ↳ {cap[:120]}{'...' if len(cap)>120 else ''}")
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+# scripts/event_archive.py
+# Cold tier for the job event log.
+#   archive: move old done jobs into job_events, then roll old events into
+#            exports/events/YYYY/MM/events-YYYY-MM-DD.jsonl.gz (one file per UTC day)
+#   report : event counts per client/event over both tiers (table + archive files)
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import importlib.util
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
+ARCHIVE_DIR = PROJECT_ROOT / "exports" / "events"
+
+spec = importlib.util.spec_from_file_location("db", DB_PATH)
+db = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare db module spec"
+spec.loader.exec_module(db)  # type: ignore[attr-defined]
+
+EVENT_COLS = ("id", "job_id", "client", "content_type", "event", "ts_ms", "data")
+
+def _day_file(day: str) -> Path:
+    return ARCHIVE_DIR / day[:4] / day[5:7] / f"events-{day}.jsonl.gz"
+
+def _utc_day(ts_ms: int) -> str:
+    return db.ms_to_dt(ts_ms).date().isoformat()
+
+def archive_events(older_than_days: float = 90, batch: int = 5000) -> int:
+    """
+    Append events older than the cutoff to their day file, then delete them from the
+    table. Written before the delete commits, so a crash can only duplicate lines
+    (readers skip repeated ids), never lose them.
+    """
+    cutoff = db._now_ms() - int(older_than_days * 86_400_000)
+    moved = 0
+    c = db._conn()
+    while True:
+        rows = c.execute(
+            f"SELECT {', '.join(EVENT_COLS)} FROM job_events WHERE ts_ms < ? ORDER BY ts_ms, id LIMIT ?",
+            (cutoff, batch),
+        ).fetchall()
+        if not rows:
+            break
+        by_day: dict[str, list[str]] = {}
+        for r in rows:
+            rec = dict(r)
+            rec["data"] = json.loads(rec["data"]) if rec["data"] else None
+            by_day.setdefault(_utc_day(r["ts_ms"]), []).append(json.dumps(rec, ensure_ascii=False))
+        for day, lines in by_day.items():
+            f = _day_file(day)
+            f.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(f, "at", encoding="utf-8") as fh:  # appends a new gzip member
+                fh.write("\n".join(lines) + "\n")
+        ids = [r["id"] for r in rows]
+        with c:
+            c.execute(f"DELETE FROM job_events WHERE id IN ({','.join('?' for _ in ids)})", ids)
+        moved += len(ids)
+    return moved
+
+def iter_events(since_ms: int | None = None, until_ms: int | None = None,
+                client: str | None = None) -> Iterator[dict]:
+    """Events in [since_ms, until_ms) from the archive files first, then the live table."""
+    seen: set[int] = set()
+    until_ms = until_ms or db._now_ms() + 1
+    since_ms = since_ms or 0
+
+    def keep(rec: dict) -> bool:
+        if rec["id"] in seen or not (since_ms <= rec["ts_ms"] < until_ms):
+            return False
+        if client and rec["client"] != client:
+            return False
+        seen.add(rec["id"])
+        return True
+
+    first_day = db.ms_to_dt(since_ms).date()
+    last_day = db.ms_to_dt(until_ms).date()
+    files = sorted(ARCHIVE_DIR.glob("*/*/events-*.jsonl.gz")) if ARCHIVE_DIR.exists() else []
+    for f in files:
+        day = datetime.strptime(f.name[len("events-"):-len(".jsonl.gz")], "%Y-%m-%d").date()
+        if not (first_day <= day <= last_day):
+            continue
+        with gzip.open(f, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    rec = json.loads(line)
+                    if keep(rec):
+                        yield rec
+
+    sql = f"SELECT {', '.join(EVENT_COLS)} FROM job_events WHERE ts_ms >= ? AND ts_ms < ?"
+    params: list = [since_ms, until_ms]
+    if client:
+        sql += " AND client = ?"
+        params.append(client)
+    for r in db._conn().execute(sql + " ORDER BY ts_ms, id", params):
+        rec = dict(r)
+        rec["data"] = json.loads(rec["data"]) if rec["data"] else None
+        if keep(rec):
+            yield rec
+
+def report(days: float, client: str | None) -> None:
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    counts: Counter = Counter()
+    for ev in iter_events(int(since.timestamp() * 1000), client=client):
+        counts[(ev["client"], ev["event"])] += 1
+    print(f"=== Job events since {since:%Y-%m-%d %H:%M} UTC ===")
+    if not counts:
+        print("(none)")
+    for (cl, ev), n in sorted(counts.items()):
+        print(f"{cl:<20} {ev:<12} {n}")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Archive and report on the job event log.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("archive", help="move old done jobs to events, and old events to exports/events/")
+    a.add_argument("--jobs-days", type=float, default=30, help="archive done jobs posted more than N days ago")
+    a.add_argument("--events-days", type=float, default=90, help="roll events older than N days into files")
+    r = sub.add_parser("report", help="event counts per client over the table and the archive files")
+    r.add_argument("--days", type=float, default=7)
+    r.add_argument("--client")
+    args = ap.parse_args()
+
+    db.init_db()
+    if args.cmd == "archive":
+        jobs = db.archive_done_jobs(args.jobs_days)
+        events = archive_events(args.events_days)
+        print(f"[archive] moved {jobs} done job(s) to job_events; rolled {events} event(s) into {ARCHIVE_DIR}")
+    else:
+        report(args.days, args.client)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# scripts/fair_scheduler.py
+# Deficit round-robin across clients, used by queue_runner.py --all-clients.
+# Each round a client with due work earns `weight` job credits; it may post that many
+# (whole) jobs, and unused credit carries over while it still has a backlog. A client
+# with 500 overdue jobs therefore gets its share per round, not the whole runner.
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, Tuple
+
+class DeficitRoundRobin:
+    def __init__(self, weights: Dict[str, float] | None = None, default_weight: float = 1.0):
+        self.default_weight = default_weight
+        self.weights: Dict[str, float] = {}
+        self.deficit: Dict[str, float] = {}
+        self._start = 0
+        self.set_weights(weights or {})
+
+    def set_weights(self, weights: Dict[str, float]) -> None:
+        """Replace the weights (config reload); bad or non-positive values fall back to the default."""
+        clean = {}
+        for client, w in weights.items():
+            try:
+                w = float(w)
+            except (TypeError, ValueError):
+                w = self.default_weight
+            clean[client] = w if w > 0 else self.default_weight
+        self.weights = clean
+        self.deficit = {c: d for c, d in self.deficit.items() if c in clean}
+
+    def round(self, active: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        """
+        Yield (client, allowance) for every client that has due work, starting one place
+        further along each round. Call charge() after serving each one.
+        """
+        order = sorted(active)
+        if not order:
+            return
+        self._start = (self._start + 1) % len(order)
+        for client in order[self._start:] + order[:self._start]:
+            self.deficit[client] = self.deficit.get(client, 0.0) + self.weights.get(client, self.default_weight)
+            yield client, int(self.deficit[client])
+
+    def charge(self, client: str, served: int, emptied: bool) -> None:
+        """Spend credit for jobs posted; a client that ran out of due work keeps no credit."""
+        self.deficit[client] = 0.0 if emptied else max(self.deficit.get(client, 0.0) - served, 0.0)
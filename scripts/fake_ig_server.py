@@ -0,0 +1,203 @@
+# scripts/fake_ig_server.py
+# Local stand-in for Instagram's upload endpoints, for load tests (uploaders.HttpUploader).
+#   GET  /rupload_ig{photo,video}/<entity>   -> {"offset": bytes already received}
+#   POST /rupload_ig{photo,video}/<entity>   one chunk; headers Offset, X-Entity-Length
+#   POST /api/v1/media/configure[_to_clips|_to_story]/   publish a finished upload
+#   GET  /stats                              counters (JSON)
+# It sleeps like the real thing (per-request latency, bandwidth per byte, configure /
+# "transcode" time per type) and misbehaves on purpose: per-account post rate and
+# parallel-upload limits answer 429 "Please wait a few minutes", and a share of
+# requests fail with 5xx or a challenge_required. Everything is in memory.
+#   python scripts/fake_ig_server.py --port 8765 --fail 0.02 --posts-per-min 30
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# configure time per type (ms): reels are "transcoded"
+CONFIGURE_MS = {"feed": 150, "weekly": 150, "stories": 100, "reels": 1500}
+RATE_LIMITED = {"message": "Please wait a few minutes before you try again.", "status": "fail"}
+
+class FakeInstagram:
+    def __init__(self, latency_ms: float = 30, bandwidth_mbps: float = 50, configure_scale: float = 1.0,
+                 fail: float = 0.0, challenge: float = 0.0, posts_per_min: float = 0,
+                 max_parallel: int = 1, seed: int = 1):
+        self.latency = latency_ms / 1000
+        self.bytes_per_sec = bandwidth_mbps * 1_000_000 / 8
+        self.configure_scale = configure_scale
+        self.fail, self.challenge = fail, challenge
+        self.posts_per_min, self.max_parallel = posts_per_min, max_parallel
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads: dict[str, list[int]] = {}          # entity -> [received, length, holds a slot]
+        self.active: dict[str, int] = defaultdict(int)    # account -> uploads in progress
+        self.posts: dict[str, list[float]] = defaultdict(list)
+        self.stats: dict[str, int] = defaultdict(int)
+        self.next_pk = 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rnd.random()
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+    # -- endpoints; each returns (status, body)
+    def offset(self, entity: str) -> tuple[int, dict]:
+        with self.lock:
+            got = self.uploads.get(entity)
+        return 200, {"offset": got[0] if got else 0}
+
+    def chunk(self, account: str, entity: str, offset: int, length: int, data: bytes) -> tuple[int, dict]:
+        with self.lock:
+            got = self.uploads.setdefault(entity, [0, length, 0])
+            if not got[2]:  # starting (or resuming) an upload: max_parallel per account
+                if self.active[account] >= self.max_parallel:
+                    self.stats["429_parallel"] += 1
+                    return 429, RATE_LIMITED
+                self.active[account] += 1
+                got[2] = 1
+            if offset != got[0]:  # out of order / replayed chunk: say where we are
+                self.stats["offset_mismatch"] += 1
+                return 200, {"offset": got[0]}
+        time.sleep(len(data) / self.bytes_per_sec)
+        r = self.roll()
+        if r < self.fail:
+            self.count("5xx")
+            return 503, {"message": "Service Unavailable", "status": "fail"}
+        with self.lock:
+            got[0] += len(data)
+            self.stats["bytes"] += len(data)
+            return 200, {"status": "ok", "upload_id": entity, "offset": got[0]}
+
+    def configure(self, account: str, kind: str, body: dict) -> tuple[int, dict]:
+        entity = str(body.get("upload_id"))
+        now = time.monotonic()
+        with self.lock:
+            got = self.uploads.get(entity)
+            if not got or got[0] < got[1]:
+                return 400, {"message": "upload not finished", "status": "fail"}
+            recent = [t for t in self.posts[account] if t > now - 60]
+            self.posts[account] = recent
+            if self.posts_per_min and len(recent) >= self.posts_per_min:
+                self.stats["429_rate"] += 1
+                return 429, RATE_LIMITED
+        time.sleep(CONFIGURE_MS.get(kind, 150) / 1000 * self.configure_scale)
+        r = self.roll()
+        if r < self.challenge:
+            self.count("challenge")
+            return 400, {"message": "challenge_required", "status": "fail"}
+        if r < self.challenge + self.fail:
+            self.count("5xx")
+            return 500, {"message": "Internal Server Error", "status": "fail"}
+        with self.lock:
+            self.posts[account].append(now)
+            if self.uploads.pop(entity)[2]:
+                self.active[account] -= 1
+            self.stats["posted"] += 1
+            self.stats[f"posted_{kind}"] += 1
+            pk, self.next_pk = self.next_pk, self.next_pk + 1
+        return 200, {"status": "ok", "media": {"pk": str(pk), "media_type": kind}}
+
+    def release(self, account: str, entity: str) -> None:
+        # a failed upload frees the account's parallel slot; the bytes stay for a resume
+        with self.lock:
+            got = self.uploads.get(entity)
+            if got and got[2]:
+                self.active[account] -= 1
+                got[2] = 0
+
+def make_handler(ig: FakeInstagram):
+    kinds = {"configure": "feed", "configure_to_clips": "reels", "configure_to_story": "stories"}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, fmt, *args):  # quiet: thousands of requests per run
+            pass
+
+        def _send(self, status: int, body: dict) -> None:
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            ig.count(f"http_{status}")
+
+        def do_GET(self):
+            time.sleep(ig.latency)
+            parts = self.path.strip("/").split("/")
+            if parts[0] in ("rupload_igphoto", "rupload_igvideo") and len(parts) == 2:
+                self._send(*ig.offset(parts[1]))
+            elif parts == ["stats"]:
+                with ig.lock:
+                    self._send(200, dict(ig.stats))
+            else:
+                self._send(404, {"message": "not found"})
+
+        def do_POST(self):
+            time.sleep(ig.latency)
+            data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            account = self.headers.get("X-IG-Account") or "anonymous"
+            parts = self.path.strip("/").split("/")
+            if parts[0] in ("rupload_igphoto", "rupload_igvideo") and len(parts) == 2:
+                status, body = ig.chunk(account, parts[1], int(self.headers.get("Offset") or 0),
+                                        int(self.headers.get("X-Entity-Length") or len(data)), data)
+                if status >= 500:
+                    ig.release(account, parts[1])
+            elif parts[:3] == ["api", "v1", "media"] and len(parts) == 4 and parts[3] in kinds:
+                try:
+                    req = json.loads(data or b"{}")
+                except ValueError:
+                    req = {}
+                status, body = ig.configure(account, req.get("kind") or kinds[parts[3]], req)
+                if status != 200:
+                    ig.release(account, str(req.get("upload_id")))
+            else:
+                status, body = 404, {"message": "not found"}
+            self._send(status, body)
+
+    return Handler
+
+def start(host: str = "127.0.0.1", port: int = 0, **cfg) -> tuple[ThreadingHTTPServer, FakeInstagram]:
+    """Serve in a background thread (port 0 = any free port; see server.server_address)."""
+    ig = FakeInstagram(**cfg)
+    server = ThreadingHTTPServer((host, port), make_handler(ig))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-ig", daemon=True).start()
+    return server, ig
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local stand-in for Instagram's upload API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=30, help="per request")
+    ap.add_argument("--bandwidth-mbps", type=float, default=50, help="per upload stream")
+    ap.add_argument("--configure-scale", type=float, default=1.0, help="multiplies CONFIGURE_MS")
+    ap.add_argument("--fail", type=float, default=0.0, help="share of chunk/configure calls answering 5xx")
+    ap.add_argument("--challenge", type=float, default=0.0, help="share of configure calls answering challenge_required")
+    ap.add_argument("--posts-per-min", type=float, default=0, help="per account; 0 = unlimited")
+    ap.add_argument("--max-parallel", type=int, default=1, help="uploads in progress per account before 429")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    server, ig = start(a.host, a.port, latency_ms=a.latency_ms, bandwidth_mbps=a.bandwidth_mbps,
+                       configure_scale=a.configure_scale, fail=a.fail, challenge=a.challenge,
+                       posts_per_min=a.posts_per_min, max_parallel=a.max_parallel, seed=a.seed)
+    print(f"[fake-ig] listening on http://{a.host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        with ig.lock:
+            print(f"[fake-ig] {dict(ig.stats)}")
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,7 @@ def main(client: str = "Luchiano") -> None:
     cur = conn.execute(
         """
         UPDATE jobs
-        SET eta = ?, status = 'queued', error = NULL
+        SET eta = ?, status = 'queued', last_error = NULL
         WHERE client = ? AND status = 'queued'
         """,
         (now, client),
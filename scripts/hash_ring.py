@@ -0,0 +1,47 @@
+# scripts/hash_ring.py
+# Consistent hashing of clients onto runner workers (runner_supervisor.py, queue_runner.py --shard).
+# Every worker builds the same ring from (worker count, VNODES) and keeps only the clients
+# that land on its own points, so no coordination is needed to agree on the split: a client
+# added with add_client.py lands on exactly one worker and nobody else's clients move.
+# Changing the worker count moves only ~1/N of the clients. Jobs are still claimed
+# under DB leases, so a client briefly served by two workers is never posted twice.
+from __future__ import annotations
+
+import bisect
+import hashlib
+from typing import Iterable
+
+VNODES = 64  # points per worker: keeps the split even with a handful of clients
+
+def _point(key: str) -> int:
+    # stable across processes and Python versions (unlike hash())
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    def __init__(self, workers: int, vnodes: int = VNODES):
+        if workers < 1:
+            raise ValueError("need at least one worker")
+        self.workers = workers
+        ring = sorted((_point(f"worker-{w}#{v}"), w) for w in range(workers) for v in range(vnodes))
+        self._points = [p for p, _ in ring]
+        self._owners = [w for _, w in ring]
+
+    def owner(self, client: str) -> int:
+        i = bisect.bisect(self._points, _point(client)) % len(self._points)
+        return self._owners[i]
+
+    def assign(self, clients: Iterable[str]) -> dict[int, list[str]]:
+        out: dict[int, list[str]] = {w: [] for w in range(self.workers)}
+        for c in sorted(clients):
+            out[self.owner(c)].append(c)
+        return out
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """'2/4' -> (2, 4): worker 2 of 4 (0-based)."""
+    try:
+        i, n = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like I/N, got {value!r}") from None
+    if not 0 <= i < n:
+        raise ValueError(f"shard {value!r}: need 0 <= I < N")
+    return i, n
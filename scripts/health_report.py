@@ -1,12 +1,28 @@
 # C:\autoposter\scripts\health_report.py
 from __future__ import annotations
-import sqlite3, json
+import sqlite3
+import importlib.util
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 
 ROOT = Path(__file__).resolve().parents[1]
 DB = ROOT / "data" / "autoposter.db"
 
+# histogram SQL / percentile math only; this report keeps its own read connection
+_spec = importlib.util.spec_from_file_location("db", ROOT / "scripts" / "db.py")
+db = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(db)  # type: ignore[union-attr]
+
+LATENCY_HOURS = 24
+
+# Checked by scripts/check_query_plans.py. The ids come from two index range scans
+# (idx_jobs_posted / idx_jobs_eta); the plain OR form walked the table by id.
+RECENT_SQL = (
+    "SELECT id,client,content_type,status,posted_at,eta,path,reschedule_reason FROM jobs "
+    "WHERE id IN (SELECT id FROM jobs WHERE posted_ms>=? UNION SELECT id FROM jobs WHERE eta_ms>=?) "
+    "ORDER BY id DESC LIMIT 50"
+)
+
 def main():
     con = sqlite3.connect(DB); con.row_factory = sqlite3.Row
     try:
@@ -14,27 +30,53 @@ def main():
             SELECT client,
                    SUM(CASE WHEN status='queued' THEN 1 ELSE 0 END) as queued,
                    SUM(CASE WHEN status='in_progress' THEN 1 ELSE 0 END) as in_progress,
-                   SUM(CASE WHEN status='done' THEN 1 ELSE 0 END) as done
+                   SUM(CASE WHEN status='done' THEN 1 ELSE 0 END) as done,
+                   SUM(CASE WHEN status='failed' THEN 1 ELSE 0 END) as failed
             FROM jobs
             GROUP BY client
             ORDER BY client
         """).fetchall()
         print("=== Queue Summary ===")
         for r in rows:
-            print(f"{r['client']}: queued={r['queued'] or 0}, in_progress={r['in_progress'] or 0}, done={r['done'] or 0}")
+            print(f"{r['client']}: queued={r['queued'] or 0}, in_progress={r['in_progress'] or 0}, done={r['done'] or 0}, failed={r['failed'] or 0}")
+
+        print("\n=== Runners ===")
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        try:
+            runners = con.execute("SELECT runner_id, serving, heartbeat_ms FROM runners ORDER BY heartbeat_ms DESC").fetchall()
+        except sqlite3.OperationalError:  # DB from before runner heartbeats
+            runners = []
+        for r in runners:
+            age = (now_ms - r['heartbeat_ms']) / 1000
+            print(f"{r['runner_id']} ({r['serving']}): last heartbeat {age:.0f}s ago{'  <-- STALE' if age > 120 else ''}")
+        if not runners:
+            print("(none running)")
+
+        print(f"\n=== Latency, last {LATENCY_HOURS}h (ms; p50 / p95 / p99, n) ===")
+        since = now_ms - LATENCY_HOURS * 3_600_000
+        try:
+            hist = con.execute(db.LATENCY_SQL, (since - since % 3_600_000,)).fetchall()
+        except sqlite3.OperationalError:  # DB from before latency histograms
+            hist = []
+        groups = {}
+        for r in hist:
+            groups.setdefault((r['client'], r['content_type']), {}).setdefault(r['metric'], []).append((r['bucket'], r['n']))
+        for (client, ctype), metrics in groups.items():
+            cells = []
+            for m in db.LATENCY_METRICS:
+                b = metrics.get(m)
+                if b:
+                    p = [db.hist_percentile(b, q) for q in (50, 95, 99)]
+                    cells.append(f"{m} {p[0]} / {p[1]} / {p[2]} (n={sum(n for _, n in b)})")
+            print(f"{client}/{ctype}: " + "  |  ".join(cells))
+        if not groups:
+            print("(no posts yet)")
 
         print("\n=== Recent Activity (last 24h) ===")
-        since = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-        rows = con.execute("SELECT id,client,content_type,status,posted_at,eta,path,extras FROM jobs WHERE posted_at>=? OR eta>=? ORDER BY id DESC LIMIT 50",
-                           (since, since)).fetchall()
+        since = int((datetime.now(timezone.utc) - timedelta(hours=24)).timestamp() * 1000)
+        rows = con.execute(RECENT_SQL, (since, since)).fetchall()
         for r in rows:
-            ex = {}
-            try:
-                if r["extras"]: ex = json.loads(r["extras"])
-            except Exception:
-                pass
-            reason = ex.get("reschedule_reason")
-            print(f"#{r['id']} {r['client']}/{r['content_type']} {r['status']} eta={r['eta']} posted_at={r['posted_at']} file={Path(r['path']).name} reason={reason}")
+            print(f"#{r['id']} {r['client']}/{r['content_type']} {r['status']} eta={r['eta']} posted_at={r['posted_at']} file={Path(r['path']).name} reason={r['reschedule_reason']}")
     finally:
         con.close()
 
@@ -0,0 +1,296 @@
+# scripts/metrics.py
+# In-process metrics for the watcher (main.py) and the runner, served on loopback:
+#   GET http://127.0.0.1:<port>/metrics       Prometheus text format
+#   GET http://127.0.0.1:<port>/metrics.json  the same numbers as JSON (status.py reads this)
+# Ports: watcher 9108, runner 9109 (queue_runner.py --metrics-port), overridable with
+# $AUTOPOSTER_WATCHER_METRICS_PORT / $AUTOPOSTER_RUNNER_METRICS_PORT; 0 turns it off.
+# A scrape only reads memory: counters/histograms are updated by the process as it works,
+# and the queue depth gauge comes from a background sampler that re-counts (indexed,
+# per status) only after PRAGMA data_version says some connection committed.
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Tuple
+
+WATCHER_PORT = 9108
+RUNNER_PORT = 9109
+# seconds; DB calls and uploads
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RATE_WINDOW = 60  # *_per_min gauges look this many seconds back
+DEPTH_STATUSES = ("queued", "in_progress", "failed")  # 'done' only grows; see uploads_total
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(kw: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kw.items()))
+
+def _fmt(name: str, labels: Labels, extra: Labels = ()) -> str:
+    lab = labels + extra
+    if not lab:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in lab) + "}"
+
+class _Hist:
+    __slots__ = ("counts", "sum", "n")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.n = 0
+
+class Registry:
+    def __init__(self, process: str):
+        self.process = process
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, _Hist]] = {}
+        self._gauge_fns: Dict[str, Callable[[], float | None]] = {}
+        self._rates: Dict[str, deque] = {}  # name -> per-second (second, count) buckets
+        self.help: Dict[str, str] = {}
+
+    # -- updates (cheap; called from hot paths)
+    def inc(self, name: str, n: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            d = self._counters.setdefault(name, {})
+            d[key] = d.get(key, 0) + n
+            ring = self._rates.get(name)
+            if ring is not None:
+                sec = int(time.monotonic())
+                if ring and ring[-1][0] == sec:
+                    ring[-1][1] += n
+                else:
+                    ring.append([sec, n])
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def replace(self, name: str, values: Dict[Labels, float]) -> None:
+        """Swap a whole labelled gauge at once (rows that disappeared must not linger)."""
+        with self._lock:
+            self._gauges[name] = dict(values)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            h = self._hists.setdefault(name, {}).get(key)
+            if h is None:
+                h = self._hists[name][key] = _Hist()
+            for i, b in enumerate(BUCKETS):
+                if seconds <= b:
+                    h.counts[i] += 1
+                    break
+            h.sum += seconds
+            h.n += 1
+
+    def gauge_fn(self, name: str, fn: Callable[[], float | None], help: str = "") -> None:
+        """A gauge computed at scrape time (must be cheap: no SQLite)."""
+        self._gauge_fns[name] = fn
+        if help:
+            self.help[name] = help
+
+    def track_rate(self, name: str) -> None:
+        """Also expose <name>_per_min: increments of counter `name` over the last RATE_WINDOW s."""
+        self._rates.setdefault(name, deque(maxlen=RATE_WINDOW + 1))
+
+    def timed(self, name: str, fn: Callable, **labels) -> Callable:
+        def wrapper(*a, **kw):
+            t = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                self.observe(name, time.perf_counter() - t, **labels)
+        wrapper.__wrapped__ = fn  # type: ignore[attr-defined]
+        return wrapper
+
+    def instrument(self, module, names: Iterable[str], metric: str = "db_call_seconds") -> None:
+        """Replace module.<name> with a timed wrapper for each name (labelled op=<name>)."""
+        for n in names:
+            setattr(module, n, self.timed(metric, getattr(module, n), op=n))
+
+    # -- reads
+    def snapshot(self) -> dict:
+        now = int(time.monotonic())
+        with self._lock:
+            counters = {n: dict(d) for n, d in self._counters.items()}
+            gauges = {n: dict(d) for n, d in self._gauges.items()}
+            hists = {n: {k: (list(h.counts), h.sum, h.n) for k, h in d.items()} for n, d in self._hists.items()}
+            for name, ring in self._rates.items():
+                gauges[f"{name}_per_min"] = {(): sum(c for s, c in ring if s > now - RATE_WINDOW)}
+        for name, fn in self._gauge_fns.items():
+            try:
+                v = fn()
+            except Exception:
+                v = None
+            if v is not None:
+                gauges[name] = {(): v}
+        gauges["process_uptime_seconds"] = {(): round(time.time() - self.started, 1)}
+        return {"counters": counters, "gauges": gauges, "histograms": hists}
+
+    def prometheus(self) -> str:
+        snap = self.snapshot()
+        out = []
+        pre = "autoposter_"
+        proc = (("process", self.process),)
+        for name, d in sorted(snap["counters"].items()):
+            out.append(f"# TYPE {pre}{name} counter")
+            out += [f"{_fmt(pre + name, proc + k)} {v:g}" for k, v in sorted(d.items())]
+        for name, d in sorted(snap["gauges"].items()):
+            if name in self.help:
+                out.append(f"# HELP {pre}{name} {self.help[name]}")
+            out.append(f"# TYPE {pre}{name} gauge")
+            out += [f"{_fmt(pre + name, proc + k)} {v:g}" for k, v in sorted(d.items())]
+        for name, d in sorted(snap["histograms"].items()):
+            out.append(f"# TYPE {pre}{name} histogram")
+            for k, (counts, total, n) in sorted(d.items()):
+                cum = 0
+                for b, c in zip(BUCKETS, counts):
+                    cum += c
+                    out.append(f"{_fmt(pre + name + '_bucket', proc + k, (('le', f'{b:g}'),))} {cum}")
+                out.append(f"{_fmt(pre + name + '_bucket', proc + k, (('le', '+Inf'),))} {n}")
+                out.append(f"{_fmt(pre + name + '_sum', proc + k)} {total:.6f}")
+                out.append(f"{_fmt(pre + name + '_count', proc + k)} {n}")
+        return "\n".join(out) + "\n"
+
+    def as_json(self) -> dict:
+        snap = self.snapshot()
+
+        def flat(d):
+            return {",".join(f"{a}={b}" for a, b in k) or "_": v for k, v in d.items()}
+        hists = {}
+        for name, d in snap["histograms"].items():
+            hists[name] = {}
+            for k, (counts, total, n) in d.items():
+                hists[name][",".join(f"{a}={b}" for a, b in k) or "_"] = {
+                    "count": n, "mean_ms": round(total / n * 1000, 3) if n else 0,
+                    "p95_le_ms": _bucket_pct(counts, n, 95),
+                }
+        return {"process": self.process, "pid": os.getpid(),
+                "counters": {n: flat(d) for n, d in snap["counters"].items()},
+                "gauges": {n: flat(d) for n, d in snap["gauges"].items()},
+                "histograms": hists}
+
+def _bucket_pct(counts: list[int], n: int, p: float) -> float | None:
+    # upper bound (ms) of the bucket holding the p-th percentile; None past the last bucket
+    seen = 0
+    for b, c in zip(BUCKETS, counts):
+        seen += c
+        if n and seen >= p / 100 * n:
+            return b * 1000
+    return None
+
+# ----- process gauges
+def rss_bytes() -> int | None:
+    """Current resident set size (not the peak)."""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PMC(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            pmc = PMC()
+            pmc.cb = ctypes.sizeof(PMC)
+            h = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(h, ctypes.byref(pmc), pmc.cb):
+                return int(pmc.WorkingSetSize)
+        except Exception:
+            return None
+    try:
+        import resource  # macOS and friends: peak only
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+# ----- queue depth sampler
+QUEUE_DEPTH_SQL = "SELECT client, COUNT(*) AS n FROM jobs WHERE status=? GROUP BY client"
+
+def sample_queue_depth(reg: Registry, db, stop: threading.Event, every: float = 2.0) -> None:
+    """Background thread: refresh queue_depth{client,status} when the DB changed."""
+    version = None
+    while not stop.is_set():
+        try:
+            v = db.data_version()
+            if v != version:
+                version = v
+                c = db._conn()
+                depth: Dict[Labels, float] = {}
+                for status in DEPTH_STATUSES:
+                    for r in c.execute(QUEUE_DEPTH_SQL, (status,)):
+                        depth[(("client", r["client"]), ("status", status))] = r["n"]
+                reg.replace("queue_depth", depth)
+        except Exception as e:  # locked / missing DB: keep the old numbers
+            reg.inc("metrics_sampler_errors_total", error=type(e).__name__)
+        stop.wait(every)
+
+# ----- server
+def port_for(process: str, default: int) -> int:
+    """$AUTOPOSTER_<PROCESS>_METRICS_PORT or the default; 0 turns the endpoint off."""
+    return int(os.environ.get(f"AUTOPOSTER_{process.upper()}_METRICS_PORT") or default)
+
+def _handler(reg: Registry):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body, ctype = reg.prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body, ctype = json.dumps(reg.as_json()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return Handler
+
+def serve(reg: Registry, port: int, db=None, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    """
+    Start the endpoint (and the queue depth sampler if `db` is given) in daemon threads.
+    Loopback only. Returns None if the port is taken (e.g. a second runner): the process
+    runs on without metrics rather than failing.
+    """
+    reg.gauge_fn("process_resident_memory_bytes", rss_bytes, "current RSS")
+    try:
+        server = ThreadingHTTPServer((host, port), _handler(reg))
+    except OSError as e:
+        print(f"[metrics] port {port} unavailable ({e}); metrics endpoint off")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    if db is not None:
+        stop = threading.Event()
+        threading.Thread(target=sample_queue_depth, args=(reg, db, stop), name="metrics-depth", daemon=True).start()
+    return server
+
+def fetch(port: int, host: str = "127.0.0.1", timeout: float = 1.0) -> dict | None:
+    """metrics.json from a running process, or None if nothing answers."""
+    import urllib.request
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=timeout) as r:
+            return json.loads(r.read())
+    except (OSError, ValueError):
+        return None
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, os
+import os, importlib.util
 from pathlib import Path
 from instagrapi import Client
 
@@ -9,19 +9,23 @@ CLIENTS_DIR = CONFIG_DIR / "clients"
 SESS_DIR = CONFIG_DIR / "sessions"
 SESS_DIR.mkdir(parents=True, exist_ok=True)
 
+_spec = importlib.util.spec_from_file_location("config_service", ROOT / "scripts" / "config_service.py")
+config_service = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(config_service)  # type: ignore[union-attr]
+
 def _cfg_path(client: str) -> Path:
     return CLIENTS_DIR / client / "client.json"
 
-def _load_cfg(client: str) -> dict:
-    return json.loads(_cfg_path(client).read_text(encoding="utf-8"))
+def _load_cfg(client: str):
+    return config_service.client(client)
 
 def _sess_file(client: str) -> Path:
     return SESS_DIR / f"{client}.json"
 
 def _build_client(client: str) -> Client:
     cfg = _load_cfg(client)
-    user = cfg.get("IG_USERNAME")
-    pw   = cfg.get("IG_PASSWORD")
+    user = cfg.ig_username
+    pw   = cfg.ig_password
     if not (user and pw):
         raise RuntimeError(f"Missing IG_USERNAME/IG_PASSWORD in {_cfg_path(client)}")
 
@@ -75,7 +75,7 @@ def summarize_jobs(db, client: str) -> str:
     done = counts.get("done", 0)
 
     err = conn.execute(
-        "SELECT COUNT(*) AS c FROM jobs WHERE client=? AND error IS NOT NULL AND error <> ''",
+        "SELECT COUNT(*) AS c FROM jobs WHERE client=? AND last_error IS NOT NULL AND last_error <> ''",
         (client,),
     ).fetchone() or {"c": 0}
     errors = int(err["c"])
@@ -119,8 +119,8 @@ def main():
     # Key config fields
     cfg = chk["cfg"]
     if cfg:
-        mpd = (cfg.get("max_per_day") or {})
-        print(f"[pre-demo] Config: max_per_day keys -> {list(mpd.keys())}")
+        quotas = cfg.get("quotas") or cfg.get("max_per_day") or {}
+        print(f"[pre-demo] Config: quotas -> {quotas}")
     else:
         print("[pre-demo] Config: (missing or invalid)")
 
@@ -0,0 +1,220 @@
+# scripts/prefetch.py
+# Look-ahead stage for the runner: while uploads are in flight, a background thread takes
+# the queued jobs due in the next --prefetch-window seconds and gets their media ready:
+# stat, check it is what the content type needs (extension, magic bytes, size), and read
+# it once to hash it, which also leaves it in the OS page cache. When the job's turn
+# comes, process_job takes the result instead of doing that work inline, and a broken
+# file fails the job before any upload starts.
+# Bounded twice: at most `max_jobs` jobs per look-ahead, and at most `budget_mb` of file
+# data read ahead and not yet taken. Nothing but the small Media records is held in
+# process memory; the budget is there so a look-ahead over big reels doesn't push the
+# upload in flight out of the cache.
+# There is no transcoder in this tree, so nothing is re-encoded here.
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import zip_longest
+from pathlib import Path
+from typing import Callable
+
+WINDOW_SEC = 300
+MAX_JOBS = 16
+BUDGET_MB = 256
+POLL_SEC = 2.0
+READ_CHUNK = 1 << 20
+
+PHOTO_EXT = {".jpg", ".jpeg", ".png"}
+VIDEO_EXT = {".mp4", ".mov"}
+MAX_BYTES = {"photo": 30 << 20, "video": 4 << 30}
+# container atoms a .mp4/.mov can start with (after the 4-byte size)
+VIDEO_ATOMS = (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip")
+
+class MediaError(ValueError):
+    """The file can't be posted as this content type (retry.classify: permanent)."""
+
+class Media:
+    __slots__ = ("path", "size", "mtime_ns", "sha1", "warmed", "error", "prefetched")
+
+    def __init__(self, path: str, size: int = 0, mtime_ns: int = 0, sha1: str | None = None,
+                 warmed: bool = False, error: Exception | None = None, prefetched: bool = False):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha1 = sha1
+        self.warmed = warmed
+        self.error = error
+        self.prefetched = prefetched
+
+    def unchanged(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return self.error is not None
+        return (st.st_size, st.st_mtime_ns) == (self.size, self.mtime_ns)
+
+def _check(path: str, kind: str, size: int, head: bytes) -> None:
+    ext = Path(path).suffix.lower()
+    if size == 0:
+        raise MediaError(f"empty file: {Path(path).name}")
+    if ext in VIDEO_EXT:
+        media = "video"
+        if head[4:8] not in VIDEO_ATOMS:
+            raise MediaError(f"not a video container: {Path(path).name}")
+    elif ext in PHOTO_EXT:
+        media = "photo"
+        if kind == "reels":
+            raise MediaError(f"reels need a video: {Path(path).name}")
+        if not (head.startswith(b"\xff\xd8\xff") or head.startswith(b"\x89PNG\r\n\x1a\n")):
+            raise MediaError(f"not a JPEG/PNG: {Path(path).name}")
+    else:
+        raise MediaError(f"unsupported file type {ext or '(none)'}: {Path(path).name}")
+    if size > MAX_BYTES[media]:
+        raise MediaError(f"{media} too large ({size / (1 << 20):.0f} MB): {Path(path).name}")
+
+def inspect(path: str, kind: str, *, warm: bool = False) -> Media:
+    """
+    Stat and validate one file. With warm=True it is also read end to end for its sha1,
+    which pulls it into the page cache. Errors are returned in Media.error, not raised.
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return Media(path, error=e)
+    m = Media(path, st.st_size, st.st_mtime_ns)  # kept on errors too: a fixed file is re-checked
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+            _check(path, kind, st.st_size, head)
+            if warm:
+                h = hashlib.sha1(head)
+                for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                    h.update(chunk)
+                m.sha1, m.warmed = h.hexdigest(), True
+    except (OSError, MediaError) as e:  # IsADirectoryError, PermissionError, ...
+        m.error = e
+    return m
+
+class Prefetcher:
+    """
+    Background look-ahead over db.get_due_jobs(). clients() lists the clients this runner
+    serves. take(job) hands over the prepared Media, or inspects inline on a miss.
+    """
+    def __init__(self, db, clients: Callable[[], list], window_sec: float = WINDOW_SEC,
+                 max_jobs: int = MAX_JOBS, budget_mb: float = BUDGET_MB):
+        self.db = db
+        self.clients = clients
+        self.window_ms = int(window_sec * 1000)
+        self.max_jobs = max_jobs
+        self.budget = int(budget_mb * (1 << 20))
+        self._ready: "OrderedDict[int, Media]" = OrderedDict()
+        self._wanted: dict[int, float] = {}  # job id -> last pass that still listed it
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # set by take(): a job left, look further ahead now
+        self._thread: threading.Thread | None = None
+        self.hits = self.misses = 0
+
+    # -- background side
+    def start(self) -> "Prefetcher":
+        self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.fill()
+            except Exception as e:  # locked DB, vanished share: try again next poll
+                print(f"[prefetch] {e}")
+            self._wake.wait(POLL_SEC)
+            self._wake.clear()
+
+    def _upcoming(self) -> list:
+        # Per client, in the order the runner will claim: what is due now (the claim query,
+        # priority lanes first), then what becomes due within the window. Each account's
+        # queue is worked a slot at a time, so clients are interleaved -- every client's
+        # next job before anyone's second -- and one big backlog can't fill the look-ahead.
+        now = self.db._now_ms()
+        clients = self.clients()
+        per_client = max(2, self.max_jobs // max(len(clients), 1))
+        queues = []
+        for c in clients:
+            jobs = self.db.get_due_jobs(per_client, c, now)
+            if len(jobs) < per_client:
+                have = {j.id for j in jobs}
+                later = self.db.get_due_jobs(per_client, c, now + self.window_ms)
+                jobs += [j for j in later if j.id not in have]
+            queues.append(jobs[:per_client])
+        return [j for rank in zip_longest(*queues) for j in rank if j is not None][:self.max_jobs]
+
+    def fill(self) -> int:
+        """One pass: forget jobs gone for a whole window, prepare new ones. Returns how many."""
+        rows = self._upcoming()
+        now = time.monotonic()
+        with self._lock:
+            for r in rows:
+                self._wanted[r.id] = now
+            # a claimed job leaves the query but may still wait for its account's slot;
+            # one that was rescheduled away or posted elsewhere expires here
+            stale = now - self.window_ms / 1000
+            for jid in [j for j in self._ready if self._wanted.get(j, 0) < stale]:
+                self._forget(jid)
+        done = 0
+        for r in rows:
+            if self._stop.is_set():
+                break
+            with self._lock:
+                if r.id in self._ready:
+                    continue
+                room = self.budget - self._bytes
+            try:
+                size = os.path.getsize(r.path)
+            except OSError:
+                size = 0
+            # warm only what fits; later (or oversized) files are still validated
+            m = inspect(r.path, r.content_type, warm=0 < size <= room)
+            m.prefetched = True
+            with self._lock:
+                self._ready[r.id] = m
+                if m.warmed:
+                    self._bytes += m.size
+            done += 1
+        return done
+
+    def _forget(self, job_id: int) -> Media | None:
+        self._wanted.pop(job_id, None)
+        m = self._ready.pop(job_id, None)
+        if m is not None and m.warmed:
+            self._bytes -= m.size
+        return m
+
+    # -- upload side
+    def take(self, job) -> Media:
+        """The job's Media (prepared, or inspected now); raises its error if the file is bad."""
+        with self._lock:
+            m = self._forget(job.id)
+            hit = m is not None and m.path == job.path and m.unchanged()
+            self.hits += hit
+            self.misses += not hit
+        self._wake.set()
+        if not hit:
+            m = inspect(job.path, job.content_type)
+        if m.error:
+            raise m.error
+        return m
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ready": len(self._ready), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
@@ -37,7 +37,7 @@ def main(client: str = "Luchiano") -> None:
 
     print("DUE JOBS:")
     for r in jobs:
-        print(f"  id={r['id']} type={r['content_type']} eta={r['eta']} status={r['status']} path={r['path']}")
+        print(f"  id={r['id']} type={r['content_type']} eta={r.eta} status={r['status']} path={r['path']}")
 
 if __name__ == "__main__":
     main("Luchiano")
@@ -1,22 +1,18 @@
 # C:\autoposter\scripts\purge_done.py
+# Moves old done jobs out of the hot jobs table into the job_events log instead of
+# deleting them (history survives; see scripts/event_archive.py for the file tier).
 from __future__ import annotations
-import sqlite3
+import importlib.util
 from pathlib import Path
-from datetime import datetime, timezone, timedelta
 
 ROOT = Path(__file__).resolve().parents[1]
-DB = ROOT / "data" / "autoposter.db"
+spec = importlib.util.spec_from_file_location("db", str(ROOT / "scripts" / "db.py"))
+db = importlib.util.module_from_spec(spec); spec.loader.exec_module(db)  # type: ignore
 
 def main(days=30):
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    con = sqlite3.connect(DB)
-    try:
-        cur = con.cursor()
-        cur.execute("DELETE FROM jobs WHERE status='done' AND posted_at IS NOT NULL AND posted_at < ?", (cutoff.isoformat(),))
-        print(f"Deleted {cur.rowcount} old done rows (< {cutoff.isoformat()})")
-        con.commit()
-    finally:
-        con.close()
+    db.init_db()
+    moved = db.archive_done_jobs(days)
+    print(f"Archived {moved} done rows older than {days} days into job_events")
 
 if __name__ == "__main__":
     main()
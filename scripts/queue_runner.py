@@ -3,113 +3,397 @@ from __future__ import annotations
 
 import os
 import argparse
-import json
-from typing import Dict, Any, Optional
+import functools
+import heapq
+import threading
+import time as _time
+from typing import Callable, Dict, Optional
 from pathlib import Path
 import importlib.util
 
-# ----- Load db.py directly by path
+# ----- Load sibling scripts directly by path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
-DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
 
-spec = importlib.util.spec_from_file_location("db", DB_PATH)
-db = importlib.util.module_from_spec(spec)
-assert spec and spec.loader, "Failed to prepare db module spec"
-spec.loader.exec_module(db)  # type: ignore[attr-defined]
+def _load(name: str, **names):
+    """scripts/<name>.py as a module; `names` are set in its globals before it runs."""
+    spec = importlib.util.spec_from_file_location(name, PROJECT_ROOT / "scripts" / f"{name}.py")
+    mod = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, f"Failed to prepare {name} module spec"
+    mod.__dict__.update(names)
+    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    return mod
 
-CLIENTS_DIR = PROJECT_ROOT / "config" / "clients"
+db = _load("db")
+fair_scheduler = _load("fair_scheduler")
+DeficitRoundRobin = fair_scheduler.DeficitRoundRobin
+upload_pool = _load("upload_pool")
+UploadPool = upload_pool.UploadPool
+ratelimit = _load("ratelimit", db=db)  # one db module per process: shared connections and group-commit writer
+retry = _load("retry")
+uploaders = _load("uploaders")
+hash_ring = _load("hash_ring")
+prefetch = _load("prefetch")
+metrics = _load("metrics")
 
-def load_client_config(client: str) -> Dict[str, Any]:
-    p = CLIENTS_DIR / client / "client.json"
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-def today_quota_used(conn, client: str, content_type: str) -> int:
-    row = conn.execute(
-        """
-        SELECT COUNT(*) AS c
-        FROM jobs
-        WHERE client = ? AND content_type = ? AND status = 'done'
-          AND date(created_at) = date('now')
-        """,
-        (client, content_type),
-    ).fetchone()
-    return int((row or {"c": 0})["c"] or 0)
-
-def should_throttle(conn, client: str, content_type: str, cfg: Dict[str, Any]) -> Optional[str]:
+CONFIG = db.config_service.CONFIG
+ClientConfig = db.config_service.ClientConfig
+
+def load_client_config(client: str) -> ClientConfig:
+    # served from memory; re-parsed only after client.json (or schedule/client_limits) changes
+    return CONFIG.client(client)
+
+LIMITER = ratelimit.RateLimiter()
+
+def should_throttle(conn, client: str, content_type: str, cfg: ClientConfig) -> Optional[ratelimit.Blocked]:
+    """Take a post from the client's limits; a Blocked (with the exact retry time) if it can't go now."""
     if os.environ.get("IGNORE_QUOTA") == "1":
         return None
-    max_per_day = (cfg.get("max_per_day") or {}).get(content_type)
-    if not max_per_day:
-        return None
-    used = today_quota_used(conn, client, content_type)
+    return LIMITER.acquire(client, content_type, cfg)
+
+# --uploader picks the backend in main(); --dry-run always uses DRY
+DRY = uploaders.DryUploader()
+UPLOADER: uploaders.Uploader = DRY
+# --daemon with a real uploader: media of jobs due soon is validated and read ahead
+PREFETCH: Optional[prefetch.Prefetcher] = None
+
+# served by main() --daemon on --metrics-port; counters are kept either way
+METRICS = metrics.Registry("runner")
+METRICS.track_rate("uploads_total")
+# timed as db_call_seconds{op=...}
+DB_CALLS = ("claim_due_jobs", "renew_lease", "mark_upload_started", "mark_done", "fail_job", "reschedule_many",
+            "upcoming_etas", "get_due_jobs", "heartbeat", "release_expired_leases", "release_lease",
+            "data_version")
+
+def runner_id() -> str:
+    import socket
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def current_client() -> Optional[str]:
+    # set by switch_client.bat; lets start_runner.bat / start_all.bat run without --client
+    return CONFIG.current_client()
+
+def process_job(conn, job, cfg: ClientConfig, dry_run: bool) -> None:
+    jid, client, kind, path, caption = job.id, job.client, job.content_type, job.path, job.caption
+    owner = job.lease_owner
+
+    # lease first: a runner whose job was swept and re-claimed while it sat in the pool must
+    # not spend the account's budget on it, nor move it under the runner uploading it now
+    if not db.renew_lease(jid, owner):
+        print(f"[runner] job#{jid} lease lost while queued; skipped")
+        return
+    blocked = should_throttle(conn, client, kind, cfg)
+    if blocked:
+        # one exact re-time for this job and everything queued behind the same limit
+        until = LIMITER.next_slot(client, kind, cfg, blocked.until_ms)
+        if blocked.client is None:
+            # egress: every client waits for the shared budget, but only until it frees up;
+            # this account's own limits and posting window move this job alone
+            moved = db.reschedule_many(until, blocked.kind, job_ids=(jid,), scoped=False, owner=owner)
+            if moved:
+                moved += db.reschedule_many(blocked.until_ms, blocked.kind) or 0
+        elif blocked.kind == "rate":
+            # the bucket frees one post per interval: spread the backlog over those, so each
+            # job is re-timed once instead of all of them racing for every single token
+            spacing = ratelimit.HOUR_MS / ratelimit.account_limits(cfg, kind).per_hour
+            closes = ratelimit.window_close_ms(cfg, until)
+            reopens = closes and LIMITER.next_slot(client, kind, cfg, closes)
+            moved = db.reschedule_many(until, blocked.kind, job_ids=(jid,), client=blocked.client,
+                                       owner=owner, spacing_ms=spacing, closes_ms=closes, reopens_ms=reopens)
+        else:
+            moved = db.reschedule_many(until, blocked.kind, job_ids=(jid,), client=blocked.client,
+                                       content_type=blocked.content_type, owner=owner)
+        if moved == 0:
+            print(f"[runner] job#{jid} lease lost before reschedule; left to its new runner")
+            return
+        more = f" (+{moved - 1} queued behind it)" if moved and moved > 1 else ""
+        METRICS.inc("throttled_total", client=client, reason=blocked.kind)
+        print(f"[runner] {blocked.detail}. Rescheduled job#{jid}{more} -> {db.ms_to_iso(until)}")
+        return
+
+    if not db.mark_upload_started(jid, owner):
+        print(f"[runner] job#{jid} lease lost before upload; skipped")
+        return
+    if PREFETCH and not dry_run:
+        try:
+            media = PREFETCH.take(job)
+        except Exception as e:  # missing or unusable file: fail it before anything is sent
+            METRICS.inc("prefetch_total", result="invalid")
+            handle_failure(job, e)
+            return
+        METRICS.inc("prefetch_total", result="hit" if media.prefetched else "miss")
+
+    started = _time.perf_counter()
     try:
-        limit = int(max_per_day)
-    except Exception:
-        return None
-    if used >= limit:
-        return f"QUOTA REACHED {client}/{content_type} ({used}/{limit})"
-    return None
-
-def simulate_upload(kind: str, client: str, path: str, caption: str | None, dry_run: bool) -> bool:
-    if dry_run:
-        print(f"[DRY] Would upload {kind} for {client}: {path} (caption={caption!r})")
-        return True
-    print(f"[LIVE] Uploaded {kind} for {client}: {path}")
-    return True
-
-def _reschedule_one_hour(job_id: int) -> str:
-    from datetime import datetime, timedelta, timezone
-    new_eta = (datetime.now(timezone.utc) + timedelta(hours=1)).replace(microsecond=0).isoformat()
-    db.reschedule(job_id, new_eta, reason="quota")
-    return new_eta
+        ok = (DRY if dry_run else UPLOADER).upload(kind, client, path, caption)
+        error: BaseException | str = "upload returned False"
+    except Exception as e:
+        ok, error = False, e
+    ended = db._now_ms()
+    METRICS.observe("upload_seconds", _time.perf_counter() - started, content_type=kind)
+    METRICS.inc("uploads_total", client=client, content_type=kind, result="ok" if ok else "error")
+    if not ok:
+        handle_failure(job, error)
+    elif db.mark_done(jid, upload_ended_ms=ended, owner=owner) is False:
+        # the sweep held it as maybe posted meanwhile; it was posted, so say so where it's looked at
+        print(f"[runner] job#{jid} POSTED but its lease was lost; left as maybe posted (check the account)")
+    else:
+        print(f"[runner] job#{jid} done")
+
+def handle_failure(job, error: BaseException | str) -> None:
+    kind, retry_at = retry.decide(error, job.attempts, db._now_ms())
+    msg = retry.describe(error)
+    if db.fail_job(job.id, msg, retry_at, reason=f"retry:{kind}", owner=job.lease_owner) == 0:
+        print(f"[runner] job#{job.id} {kind} error after its lease was lost; left to its new runner: {msg}")
+        return
+    METRICS.inc("upload_errors_total", kind=kind, final=int(retry_at is None))
+    if retry_at is None:
+        print(f"[runner] job#{job.id} FAILED ({kind}, attempt {job.attempts + 1}): {msg}")
+        return
+    print(f"[runner] job#{job.id} {kind} error, retry {job.attempts + 1} at {db.ms_to_iso(retry_at)}: {msg}")
+    if kind == "auth":
+        # the login is broken for every job of this account: park them all until the retry
+        db.reschedule_many(retry_at, "retry:auth", client=job.client)
+
+def _submit(pool: UploadPool, conn, job, cfg: ClientConfig, dry_run: bool) -> None:
+    def report(fut) -> None:
+        exc = fut.exception()
+        if exc is None:
+            return
+        # a bug or a DB error mid-job: the heartbeat would keep renewing the lease forever,
+        # so give the job back now, retried with transient backoff (held if it was uploading)
+        _, retry_at = retry.decide(exc, job.attempts, db._now_ms(), kind="transient")
+        METRICS.inc("upload_errors_total", kind="crash", final=int(retry_at is None))
+        try:
+            outcome = db.release_lease(job.id, job.lease_owner, f"crashed: {retry.describe(exc)}", retry_at)
+        except Exception as e:
+            print(f"[runner] job#{job.id} crashed: {exc!r}; releasing its lease failed too: {e}")
+            return
+        then = {"retry": f"retry at {db.ms_to_iso(retry_at)}", "failed": "FAILED",
+                "held": "held as maybe posted", None: "lease already gone"}[outcome]
+        print(f"[runner] job#{job.id} crashed: {exc!r} ({then})")
+    pool.submit(job.client, process_job, conn, job, cfg, dry_run).add_done_callback(report)
+
+def run_due(conn, args, cfg: ClientConfig, pool: UploadPool, owner: str, limit: int) -> int:
+    """Claim and post due jobs until none are due or `limit` is reached; returns how many."""
+    processed = 0
+    while processed < limit:
+        free = pool.per_account - pool.in_flight(args.client)
+        if free <= 0:  # only lease what can start now; the rest stays claimable
+            pool.wait_any(1.0)
+            continue
+        jobs = db.claim_due_jobs(owner, min(args.batch, free, limit - processed), client=args.client)
+        if not jobs:
+            break
+        METRICS.inc("claimed_total", len(jobs))
+        for job in jobs:
+            processed += 1
+            _submit(pool, conn, job, cfg, args.dry_run)
+    return processed
+
+# ----- all clients in one process
+def discover_clients() -> list[str]:
+    return CONFIG.client_names()
+
+@functools.lru_cache(maxsize=None)
+def _ring(workers: int):
+    return hash_ring.HashRing(workers)
+
+def served_clients(args) -> list[str]:
+    """--clients as given, --shard's share of config/clients (re-read: new clients join), or all."""
+    if args.clients:
+        return args.clients
+    names = discover_clients()
+    if args.shard:
+        me, n = args.shard
+        ring = _ring(n)
+        return [c for c in names if ring.owner(c) == me]
+    return names
+
+def upcoming(args, limit: int) -> list[tuple[int, int]]:
+    if args.client or not (args.clients or args.shard):
+        return db.upcoming_etas(args.client, limit)
+    # a subset: per-client index reads, so other workers' backlog can't crowd ours out
+    return heapq.nsmallest(limit, (e for c in served_clients(args) for e in db.upcoming_etas(c, limit)))
+
+def run_fair(conn, args, cfgs: Dict[str, ClientConfig], sched: DeficitRoundRobin,
+             pool: UploadPool, owner: str, limit: int) -> int:
+    """
+    Post due jobs across every client, deficit round-robin weighted by client.json "weight".
+    Claims are per client, never larger than its allowance or its free upload slots, so a
+    client with a big backlog (or a slow reel in flight) never delays the others.
+    """
+    processed = 0
+    while processed < limit:
+        now = db._now_ms()
+        due = [c for c in cfgs if any(eta <= now for eta, _ in db.upcoming_etas(c, 1))]
+        if not due:
+            break
+        active = [c for c in due if pool.in_flight(c) < pool.per_account]
+        if not active:  # every client with due work is mid-upload
+            pool.wait_any(1.0)
+            continue
+        for client, allowance in sched.round(active):
+            want = min(allowance, args.batch, pool.per_account - pool.in_flight(client), limit - processed)
+            jobs = db.claim_due_jobs(owner, want, client=client) if want > 0 else []
+            METRICS.inc("claimed_total", len(jobs))
+            for job in jobs:
+                _submit(pool, conn, job, cfgs[client], args.dry_run)
+            processed += len(jobs)
+            sched.charge(client, len(jobs), emptied=len(jobs) < want)
+            if processed >= limit:
+                break
+    return processed
+
+# ----- liveness
+SWEEP_SEC = 60
+
+def sweep(quiet: bool = False) -> None:
+    requeued, held = db.release_expired_leases()
+    if requeued or held or not quiet:
+        print(f"[runner] lease sweep: {requeued} requeued, {held} held as maybe posted (see requeue_failed.py)")
+
+def heartbeat(owner: str, serving: str, stop: threading.Event) -> None:
+    """Keep our leases alive while this process is; sweep other runners' dead leases."""
+    last_sweep = 0.0
+    while True:
+        try:
+            db.heartbeat(owner, serving=serving)
+            if _time.monotonic() - last_sweep >= SWEEP_SEC:
+                last_sweep = _time.monotonic()
+                sweep(quiet=True)
+        except Exception as e:  # a locked DB now and then must not kill the thread
+            print(f"[runner] heartbeat failed: {e}")
+        if stop.wait(db.HEARTBEAT_SEC):
+            return
+
+# ----- daemon
+# Keeps a min-heap of the next queued ETAs and sleeps until the earliest one. While
+# asleep it wakes every --resync seconds only to read PRAGMA data_version (a counter in
+# the WAL shared memory, no table I/O); if another connection committed, the heap is
+# reloaded, so a file dropped by the watcher for "now" is picked up within --resync.
+def daemon(args, run: Callable[[], int], stop: threading.Event) -> None:
+    heap: list[tuple[int, int]] = []
+    version = None
+    while not stop.is_set():
+        v = db.data_version()
+        if v != version:
+            version = v
+            heap = upcoming(args, args.lookahead)
+            heapq.heapify(heap)
+        now = db._now_ms()
+        if heap and heap[0][0] <= now:
+            if run():
+                version = None  # our own writes moved things: reload
+                continue
+            # due but not ours to take (leased elsewhere, client without config): wait for a change
+            while heap and heap[0][0] <= now:
+                heapq.heappop(heap)
+        wait = args.resync if not heap else min(args.resync, (heap[0][0] - now) / 1000)
+        stop.wait(max(wait, 0.001))
+
+def prefetch_scope(args) -> list[str]:
+    return [args.client] if args.client else served_clients(args)
 
 def main() -> None:
+    global UPLOADER, PREFETCH
     ap = argparse.ArgumentParser()
-    ap.add_argument("--client", required=True)
+    ap.add_argument("--client", default=current_client(), help="default: config/current_client.txt")
+    ap.add_argument("--all-clients", action="store_true", help="serve every client in config/clients, weighted fair")
+    ap.add_argument("--clients", help="serve only these clients (comma-separated), weighted fair")
+    ap.add_argument("--shard", help="I/N: serve the clients the hash ring gives worker I of N (see runner_supervisor.py)")
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--once", action="store_true")
+    ap.add_argument("--batch", type=int, default=5, help="jobs leased per claim (keep small: the lease covers the whole batch)")
+    ap.add_argument("--max-jobs", type=int, default=50, help="stop after this many jobs (per wake-up with --daemon)")
+    ap.add_argument("--daemon", action="store_true", help="stay up and post each job at its ETA")
+    ap.add_argument("--resync", type=float, default=1.0, help="--daemon: seconds between DB change checks")
+    ap.add_argument("--lookahead", type=int, default=256, help="--daemon: upcoming ETAs kept in memory")
+    ap.add_argument("--workers", type=int, default=upload_pool.POOL_WORKERS, help="parallel uploads (different accounts)")
+    ap.add_argument("--per-account", type=int, default=upload_pool.PER_ACCOUNT, help="uploads in flight per account")
+    ap.add_argument("--uploader", choices=uploaders.BACKENDS, default=os.environ.get("AUTOPOSTER_UPLOADER", "dry"),
+                    help="upload backend (default $AUTOPOSTER_UPLOADER or dry)")
+    ap.add_argument("--ig-url", help="--uploader http: base URL (e.g. scripts/fake_ig_server.py)")
+    ap.add_argument("--prefetch-window", type=float, default=prefetch.WINDOW_SEC,
+                    help="--daemon: seconds ahead to validate and read media (0 = off; never with --dry-run)")
+    ap.add_argument("--prefetch-mb", type=float, default=prefetch.BUDGET_MB, help="media read ahead at most")
+    ap.add_argument("--prefetch-jobs", type=int, default=prefetch.MAX_JOBS, help="jobs looked ahead at most")
+    ap.add_argument("--metrics-port", type=int,
+                    default=metrics.port_for("runner", metrics.RUNNER_PORT),
+                    help="--daemon: serve /metrics on 127.0.0.1 (default $AUTOPOSTER_RUNNER_METRICS_PORT or 9109; 0 = off)")
     args = ap.parse_args()
+    args.clients = [c.strip() for c in args.clients.split(",") if c.strip()] if args.clients else None
+    try:
+        args.shard = hash_ring.parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        ap.error(str(e))
+    if args.all_clients or args.clients or args.shard:
+        args.client = None
+    elif not args.client:
+        ap.error("--client is required (or set one with switch_client.bat, or use --all-clients)")
 
     conn = db._conn()
-    cfg = load_client_config(args.client)
     ignore_quota = os.environ.get("IGNORE_QUOTA", "0")
+    owner = runner_id()
+    limit = 1 if args.once else args.max_jobs
+    pool = UploadPool(args.workers, args.per_account)
 
-    print(f"[runner] start (DRY_RUN={args.dry_run}) (IGNORE_QUOTA={ignore_quota})")
+    UPLOADER = DRY if args.dry_run else uploaders.make_uploader(args.uploader, args.ig_url)
 
-    jobs = db.get_due_jobs(limit=50, client=args.client)
-    if not jobs:
-        print("[runner] no due jobs")
-        return
+    print(f"[runner] start (DRY_RUN={args.dry_run}) (uploader={UPLOADER.name}) (IGNORE_QUOTA={ignore_quota}) (owner={owner})")
 
-    for row in jobs:
-        jid = row["id"]
-        client = row["client"]
-        kind = row["content_type"]
-        path = row["path"]
-        caption = row.get("caption")
-
-        throttle = should_throttle(conn, client, kind, cfg)
-        if throttle:
-            new_eta = _reschedule_one_hour(jid)
-            print(f"[runner] {throttle}. Rescheduled job#{jid} -> {new_eta}")
-            if args.once:
-                break
-            continue
+    if args.client is None:
+        sched = DeficitRoundRobin()
 
-        db.mark_in_progress(jid)
-        ok = simulate_upload(kind, client, path, caption, args.dry_run)
-        if ok:
-            db.mark_done(jid)
-            print(f"[runner] job#{jid} done")
-        else:
-            db.reschedule(jid, db._now_iso(), reason="upload failed")
-            print(f"[runner] job#{jid} failed -> rescheduled")
+        def run() -> int:
+            # re-read each pass: new client folders and weight edits apply without a restart
+            cfgs = {c: load_client_config(c) for c in served_clients(args)}
+            sched.set_weights({c: cfg.weight for c, cfg in cfgs.items()})
+            return run_fair(conn, args, cfgs, sched, pool, owner, limit)
+    else:
+        def run() -> int:
+            return run_due(conn, args, load_client_config(args.client), pool, owner, limit)
 
-        if args.once:
-            break
+    if args.shard:
+        serving = f"shard {args.shard[0]}/{args.shard[1]}"
+    else:
+        serving = args.client or (",".join(args.clients) if args.clients else "all clients")
+
+    db.init_db()
+    sweep()  # whatever a crashed run left in_progress
+    stop = threading.Event()
+    beat = threading.Thread(target=heartbeat, args=(owner, serving, stop),
+                            name="heartbeat", daemon=True)
+    beat.start()
+    try:
+        if args.daemon:
+            if not args.shard:  # sharded workers belong to runner_supervisor.py (supervisor.pid)
+                (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+                (PROJECT_ROOT / "logs" / "runner.pid").write_text(str(os.getpid()), encoding="utf-8")
+            print(f"[runner] daemon for {serving}: sleeping until the next ETA")
+            if args.prefetch_window > 0 and not args.dry_run:
+                PREFETCH = prefetch.Prefetcher(db, lambda: prefetch_scope(args), args.prefetch_window,
+                                               args.prefetch_jobs, args.prefetch_mb).start()
+                METRICS.gauge_fn("prefetch_ready_bytes", lambda: PREFETCH.stats()["bytes"] if PREFETCH else None)
+            if args.metrics_port:
+                METRICS.instrument(db, DB_CALLS)
+                METRICS.gauge_fn("uploads_in_flight", pool.outstanding)
+                if metrics.serve(METRICS, args.metrics_port, db):
+                    print(f"[runner] metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+            try:
+                daemon(args, run, stop)
+            except KeyboardInterrupt:
+                print("[runner] stopping (waiting for uploads in flight)")
+        elif not run():
+            print("[runner] no due jobs")
+        pool.close()  # leases stay fresh until the last upload returns
+    finally:
+        if PREFETCH:
+            PREFETCH.stop()
+            print(f"[runner] prefetch: {PREFETCH.hits} hits, {PREFETCH.misses} misses")
+        stop.set()
+        beat.join()
+        db.runner_exit(owner)
+        UPLOADER.close()
 
 if __name__ == "__main__":
     main()
@@ -28,12 +28,8 @@ def main() -> None:
         print("[demo-runner] no due jobs")
         return
 
-    row = jobs[0]
-    job_id = row["id"]
-    client = row["client"]
-    kind = row["content_type"]
-    path = row["path"]
-    caption = row.get("caption")
+    job = jobs[0]
+    job_id, client, kind, path, caption = job.id, job.client, job.content_type, job.path, job.caption
 
     db.mark_in_progress(job_id)
 
@@ -0,0 +1,28 @@
+# scripts/quota_rebuild.py
+# Recompute the per-day quota_usage counters from the done rows in jobs.
+# Run after hand-editing jobs or changing a client's timezone.
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
+
+spec = importlib.util.spec_from_file_location("db", DB_PATH)
+db = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare db module spec"
+spec.loader.exec_module(db)  # type: ignore[attr-defined]
+
+def main() -> None:
+    db.init_db()
+    n = db.rebuild_quota_usage()
+    print(f"[quota] rebuilt {n} counter(s) from job history")
+    rows = db._conn().execute(
+        "SELECT client, content_type, day, used FROM quota_usage ORDER BY day DESC, client, content_type LIMIT 20"
+    ).fetchall()
+    for r in rows:
+        print(f"  {r['day']}  {r['client']}/{r['content_type']}: {r['used']}")
+
+if __name__ == "__main__":
+    main()
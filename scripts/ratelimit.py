@@ -0,0 +1,247 @@
+# scripts/ratelimit.py
+# Per-account and global posting limits, persisted in the jobs DB (rate_buckets / rate_hits)
+# so a restart doesn't hand out a fresh allowance. For a (client, content type) a post needs:
+#   - calendar-day quota: client.json quotas.<type>_per_day (old files: max_per_day.<type>;
+#     config_service merges the schemas),
+#     counted in quota_usage for the day in the client's timezone
+#   - sliding 24h window for the whole account: rate.per_24h (default: daily_quota)
+#   - token bucket for the whole account: rate.per_hour refill, rate.burst capacity
+#   - the same window/bucket shared by every account on this machine (one egress IP):
+#     config/schedule.json "egress": {"per_24h": .., "per_hour": .., "burst": ..}
+# acquire() checks all of them and consumes in one write transaction; when blocked it
+# says exactly when the post becomes possible, and next_slot() adds the client's posting
+# window (hours.start/end), so the job is re-timed once, not polled.
+from __future__ import annotations
+
+import argparse
+import importlib.util
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
+
+# queue_runner passes its own db in (one module per process: shared connections and
+# group-commit writer); run on its own, load it by path
+if "db" not in globals():
+    spec = importlib.util.spec_from_file_location("db", DB_PATH)
+    db = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, "Failed to prepare db module spec"
+    spec.loader.exec_module(db)  # type: ignore[attr-defined]
+ClientConfig = db.config_service.ClientConfig
+
+HOUR_MS = 3_600_000
+WINDOW_MS = 24 * HOUR_MS
+CONTENT_TYPES = ("feed", "reels", "stories", "weekly")
+GLOBAL_KEY = "global"
+
+def _pos_int(v) -> Optional[int]:
+    try:
+        v = int(v)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+def _pos_float(v) -> Optional[float]:
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+class Limits:
+    __slots__ = ("per_day", "per_24h", "per_hour", "burst")
+
+    def __init__(self, per_day: int | None = None, per_24h: int | None = None,
+                 per_hour: float | None = None, burst: int | None = None):
+        self.per_day = per_day
+        self.per_24h = per_24h
+        self.per_hour = per_hour
+        self.burst = burst or 1
+
+    def __repr__(self) -> str:
+        return f"Limits(per_day={self.per_day}, per_24h={self.per_24h}, per_hour={self.per_hour}, burst={self.burst})"
+
+def account_limits(cfg: ClientConfig, content_type: str) -> Limits:
+    """Limits for a config_service.ClientConfig (schemas already merged there)."""
+    return Limits(cfg.quota(content_type), cfg.per_24h, cfg.per_hour, cfg.burst)
+
+def global_limits() -> Limits:
+    egress = db.config_service.schedule().egress
+    return Limits(None, _pos_int(egress.get("per_24h")), _pos_float(egress.get("per_hour")), _pos_int(egress.get("burst")))
+
+class Blocked:
+    """
+    Why a post can't go now and the earliest epoch ms it can. client/content_type give the
+    scope the limit applies to (None = every client / every type), i.e. which other
+    queued jobs are stuck behind the same limit.
+    """
+    __slots__ = ("until_ms", "kind", "detail", "client", "content_type")
+
+    def __init__(self, until_ms: int, kind: str, detail: str,
+                 client: str | None = None, content_type: str | None = None):
+        self.until_ms, self.kind, self.detail = until_ms, kind, detail
+        self.client, self.content_type = client, content_type
+
+    def __str__(self) -> str:
+        return f"{self.detail} until {db.ms_to_iso(self.until_ms)}"
+
+    def __repr__(self) -> str:
+        return f"Blocked({self.kind}, until={db.ms_to_iso(self.until_ms)})"
+
+def next_day_start_ms(client: str, now_ms: int) -> int:
+    """Epoch ms of the next local midnight for the client (when the day quota resets)."""
+    tz = db.client_tz(client)
+    local = db.ms_to_dt(now_ms).astimezone(tz)
+    return db.to_ms(datetime.combine(local.date() + timedelta(days=1), time(0), tzinfo=tz))
+
+def in_window_ms(client: str, cfg: ClientConfig, ms: int) -> int:
+    """ms itself if it falls in the client's posting window (hours.start/end), else the next window start."""
+    if not cfg.window:
+        return ms
+    start, end = cfg.window
+    tz = cfg.tz
+    local = db.ms_to_dt(ms).astimezone(tz)
+    t = local.time().replace(tzinfo=None)
+    inside = start <= t < end if start < end else (t >= start or t < end)  # end < start: overnight
+    if inside:
+        return ms
+    day = local.date() if t < start else local.date() + timedelta(days=1)
+    return db.to_ms(datetime.combine(day, start, tzinfo=tz))
+
+def window_close_ms(cfg: ClientConfig, ms: int) -> Optional[int]:
+    """When the posting window open at ms closes (None: the client has no window)."""
+    if not cfg.window:
+        return None
+    start, end = cfg.window
+    local = db.ms_to_dt(ms).astimezone(cfg.tz)
+    day = local.date()
+    if end <= start and local.time().replace(tzinfo=None) >= start:  # overnight, before midnight
+        day += timedelta(days=1)
+    return db.to_ms(datetime.combine(day, end, tzinfo=cfg.tz))
+
+class RateLimiter:
+    def __init__(self, global_cfg: Limits | None = None):
+        self._glob = global_cfg
+
+    @property
+    def glob(self) -> Limits:
+        # re-derived each time: schedule.json edits apply without a restart (served from memory)
+        return self._glob or global_limits()
+
+    # -- single limits; each returns None (free) or the Blocked answer
+    @staticmethod
+    def _bucket_state(c, key: str, lim: Limits, now: int) -> float:
+        row = c.execute("SELECT tokens, updated_ms FROM rate_buckets WHERE key=?", (key,)).fetchone()
+        if not row:
+            return float(lim.burst)  # a new bucket starts full
+        refill = (now - row["updated_ms"]) * lim.per_hour / HOUR_MS
+        return min(float(lim.burst), row["tokens"] + refill)
+
+    def _bucket(self, c, key: str, lim: Limits, now: int, kind: str) -> Optional[Blocked]:
+        if not lim.per_hour:
+            return None
+        tokens = self._bucket_state(c, key, lim, now)
+        if tokens >= 1:
+            return None
+        wait = (1 - tokens) * HOUR_MS / lim.per_hour
+        return Blocked(now + int(wait) + 1, kind, f"{key} rate {lim.per_hour:g}/h (burst {lim.burst})")
+
+    @staticmethod
+    def _window(c, key: str, limit: int | None, now: int, kind: str) -> Optional[Blocked]:
+        if not limit:
+            return None
+        hits = [r[0] for r in c.execute(
+            "SELECT ts_ms FROM rate_hits WHERE key=? AND ts_ms > ? ORDER BY ts_ms", (key, now - WINDOW_MS))]
+        if len(hits) < limit:
+            return None
+        # the oldest len-limit+1 hits have to age out of the window
+        return Blocked(hits[len(hits) - limit] + WINDOW_MS + 1, kind, f"{key} {len(hits)}/{limit} in 24h")
+
+    def _blocks(self, c, client: str, content_type: str, lim: Limits, now: int) -> list[Blocked]:
+        out = []
+        if lim.per_day:
+            day = db.client_day(client, db.ms_to_dt(now))
+            row = c.execute(db.QUOTA_SQL, (client, content_type, day)).fetchone()
+            used = int(row["used"]) if row else 0
+            if used >= lim.per_day:
+                out.append(Blocked(next_day_start_ms(client, now), "quota",
+                                   f"QUOTA REACHED {client}/{content_type} ({used}/{lim.per_day})",
+                                   client, content_type))
+        acct = f"acct:{client}"
+        for b in (self._window(c, acct, lim.per_24h, now, "window"),
+                  self._bucket(c, acct, lim, now, "rate")):
+            if b:
+                b.client = client
+                out.append(b)
+        for b in (self._window(c, GLOBAL_KEY, self.glob.per_24h, now, "egress"),
+                  self._bucket(c, GLOBAL_KEY, self.glob, now, "egress")):
+            if b:
+                out.append(b)
+        return out
+
+    # -- public
+    def next_available(self, client: str, content_type: str, cfg: ClientConfig, now: int | None = None) -> int:
+        """Earliest epoch ms a post could be acquired (now if nothing blocks); consumes nothing."""
+        now = now or db._now_ms()
+        db.flush()
+        blocks = self._blocks(db._conn(), client, content_type, account_limits(cfg, content_type), now)
+        return max([now] + [b.until_ms for b in blocks])
+
+    def next_slot(self, client: str, content_type: str, cfg: ClientConfig, start: int | None = None) -> int:
+        """
+        Earliest epoch ms from `start` when every limit allows a post and the client's
+        posting window is open. Limits are evaluated at that future time (refilled
+        buckets, hits aged out, the client's next day), so one reschedule is enough.
+        """
+        t = start or db._now_ms()
+        for _ in range(8):  # each step only moves forward; settles in 2-3 in practice
+            nxt = in_window_ms(client, cfg, self.next_available(client, content_type, cfg, t))
+            if nxt == t:
+                break
+            t = nxt
+        return t
+
+    def acquire(self, client: str, content_type: str, cfg: ClientConfig, now: int | None = None) -> Optional[Blocked]:
+        """Take one post from every limit, or return the Blocked with the latest until_ms."""
+        now = now or db._now_ms()
+        lim = account_limits(cfg, content_type)
+        db.flush()  # the group-commit writer must not be waiting behind our write lock
+        c = db._conn()
+        with c:
+            if not c.in_transaction:
+                c.execute("BEGIN IMMEDIATE")
+            blocks = self._blocks(c, client, content_type, lim, now)
+            if blocks:
+                return max(blocks, key=lambda b: b.until_ms)
+            for key, l in ((f"acct:{client}", lim), (GLOBAL_KEY, self.glob)):
+                if l.per_hour:
+                    c.execute(
+                        "INSERT INTO rate_buckets (key, tokens, updated_ms) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tokens=excluded.tokens, updated_ms=excluded.updated_ms",
+                        (key, self._bucket_state(c, key, l, now) - 1, now),
+                    )
+                if l.per_24h:
+                    c.execute("DELETE FROM rate_hits WHERE key=? AND ts_ms <= ?", (key, now - WINDOW_MS))
+                    c.execute("INSERT INTO rate_hits (key, ts_ms) VALUES (?, ?)", (key, now))
+        return None
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Show effective limits and when each content type can post next.")
+    ap.add_argument("--client", required=True)
+    args = ap.parse_args()
+
+    db.init_db()
+    cfg = db.config_service.client(args.client)
+    limiter = RateLimiter()
+    now = db._now_ms()
+    print(f"[rate] {args.client}  egress: {limiter.glob!r}")
+    for ctype in CONTENT_TYPES:
+        nxt = limiter.next_available(args.client, ctype, cfg, now)
+        slot = limiter.next_slot(args.client, ctype, cfg, now)
+        print(f"[rate] {ctype:<8} {account_limits(cfg, ctype)!r}  next token: {'now' if nxt <= now else db.ms_to_iso(nxt)}"
+              f"  next slot: {'now' if slot <= now else db.ms_to_iso(slot)}")
+
+if __name__ == "__main__":
+    main()
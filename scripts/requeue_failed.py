@@ -0,0 +1,64 @@
+# scripts/requeue_failed.py
+# Lists dead-lettered jobs (status 'failed') and puts them back in the queue in one UPDATE.
+# reason=maybe_posted: the runner died mid-upload; check the account first, the post may be live.
+# Those are skipped unless named with --id or --include-maybe-posted is given.
+#   python scripts\requeue_failed.py                 -> list only
+#   python scripts\requeue_failed.py --yes [--client Luchiano] [--keep-attempts]
+#   python scripts\requeue_failed.py --yes --id 412 --id 415   -> just these (maybe_posted too)
+from __future__ import annotations
+
+import argparse
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = PROJECT_ROOT / "scripts" / "db.py"
+
+spec = importlib.util.spec_from_file_location("db", DB_PATH)
+db = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare db module spec"
+spec.loader.exec_module(db)  # type: ignore[attr-defined]
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Requeue dead-lettered (failed) jobs.")
+    ap.add_argument("--client", help="only this client")
+    ap.add_argument("--eta", help="ISO time to post at (default: now)")
+    ap.add_argument("--id", type=int, action="append", default=[], help="only this job id (repeatable)")
+    ap.add_argument("--keep-attempts", action="store_true", help="don't reset the attempt counter")
+    ap.add_argument("--include-maybe-posted", action="store_true",
+                    help="also requeue jobs that may already be live (checked the accounts)")
+    ap.add_argument("--yes", action="store_true", help="actually requeue (default: list only)")
+    args = ap.parse_args()
+
+    db.init_db()
+    sql = "SELECT id, client, content_type, attempts, last_error, reschedule_reason, path FROM jobs WHERE status='failed'"
+    params: list = []
+    if args.client:
+        sql += " AND client=?"
+        params.append(args.client)
+    if args.id:
+        sql += f" AND id IN ({','.join('?' * len(args.id))})"
+        params.extend(args.id)
+    rows = db._conn().execute(sql + " ORDER BY id", params).fetchall()
+    # naming a job by id is the explicit "checked it, not live" for that job
+    revive = args.include_maybe_posted or bool(args.id)
+    held = 0
+    for r in rows:
+        skip = r["reschedule_reason"] == "maybe_posted" and not revive
+        held += skip
+        print(f"#{r['id']} {r['client']}/{r['content_type']} attempts={r['attempts']} file={Path(r['path']).name} "
+              f"reason={r['reschedule_reason']} error={r['last_error']}" + ("  [skipped: may be live]" if skip else ""))
+    if not rows:
+        print("[requeue] no failed jobs")
+        return
+    if held:
+        print(f"[requeue] {held} maybe_posted job(s) skipped; check the account, then --id N or --include-maybe-posted")
+    if not args.yes:
+        print(f"[requeue] {len(rows) - held} failed job(s) to requeue; re-run with --yes")
+        return
+    n = db.requeue_failed(args.client, args.eta, reset_attempts=not args.keep_attempts,
+                          job_ids=args.id, include_maybe_posted=revive)
+    print(f"[requeue] requeued {n} job(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/retry.py
+# What to do with a job whose upload failed.
+#   transient  network trouble, 5xx, "please wait a few minutes", throttling -> back off and retry
+#   auth       login/challenge/2FA/checkpoint -> retry rarely; the whole account is paused
+#   permanent  bad media, file gone, caption rejected -> dead-letter at once
+# Backoff is exponential with "equal jitter" (half fixed, half random) so accounts that
+# failed together don't all come back in the same second. Jobs past their class's
+# max_attempts go to status 'failed' with last_error; scripts/requeue_failed.py revives them.
+from __future__ import annotations
+
+import random
+import re
+from typing import Dict, Optional
+
+class Policy:
+    __slots__ = ("max_attempts", "base_sec", "cap_sec")
+
+    def __init__(self, max_attempts: int, base_sec: float, cap_sec: float):
+        self.max_attempts, self.base_sec, self.cap_sec = max_attempts, base_sec, cap_sec
+
+POLICIES: Dict[str, Policy] = {
+    "transient": Policy(max_attempts=6, base_sec=60, cap_sec=6 * 3600),
+    "auth":      Policy(max_attempts=3, base_sec=30 * 60, cap_sec=12 * 3600),
+    "permanent": Policy(max_attempts=1, base_sec=0, cap_sec=0),
+}
+
+# exception class names (instagrapi / requests / builtins) -> class; checked along the MRO
+_BY_NAME = {
+    "LoginRequired": "auth", "BadPassword": "auth", "ChallengeRequired": "auth",
+    "TwoFactorRequired": "auth", "ReloginAttemptExceeded": "auth", "BadCredentials": "auth",
+    "PleaseWaitFewMinutes": "transient", "RateLimitError": "transient", "ClientThrottledError": "transient",
+    "ClientConnectionError": "transient", "ConnectionError": "transient", "Timeout": "transient",
+    "TimeoutError": "transient", "ClientRequestTimeout": "transient",
+    "FileNotFoundError": "permanent", "IsADirectoryError": "permanent", "PermissionError": "permanent",
+    "ValueError": "permanent", "VideoNotUpload": "permanent", "PhotoNotUpload": "permanent",
+    "MediaRejected": "permanent",  # uploaders.HttpUploader: 4xx other than auth / 429
+}
+# message text, for errors without a known class or status. HTTP codes only count next to
+# "HTTP"/"status"/"error" or their reason phrase: a bare 500 is as likely a media id, a byte
+# count or part of a path, and a bare "password" or "connection" shows up in captions.
+_BY_TEXT = tuple((re.compile(rx), kind) for rx, kind in (
+    (r"challenge_required|login_required|checkpoint|two_factor", "auth"),
+    (r"password you entered is incorrect|\bbad password\b", "auth"),
+    (r"please wait|rate limit|too many requests|timed out|\btimeout\b", "transient"),
+    (r"\b(?:http|status(?: code)?|error)[\s:=/]*(?:429|5\d\d)\b", "transient"),
+    (r"\b(?:429 too many requests|500 internal server error|502 bad gateway|503 service unavailable"
+     r"|504 gateway time-?out)\b", "transient"),
+    (r"connection (?:reset|refused|aborted)|remote end closed connection|max retries exceeded", "transient"),
+    (r"unsupported|aspect ratio|not found", "permanent"),
+))
+
+def _by_status(status) -> Optional[str]:
+    # uploaders.UploadError.status, requests' HTTPError.response.status_code
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return None
+    if status == 429 or status >= 500:
+        return "transient"
+    if status == 401:
+        return "auth"
+    return None
+
+def classify(error: BaseException | str) -> str:
+    """transient / auth / permanent. Unknown errors count as transient (retry, bounded)."""
+    if isinstance(error, BaseException):
+        for cls in type(error).__mro__:
+            if cls.__name__ in _BY_NAME:
+                return _BY_NAME[cls.__name__]
+        response = getattr(error, "response", None)
+        kind = _by_status(getattr(error, "status", None) or getattr(response, "status_code", None))
+        if kind:
+            return kind
+    text = str(error).lower()
+    for needle, kind in _BY_TEXT:
+        if needle.search(text):
+            return kind
+    return "transient"
+
+def backoff_sec(kind: str, attempt: int, rnd: random.Random | None = None) -> float:
+    """Delay before retry number `attempt` (1 = first retry)."""
+    p = POLICIES[kind]
+    d = min(p.cap_sec, p.base_sec * 2 ** (attempt - 1))
+    return d / 2 + (rnd or random).uniform(0, d / 2)
+
+def decide(error: BaseException | str, attempts_so_far: int, now_ms: int,
+           rnd: random.Random | None = None, kind: str | None = None) -> tuple[str, Optional[int]]:
+    """(class, retry_at_ms); retry_at_ms is None when the job should be dead-lettered."""
+    kind = kind or classify(error)
+    attempt = attempts_so_far + 1
+    if attempt >= POLICIES[kind].max_attempts:
+        return kind, None
+    return kind, now_ms + int(backoff_sec(kind, attempt, rnd) * 1000)
+
+def describe(error: BaseException | str) -> str:
+    if isinstance(error, BaseException):
+        return f"{type(error).__name__}: {error}"[:500]
+    return str(error)[:500]
@@ -0,0 +1,168 @@
+# scripts/runner_supervisor.py
+# Runs N queue_runner.py --daemon workers, one process each, so media prep / JSON / TLS
+# for different clients use more than one core.
+#   python scripts/runner_supervisor.py --workers 4 [--dry-run] [-- extra queue_runner args]
+# Clients are split by consistent hashing (hash_ring.py): worker I runs with --shard I/N and
+# re-reads config/clients every pass, so a client added with add_client.py is picked up by
+# its worker without a restart, and no other client moves. Workers never coordinate with
+# each other; every job is claimed under a DB lease, so nothing is posted twice even while
+# a client changes hands. A worker that exits is restarted with exponential backoff (reset
+# once it has stayed up for STABLE_SEC). Ctrl+C stops every worker gracefully.
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+RUNNER = PROJECT_ROOT / "scripts" / "queue_runner.py"
+
+spec = importlib.util.spec_from_file_location("hash_ring", PROJECT_ROOT / "scripts" / "hash_ring.py")
+hash_ring = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare hash_ring module spec"
+spec.loader.exec_module(hash_ring)  # type: ignore[attr-defined]
+
+spec = importlib.util.spec_from_file_location("config_service", PROJECT_ROOT / "scripts" / "config_service.py")
+config_service = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare config_service module spec"
+spec.loader.exec_module(config_service)  # type: ignore[attr-defined]
+
+spec = importlib.util.spec_from_file_location("metrics", PROJECT_ROOT / "scripts" / "metrics.py")
+metrics = importlib.util.module_from_spec(spec)
+assert spec and spec.loader, "Failed to prepare metrics module spec"
+spec.loader.exec_module(metrics)  # type: ignore[attr-defined]
+
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 300.0
+STABLE_SEC = 60.0     # up this long -> the next crash starts the backoff over
+CHECK_SEC = 1.0
+CLIENTS_SEC = 10.0    # how often the client list is re-read for the assignment log
+STOP_GRACE = 180.0    # uploads in flight finish before a worker exits
+
+class Worker:
+    def __init__(self, index: int, cmd: list[str]):
+        self.index = index
+        self.cmd = cmd
+        self.proc: subprocess.Popen | None = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+    def start(self) -> None:
+        # POSIX: own session, so a terminal Ctrl+C reaches only the supervisor, which then
+        # forwards exactly one SIGINT. On Windows the console delivers Ctrl+C to everyone.
+        extra = {"start_new_session": True} if os.name != "nt" else {}
+        self.proc = subprocess.Popen(self.cmd, cwd=PROJECT_ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                     text=True, encoding="utf-8", errors="replace", bufsize=1, **extra)
+        self.started = time.monotonic()
+        threading.Thread(target=self._pump, args=(self.proc,), name=f"w{self.index}-out", daemon=True).start()
+        print(f"[supervisor] worker {self.index} started (pid {self.proc.pid})")
+
+    def _pump(self, proc: subprocess.Popen) -> None:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            if line.strip():  # upload threads' prints can interleave their newlines
+                print(f"[w{self.index}] {line.rstrip()}", flush=True)
+
+    def check(self, now: float) -> None:
+        """Restart a worker that exited, after its backoff."""
+        if self.proc is None:
+            if now >= self.restart_at:
+                self.start()
+            return
+        code = self.proc.poll()
+        if code is None:
+            return
+        up = now - self.started
+        self.failures = 0 if up >= STABLE_SEC else self.failures + 1
+        delay = min(BACKOFF_MAX, BACKOFF_MIN * 2 ** self.failures) if self.failures else BACKOFF_MIN
+        self.restart_at = now + delay
+        self.proc = None
+        print(f"[supervisor] worker {self.index} exited with {code} after {up:.0f}s; restart in {delay:.0f}s")
+
+    def stop(self) -> None:
+        if self.proc and self.proc.poll() is None and os.name != "nt":
+            self.proc.send_signal(signal.SIGINT)
+
+    def wait(self, deadline: float) -> None:
+        if not self.proc:
+            return
+        try:
+            self.proc.wait(timeout=max(deadline - time.monotonic(), 0.1))
+        except subprocess.TimeoutExpired:
+            print(f"[supervisor] worker {self.index} still busy after {STOP_GRACE:.0f}s; killing it (its leases will expire)")
+            self.proc.kill()
+            self.proc.wait()
+
+def report_assignment(ring: hash_ring.HashRing, clients: list[str], before: list[str] | None) -> None:
+    if before is None:
+        for w, names in ring.assign(clients).items():
+            print(f"[supervisor] worker {w}: {', '.join(names) or '(no clients)'}")
+        return
+    for c in sorted(set(clients) - set(before)):
+        print(f"[supervisor] new client {c} -> worker {ring.owner(c)}")
+    for c in sorted(set(before) - set(clients)):
+        print(f"[supervisor] client {c} removed (was worker {ring.owner(c)})")
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt  # taskkill / kill: same graceful stop as Ctrl+C
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run N queue_runner workers with clients sharded across them.",
+                                 epilog="Arguments after -- go to every queue_runner.py worker.")
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--metrics-base", type=int, default=metrics.port_for("runner", metrics.RUNNER_PORT),
+                    help="worker I serves metrics on this port + I (0 = off)")
+    args, extra = ap.parse_known_args()
+    extra = [a for a in extra if a != "--"]
+    if args.workers < 1:
+        ap.error("--workers must be at least 1")
+
+    workers = []
+    for i in range(args.workers):
+        cmd = [sys.executable, "-u", str(RUNNER), "--daemon", "--shard", f"{i}/{args.workers}",
+               "--metrics-port", str(args.metrics_base + i if args.metrics_base else 0)]
+        workers.append(Worker(i, cmd + (["--dry-run"] if args.dry_run else []) + extra))
+
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+    pid_file = PROJECT_ROOT / "logs" / "supervisor.pid"
+    pid_file.write_text(str(os.getpid()), encoding="utf-8")
+
+    signal.signal(signal.SIGTERM, _terminate)
+    ring = hash_ring.HashRing(args.workers)
+    clients = config_service.client_names()
+    print(f"[supervisor] {args.workers} worker(s) for {len(clients)} client(s) (DRY_RUN={args.dry_run})")
+    report_assignment(ring, clients, None)
+    last_clients = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            for w in workers:
+                w.check(now)
+            if now - last_clients >= CLIENTS_SEC:
+                last_clients = now
+                names = config_service.client_names()
+                if names != clients:
+                    report_assignment(ring, names, clients)  # the workers pick it up on their own
+                    clients = names
+            time.sleep(CHECK_SEC)
+    except KeyboardInterrupt:
+        print("[supervisor] stopping workers (waiting for uploads in flight)")
+    finally:
+        for w in workers:
+            w.stop()
+        deadline = time.monotonic() + STOP_GRACE
+        for w in workers:
+            w.wait(deadline)
+        pid_file.unlink(missing_ok=True)
+        print("[supervisor] stopped")
+
+if __name__ == "__main__":
+    main()
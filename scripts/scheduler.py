@@ -1,11 +1,10 @@
 # scripts/scheduler.py
 from __future__ import annotations
-import os, json, importlib.util
+import os, importlib.util
 from datetime import datetime
 from typing import Tuple
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CONFIG_FILE = os.path.join(ROOT, "config", "schedule.json")
 CONTENT_DIR = os.path.join(ROOT, "content")
 
 def _load_mod(name: str, path: str):
@@ -20,14 +19,7 @@ _tz = _load_mod("scheduler_tz", os.path.join(ROOT, "scripts", "scheduler_tz.py")
 next_local_slot = _tz.next_local_slot
 to_local = _tz.to_local
 
-DEFAULT_HOURS = [11, 15, 19]  # local hours (America/New_York)
-
-def _read_config() -> dict:
-    try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+_config = _db.config_service  # schedule.json / client.json, cached in memory
 
 def _infer_client_and_type(abs_path: str) -> Tuple[str, str]:
     """
@@ -45,15 +37,9 @@ def _infer_client_and_type(abs_path: str) -> Tuple[str, str]:
             ctype = c
     return client, ctype
 
-def _hours_for_type(cfg: dict, ctype: str) -> list[int]:
-    bt = (cfg.get("best_times") or {})
-    if ctype == "reels":
-        return bt.get("reels_hours_24") or bt.get("default_hours_24") or DEFAULT_HOURS
-    if ctype == "stories":
-        return bt.get("stories_hours_24") or bt.get("default_hours_24") or DEFAULT_HOURS
-    if ctype == "weekly":
-        return bt.get("weekly_hours_24") or bt.get("default_hours_24") or DEFAULT_HOURS
-    return bt.get("default_hours_24") or DEFAULT_HOURS
+def _hours_for_type(client: str, ctype: str) -> list[int]:
+    # client.json hours_24 wins; else schedule.json best_times.<type>_hours_24 / default_hours_24
+    return _config.client(client).hours_24 or _config.schedule().hours_for(ctype)
 
 def add_to_queue(path: str, caption: str) -> datetime:
     """
@@ -63,16 +49,15 @@ def add_to_queue(path: str, caption: str) -> datetime:
     abs_path = os.path.abspath(path)
     os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-    cfg = _read_config()
     client, ctype = _infer_client_and_type(abs_path)
-    hours = _hours_for_type(cfg, ctype)
+    hours = _hours_for_type(client, ctype)
 
     # compute UTC ETA and store
     eta_utc = next_local_slot(hours)  # returns aware UTC datetime
     eta_iso_utc = eta_utc.isoformat()
 
     _db.init_db()
-    _db.add_job(client, abs_path, caption, eta_iso_utc)
+    _db.add_job(client, abs_path, content_type=ctype, caption=caption, eta=eta_iso_utc)
 
     # return local time for logs
     return to_local(eta_utc)
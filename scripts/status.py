@@ -35,7 +35,11 @@ spec = importlib.util.spec_from_file_location("db", DB_FILE)
 db = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(db)  # type: ignore
 
-ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+spec = importlib.util.spec_from_file_location("metrics", os.path.join(SCRIPT_DIR, "metrics.py"))
+metrics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(metrics)  # type: ignore
+
+ROOT = os.path.dirname(SCRIPT_DIR)
 LOGS = os.path.join(ROOT, "logs")
 
 def read_pid(path):
@@ -55,15 +59,43 @@ def pid_running(pid_str: str) -> bool:
     except Exception:
         return False
 
+def describe(name: str, pid_file: str, port: int):
+    """Ask the process's metrics endpoint first; fall back to the PID file."""
+    live = metrics.fetch(port) if port else None
+    if live:
+        g = live["gauges"]
+        rss = g.get("process_resident_memory_bytes", {}).get("_")
+        up = g.get("process_uptime_seconds", {}).get("_", 0)
+        mem = f", {rss / 1e6:.0f} MB" if rss else ""
+        uprint(f"{name}: RUNNING (PID {live['pid']}, up {up / 60:.0f} min{mem}, metrics :{port})")
+        return live
+    pid = read_pid(os.path.join(LOGS, pid_file))
+    uprint(f"{name}: {'RUNNING' if pid_running(pid) else 'STOPPED'} (PID file: {pid or 'n/a'})")
+    return None
+
+def total(live: dict | None, counter: str, **match) -> float:
+    if not live:
+        return 0
+    want = {f"{k}={v}" for k, v in match.items()}
+    return sum(v for k, v in live["counters"].get(counter, {}).items() if want <= set(k.split(",")))
+
 def main():
     db.init_db()
     uprint("=== Autoposter Status ===")
 
     # processes
-    wpid = read_pid(os.path.join(LOGS, "watcher.pid"))
-    rpid = read_pid(os.path.join(LOGS, "runner.pid"))
-    uprint(f"Watcher: {'RUNNING' if pid_running(wpid) else 'STOPPED'} (PID file: {wpid or 'n/a'})")
-    uprint(f"Runner : {'RUNNING' if pid_running(rpid) else 'STOPPED'} (PID file: {rpid or 'n/a'})")
+    watcher = describe("Watcher", "watcher.pid", metrics.port_for("watcher", metrics.WATCHER_PORT))
+    runner = describe("Runner ", "runner.pid", metrics.port_for("runner", metrics.RUNNER_PORT))
+    if watcher:
+        backlog = watcher["gauges"].get("debounce_backlog", {}).get("_", 0)
+        uprint(f"  watcher since start: {total(watcher, 'enqueued_total'):g} queued, "
+               f"{total(watcher, 'duplicates_total'):g} duplicates, "
+               f"{total(watcher, 'enqueue_errors_total'):g} errors, {backlog:g} settling")
+    if runner:
+        per_min = runner["gauges"].get("uploads_total_per_min", {}).get("_", 0)
+        uprint(f"  runner since start: {total(runner, 'uploads_total', result='ok'):g} posted, "
+               f"{total(runner, 'uploads_total', result='error'):g} failed, "
+               f"{total(runner, 'throttled_total'):g} throttled ({per_min:g} uploads in the last minute)")
     uprint()
 
     # queue by client
@@ -79,7 +111,7 @@ def main():
             uprint(f"  {client}: {len(items)} item(s)")
             for it in items[:5]:
                 cap = (it["caption"] or "").replace("\n", " / ")
-                uprint(f"    - {it['eta']} | {os.path.basename(it['path'])}")
+                uprint(f"    - {it.eta} | {os.path.basename(it['path'])}")
                 uprint(f"      ↳ {cap[:100]}{'...' if len(cap)>100 else ''}")
     uprint()
 
@@ -0,0 +1,86 @@
+# scripts/upload_pool.py
+# Thread pool for uploads: accounts run in parallel, each account has at most
+# `per_account` requests in flight (1 by default, so Instagram never sees two
+# concurrent uploads from the same login). Work for a busy account waits in that
+# account's own queue instead of tying up a worker thread.
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Tuple
+
+POOL_WORKERS = 4
+PER_ACCOUNT = 1
+
+class UploadPool:
+    def __init__(self, workers: int = POOL_WORKERS, per_account: int = PER_ACCOUNT):
+        if workers < 1 or per_account < 1:
+            raise ValueError("workers and per_account must be >= 1")
+        self.workers = workers
+        self.per_account = per_account
+        self._ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+        self._cond = threading.Condition()
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[Tuple[Future, Callable, tuple]]] = {}
+        self._outstanding = 0
+
+    def submit(self, account: str, fn: Callable, *args) -> Future:
+        """Run fn(*args) once `account` has a free slot; returns a Future for the result."""
+        fut: Future = Future()
+        with self._cond:
+            self._outstanding += 1
+            if self._running.get(account, 0) < self.per_account:
+                self._running[account] = self._running.get(account, 0) + 1
+                self._start(account, fut, fn, args)
+            else:
+                self._waiting.setdefault(account, deque()).append((fut, fn, args))
+        return fut
+
+    def _start(self, account: str, fut: Future, fn: Callable, args: tuple) -> None:
+        self._ex.submit(self._run, account, fut, fn, args)
+
+    def _run(self, account: str, fut: Future, fn: Callable, args: tuple) -> None:
+        try:
+            if fut.set_running_or_notify_cancel():
+                fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._cond:
+                q = self._waiting.get(account)
+                if q:  # hand the slot straight to the account's next upload
+                    self._start(account, *q.popleft())
+                    if not q:
+                        del self._waiting[account]
+                else:
+                    self._running[account] -= 1
+                    if not self._running[account]:
+                        del self._running[account]
+                self._outstanding -= 1
+                self._cond.notify_all()
+
+    def in_flight(self, account: str) -> int:
+        """Running plus queued uploads for `account`."""
+        with self._cond:
+            return self._running.get(account, 0) + len(self._waiting.get(account, ()))
+
+    def outstanding(self) -> int:
+        with self._cond:
+            return self._outstanding
+
+    def wait_any(self, timeout: float | None = None) -> None:
+        """Block until some upload finishes (or timeout); returns at once if none are outstanding."""
+        with self._cond:
+            if self._outstanding:
+                self._cond.wait(timeout)
+
+    def drain(self) -> None:
+        """Block until every submitted upload has finished."""
+        with self._cond:
+            while self._outstanding:
+                self._cond.wait()
+
+    def close(self) -> None:
+        self.drain()
+        self._ex.shutdown(wait=True)
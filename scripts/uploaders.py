@@ -0,0 +1,200 @@
+# scripts/uploaders.py
+# Upload backends behind one interface, picked with queue_runner.py --uploader:
+#   dry         print what would be posted (the old simulate_upload)
+#   instagrapi  the real thing, through post_instagram.py's logged-in sessions
+#   http        Instagram's two-step upload (chunked rupload, then configure) against a
+#               base URL; point it at scripts/fake_ig_server.py for load tests on one box
+# upload() returns the new media id (or True) and raises on failure. Errors carry
+# instagrapi's exception names so retry.classify() treats every backend the same way.
+from __future__ import annotations
+
+import abc
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import importlib.util
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+BACKENDS = ("dry", "instagrapi", "http")
+VIDEO_EXT = {".mp4", ".mov"}
+CHUNK = 1 << 20       # rupload chunk size (bytes)
+HTTP_TIMEOUT = 120.0
+
+# ----- errors (names match instagrapi's, see retry._BY_NAME)
+class UploadError(Exception):
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(f"{status} {message}" if status else message)
+        self.status = status
+
+class PleaseWaitFewMinutes(UploadError): pass
+class ChallengeRequired(UploadError): pass
+class LoginRequired(UploadError): pass
+class MediaRejected(UploadError): pass
+
+def is_video(path: str) -> bool:
+    return Path(path).suffix.lower() in VIDEO_EXT
+
+# ----- backends
+class Uploader(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def upload(self, kind: str, client: str, path: str, caption: str | None) -> object:
+        """Post one file; returns the media id (or True), raises UploadError subclasses."""
+
+    def close(self) -> None:
+        pass
+
+class DryUploader(Uploader):
+    name = "dry"
+
+    def upload(self, kind, client, path, caption):
+        print(f"[DRY] Would upload {kind} for {client}: {path} (caption={caption!r})")
+        return True
+
+class InstagrapiUploader(Uploader):
+    """One logged-in instagrapi Client per account, reused across jobs (login is slow and watched)."""
+    name = "instagrapi"
+
+    def __init__(self):
+        spec = importlib.util.spec_from_file_location("post_instagram", PROJECT_ROOT / "scripts" / "post_instagram.py")
+        self._ig = importlib.util.module_from_spec(spec)
+        assert spec and spec.loader, "Failed to prepare post_instagram module spec"
+        spec.loader.exec_module(self._ig)  # type: ignore[attr-defined]  # ImportError without instagrapi
+        self._clients: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, client: str) -> tuple:
+        with self._lock:
+            if client not in self._clients:
+                self._clients[client] = (self._ig._build_client(client), threading.Lock())
+            return self._clients[client]
+
+    def upload(self, kind, client, path, caption):
+        cl, lock = self._client(client)
+        video = is_video(path)
+        with lock:  # instagrapi clients are not thread-safe
+            if kind == "stories":
+                media = cl.video_upload_to_story(path) if video else cl.photo_upload_to_story(path)
+            elif kind == "reels":
+                media = cl.clip_upload(path, caption or "")
+            else:
+                media = cl.video_upload(path, caption or "") if video else cl.photo_upload(path, caption or "")
+        return getattr(media, "pk", True)
+
+class HttpUploader(Uploader):
+    """
+    Resumable upload to base_url: GET the committed offset, POST the rest in CHUNK-sized
+    pieces, then POST the configure call for the content type. One keep-alive connection
+    per worker thread.
+    """
+    name = "http"
+    CONFIGURE = {"reels": "/api/v1/media/configure_to_clips/", "stories": "/api/v1/media/configure_to_story/"}
+
+    def __init__(self, base_url: str, chunk: int = CHUNK, timeout: float = HTTP_TIMEOUT):
+        u = urlsplit(base_url)
+        self.host, self.port = u.hostname or "127.0.0.1", u.port or (443 if u.scheme == "https" else 80)
+        self.https = u.scheme == "https"
+        self.chunk = chunk
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conns: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _request(self, method: str, url: str, body: bytes | None = None, headers: dict | None = None) -> dict:
+        for attempt in (1, 2):  # a keep-alive connection the server already closed: reconnect once
+            conn = self._conn()
+            try:
+                conn.request(method, url, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                raw = resp.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if attempt == 2:
+                    raise
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            data = {"message": raw[:200].decode("utf-8", "replace")}
+        if resp.status < 300:
+            return data
+        msg = str(data.get("message") or resp.reason)
+        if resp.status == 429:
+            raise PleaseWaitFewMinutes(msg, resp.status)
+        if "challenge" in msg or "checkpoint" in msg:
+            raise ChallengeRequired(msg, resp.status)
+        if resp.status in (401, 403) or "login_required" in msg:
+            raise LoginRequired(msg, resp.status)
+        if resp.status < 500:
+            raise MediaRejected(msg, resp.status)
+        raise UploadError(msg, resp.status)  # 5xx: transient
+
+    def upload(self, kind, client, path, caption):
+        size = os.path.getsize(path)
+        # same file for the same account -> same entity, so a retry resumes where it stopped
+        entity = hashlib.sha1(f"{client}|{path}|{size}".encode()).hexdigest()[:20]
+        url = f"/rupload_{'igvideo' if is_video(path) else 'igphoto'}/{entity}"
+        acct = {"X-IG-Account": client}
+        offset = int(self._request("GET", url, headers=acct).get("offset") or 0)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while offset < size:
+                piece = f.read(self.chunk)
+                done = self._request("POST", url, piece, {
+                    **acct, "Offset": str(offset), "X-Entity-Length": str(size),
+                    "X-Entity-Name": entity, "Content-Type": "application/octet-stream",
+                })
+                nxt = int(done.get("offset", offset + len(piece)))
+                if nxt != offset + len(piece):  # server kept a different amount: continue from there
+                    f.seek(nxt)
+                offset = nxt
+        body = json.dumps({"upload_id": entity, "caption": caption or "", "kind": kind}).encode()
+        media = self._request("POST", self.CONFIGURE.get(kind, "/api/v1/media/configure/"), body,
+                              {**acct, "Content-Type": "application/json"})
+        return (media.get("media") or {}).get("pk") or True
+
+    def close(self) -> None:
+        with self._lock:
+            for c in self._conns:
+                c.close()
+            self._conns.clear()
+
+def make_uploader(name: str, url: str | None = None) -> Uploader:
+    if name == "dry":
+        return DryUploader()
+    if name == "instagrapi":
+        return InstagrapiUploader()
+    if name == "http":
+        return HttpUploader(url or os.environ.get("AUTOPOSTER_IG_URL") or "http://127.0.0.1:8765")
+    raise ValueError(f"unknown uploader {name!r} (one of {', '.join(BACKENDS)})")
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Upload one file through a backend (no DB involved).")
+    ap.add_argument("path")
+    ap.add_argument("--client", default="Bench0")
+    ap.add_argument("--kind", default="feed")
+    ap.add_argument("--uploader", choices=BACKENDS, default="http")
+    ap.add_argument("--url", help="http backend base URL (default $AUTOPOSTER_IG_URL or http://127.0.0.1:8765)")
+    a = ap.parse_args()
+    up = make_uploader(a.uploader, a.url)
+    t = time.perf_counter()
+    print(f"[upload] {up.name}: media {up.upload(a.kind, a.client, a.path, 'test')} in {time.perf_counter() - t:.2f}s")
+    up.close()
@@ -0,0 +1,10 @@
+@echo off
+rem Sharded runners: one worker process per shard of clients (default 2). Usage: start_runners.bat [workers]
+setlocal
+cd /d "%~dp0"
+set "PY=%CD%\venv\Scripts\python.exe"
+set "SCRIPT=%CD%\scripts\runner_supervisor.py"
+set "N=%~1"
+if "%N%"=="" set "N=2"
+start "Autoposter Runners" cmd /c "chcp 65001>nul & set PYTHONIOENCODING=utf-8 & title Autoposter Runners & "%PY%" -u "%SCRIPT%" --workers %N%"
+endlocal
@@ -1,4 +1,9 @@
 @echo off
+rem the supervisor's workers go with it (/T)
+if exist "logs\supervisor.pid" (
+  for /f %%P in (logs\supervisor.pid) do taskkill /PID %%P /T /F >nul 2>&1
+  del /q "logs\supervisor.pid" 2>nul
+)
 for %%F in (logs\watcher.pid logs\runner.pid) do (
   if exist "%%F" (
     for /f %%P in (%%F) do taskkill /PID %%P /F >nul 2>&1
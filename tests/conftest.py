@@ -0,0 +1,48 @@
+# tests/conftest.py
+# Every test gets its own temp DB and config/ (never data/autoposter.db or the real
+# client.json files). Scripts are loaded by path, like they load each other.
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+
+def load_script(name: str):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS / f"{name}.py")
+    mod = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader, f"Failed to prepare {name} module spec"
+    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    return mod
+
+def write_config(root: Path, clients: dict[str, dict], schedule: dict | None = None) -> Path:
+    cfg = root / "config"
+    for name, body in clients.items():
+        (cfg / "clients" / name).mkdir(parents=True, exist_ok=True)
+        (cfg / "clients" / name / "client.json").write_text(json.dumps(body), encoding="utf-8")
+    (cfg / "schedule.json").write_text(json.dumps(schedule or {"timezone": "UTC"}), encoding="utf-8")
+    return cfg
+
+@pytest.fixture
+def make_runner(tmp_path, monkeypatch):
+    """make_runner(clients, schedule) -> queue_runner module on a fresh DB and config/.
+    Calling it again loads a second copy on the same DB, like a restarted runner."""
+    monkeypatch.setenv("AUTOPOSTER_DB", str(tmp_path / "test.db"))
+    monkeypatch.delenv("IGNORE_QUOTA", raising=False)
+    loaded = []
+
+    def make(clients: dict[str, dict] | None = None, schedule: dict | None = None):
+        runner = load_script("queue_runner")
+        db = runner.db
+        cfg = write_config(tmp_path, clients or {"A": {}}, schedule)
+        db.config_service.CONFIG = runner.CONFIG = db.config_service.ConfigService(cfg)
+        db.init_db()
+        loaded.append(runner)
+        return runner
+
+    yield make
+    for runner in loaded:
+        runner.db.close_all()
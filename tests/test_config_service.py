@@ -0,0 +1,34 @@
+# tests/test_config_service.py
+import json
+import threading
+
+from conftest import load_script, write_config
+
+config_service = load_script("config_service")
+
+def test_bad_edit_keeps_last_good_version(tmp_path):
+    cfg = write_config(tmp_path, {"A": {"rate": {"per_24h": 5}}})
+    svc = config_service.ConfigService(cfg, check_sec=0)
+    assert svc.client("A").get("rate") == {"per_24h": 5}
+    (cfg / "clients" / "A" / "client.json").write_text('{"rate": {"per_24h": ', encoding="utf-8")
+    assert svc.client("A").get("rate") == {"per_24h": 5}
+
+def test_readers_never_see_a_reload_in_progress(tmp_path):
+    cfg = write_config(tmp_path, {"A": {}}, {"timezone": "UTC", "pad": ""})
+    svc = config_service.ConfigService(cfg, check_sec=0)
+    path = cfg / "schedule.json"
+    stop, seen = threading.Event(), []
+
+    def read():
+        while not stop.is_set():
+            seen.append(svc._json(path).get("timezone"))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(200):  # a new size every time, so every check re-parses
+        path.write_text(json.dumps({"timezone": "UTC", "pad": "x" * i}), encoding="utf-8")
+    stop.set()
+    for t in readers:
+        t.join()
+    assert seen and set(seen) == {"UTC"}
@@ -0,0 +1,40 @@
+# tests/test_crash.py
+import pytest
+
+def _crash(*args):
+    raise RuntimeError("boom")
+
+@pytest.fixture
+def crashed(make_runner):
+    """A claimed job and a one-worker pool -> (runner, job, pool)."""
+    runner = make_runner()
+    db = runner.db
+    db.add_job("A", "/m/a.jpg", content_type="feed")
+    job = db.claim_due_jobs("t", 1)[0]
+    pool = runner.UploadPool(1, 1)
+    try:
+        yield runner, job, pool
+    finally:
+        pool.close()
+
+def test_crashed_job_is_retried_not_kept_leased(crashed, monkeypatch):
+    runner, job, pool = crashed
+    db = runner.db
+    monkeypatch.setattr(runner, "should_throttle", _crash)
+    runner._submit(pool, None, job, runner.load_client_config("A"), True)
+    pool.drain()
+
+    row = db.get_job(job.id)
+    assert row.status == "queued" and row.attempts == 1
+    assert db.heartbeat("t") == 0  # nothing left for the heartbeat to renew
+    assert [j.id for j in db.claim_due_jobs("u", 1, now=row.eta_ms + 1)] == [job.id]
+
+def test_crash_after_upload_started_is_held(crashed, monkeypatch):
+    runner, job, pool = crashed
+    db = runner.db
+    monkeypatch.setattr(db, "mark_done", _crash)
+    runner._submit(pool, None, job, runner.load_client_config("A"), True)
+    pool.drain()
+
+    assert db.get_job(job.id).status == "failed"  # maybe posted: never re-sent on its own
+    assert db.claim_due_jobs("u", 1, now=db._now_ms() + 86_400_000) == []
@@ -0,0 +1,89 @@
+# tests/test_db.py
+import sqlite3
+
+def test_naive_eta_is_utc_in_python_and_in_sql(make_runner):
+    db = make_runner().db
+    naive, aware = "2030-01-02T03:04:05", "2030-01-02T03:04:05+00:00"
+    jid = db.add_job("A", "/m/naive.jpg", content_type="feed", eta=naive)
+    assert db.get_job(jid).eta_ms == db.to_ms(aware)
+
+    db.flush()
+    c = db._conn()
+    with c:  # hand-written ISO goes through the _ISO_TO_MS trigger instead of to_ms()
+        c.execute("UPDATE jobs SET eta=? WHERE id=?", ("2031-01-02T03:04:05", jid))
+    assert db.get_job(jid).eta_ms == db.to_ms("2031-01-02T03:04:05+00:00")
+
+def test_claim_returns_the_leased_rows(make_runner):
+    db = make_runner().db
+    ids = [db.add_job("A", f"/m/{i}.jpg", content_type="feed", eta=db._now_ms() - 1000 + i) for i in range(3)]
+    now = db._now_ms()
+
+    jobs = db.claim_due_jobs("t", 2, lease_sec=60, now=now)
+    assert [j.id for j in jobs] == ids[:2]
+    for j in jobs:  # RETURNING gives the row as updated, no second read
+        assert (j.status, j.lease_owner, j.lease_expires_ms) == ("in_progress", "t", now + 60_000)
+        assert db.get_job(j.id).lease_expires_ms == now + 60_000
+    assert [j.id for j in db.claim_due_jobs("u", 5, now=now)] == ids[2:]
+    assert db.claim_due_jobs("v", 5, now=now) == []
+
+def test_add_jobs_dedupes_in_batch_queued_and_archived(make_runner):
+    db = make_runner().db
+    queued = db.add_job("A", "/m/queued.jpg", content_type="feed")
+    posted = db.add_job("A", "/m/posted.jpg", content_type="feed")
+    db.claim_due_jobs("t", 5)
+    db.add_job("A", "/m/queued.jpg", content_type="feed")  # no-op, still in_progress
+    assert db.mark_done(posted, owner="t")
+    assert db.archive_done_jobs(older_than_days=-1) == 1
+    assert db.get_job(posted) is None
+
+    paths = ["/m/new1.jpg", "/m/queued.jpg", "/m/new1.jpg", "/m/posted.jpg", "/m/new2.jpg", "/m/new2.jpg"]
+    inserted, skipped = db.add_jobs(({"client": "A", "path": p, "content_type": "feed"} for p in paths),
+                                    chunk_size=2)  # duplicates straddle chunk boundaries
+    assert sorted(p for _, p in inserted) == ["/m/new1.jpg", "/m/new2.jpg"]
+    assert skipped == {("A", "/m/queued.jpg"): queued, ("A", "/m/posted.jpg"): posted}
+    assert db.add_job("A", "/m/posted.jpg", content_type="feed") == posted
+
+def test_epoch_migration_and_iso_triggers(make_runner, tmp_path):
+    db = make_runner().db
+    old = tmp_path / "old.db"
+    with sqlite3.connect(old) as c:  # the pre-epoch schema, ISO text only
+        c.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, client TEXT NOT NULL, "
+                  "path TEXT NOT NULL, content_type TEXT NOT NULL, caption TEXT, eta TEXT NOT NULL, "
+                  "status TEXT NOT NULL DEFAULT 'queued', created_at TEXT NOT NULL, posted_at TEXT, extras TEXT)")
+        c.executemany("INSERT INTO jobs (client, path, content_type, eta, status, created_at, posted_at) "
+                      "VALUES ('A', ?, 'feed', ?, ?, '2030-01-01T00:00:00+00:00', ?)", [
+                          ("/m/a.jpg", "2030-01-02T00:00:00+00:00", "queued", None),
+                          ("/m/b.jpg", "2030-01-02T05:00:00+05:00", "done", "2030-01-03T00:00:00Z"),
+                          ("/m/c.jpg", "not a date", "queued", None),
+                      ])
+    c.close()
+    db.DB_PATH = old  # this thread's connection follows DB_PATH
+    db.init_db()
+
+    day = db.to_ms("2030-01-02T00:00:00+00:00")
+    got = {j.path: (j.eta_ms, j.created_ms, j.posted_ms) for j in map(db.get_job, (1, 2, 3))}
+    assert got == {"/m/a.jpg": (day, day - 86_400_000, None),
+                   "/m/b.jpg": (day, day - 86_400_000, day + 86_400_000),
+                   "/m/c.jpg": (day - 86_400_000, day - 86_400_000, None)}  # unparseable eta: created
+
+    c = db._conn()
+    with c:  # older scripts write ISO only; the triggers keep the *_ms twins in step
+        jid = c.execute("INSERT INTO jobs (client, path, content_type, eta, created_at) "
+                        "VALUES ('A', '/m/d.jpg', 'feed', '2030-01-05T00:00:00+00:00', '2030-01-01T00:00:00+00:00')"
+                        ).lastrowid
+        c.execute("UPDATE jobs SET eta='2030-01-06T00:00:00+00:00' WHERE id=?", (jid,))
+    assert db.get_job(jid).eta_ms == day + 4 * 86_400_000
+
+def test_async_writes_are_read_back_after_flush(make_runner, monkeypatch):
+    db = make_runner().db
+    jid = db.add_job("A", "/m/a.jpg", content_type="feed")
+    db.claim_due_jobs("t", 1)
+    monkeypatch.setattr(db, "GROUP_INTERVAL", 30)  # the writer would sit on the op for 30s
+    db.set_write_mode("async")
+
+    assert db.mark_done(jid, owner="t") is None
+    other = sqlite3.connect(db.DB_PATH)
+    assert other.execute("SELECT status FROM jobs WHERE id=?", (jid,)).fetchone()[0] == "in_progress"
+    assert db.get_job(jid).status == "done"  # reads flush() first
+    assert other.execute("SELECT status FROM jobs WHERE id=?", (jid,)).fetchone()[0] == "done"
+    other.close()
@@ -0,0 +1,16 @@
+# tests/test_job_record.py
+import sqlite3
+
+def test_job_is_a_row_with_typed_attributes(make_runner):
+    db = make_runner().db
+    jid = db.add_job("A", "/m/a.jpg", content_type="feed", caption="hi", extras={"k": 1})
+    job = db.get_job(jid)
+
+    assert isinstance(job, sqlite3.Row)
+    assert (job.id, job.client, job.path, job.content_type, job.caption, job.status) == \
+        (jid, "A", "/m/a.jpg", "feed", "hi", "queued")
+    assert job["path"] == job.path and job[0] == jid and "eta_ms" in job.keys()
+    assert job.eta == db.ms_to_iso(job.eta_ms)
+    assert job.extras.get("k") == 1
+    assert job.get("lease_owner") is None and job.get("nope", 5) == 5
+    assert [j.id for j in db.claim_due_jobs("t", 5)] == [jid]
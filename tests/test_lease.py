@@ -0,0 +1,41 @@
+# tests/test_lease.py
+# A runner whose lease was swept and re-claimed elsewhere must leave the job alone.
+import pytest
+
+@pytest.fixture
+def stolen(make_runner):
+    """(runner, stale job as runner "t" still holds it, job id) with "u" now uploading it."""
+    runner = make_runner({"A": {"rate": {"per_hour": 1, "burst": 1}}})
+    db = runner.db
+    jid = db.add_job("A", "/m/a.jpg", content_type="feed")
+    stale = db.claim_due_jobs("t", 1, lease_sec=0)[0]
+    db.release_expired_leases(db._now_ms() + 1)
+    assert db.claim_due_jobs("u", 1)[0].id == jid
+    assert db.mark_upload_started(jid, "u")
+    return runner, stale, jid
+
+def _untouched(db, jid):
+    db.flush()
+    row = db._conn().execute("SELECT status, lease_owner, upload_started_ms IS NOT NULL, attempts "
+                             "FROM jobs WHERE id=?", (jid,)).fetchone()
+    return tuple(row) == ("in_progress", "u", 1, 0)
+
+def test_stale_runner_neither_throttles_nor_moves_the_job(stolen):
+    runner, stale, jid = stolen
+    db = runner.db
+    cfg = runner.load_client_config("A")
+    db.add_job("A", "/m/b.jpg", content_type="feed")
+    assert runner.LIMITER.acquire("A", "feed", cfg) is None  # token spent: "t" would be throttled
+
+    runner.process_job(None, stale, cfg, True)
+    assert _untouched(db, jid)
+
+def test_guarded_writes_report_a_lost_lease(stolen):
+    runner, stale, jid = stolen
+    db = runner.db
+    assert db.reschedule_many(db._now_ms() + 60_000, "rate", job_ids=(jid,), client="A", owner="t") == 0
+    assert db.fail_job(jid, "boom", db._now_ms() + 60_000, owner="t") == 0
+    assert db.mark_done(jid, owner="t") is False
+    assert _untouched(db, jid)
+    assert db.mark_done(jid, owner="u") is True
+    assert db.get_job(jid).status == "done"
@@ -0,0 +1,31 @@
+# tests/test_prefetch.py
+from types import SimpleNamespace
+
+from conftest import load_script
+
+prefetch = load_script("prefetch")
+
+def test_unusable_file_is_not_failed_under_a_lost_lease(make_runner, tmp_path, monkeypatch):
+    runner = make_runner()
+    db = runner.db
+    jid = db.add_job("A", str(tmp_path / "missing.jpg"), content_type="feed")
+    stale = db.claim_due_jobs("t", 1, lease_sec=0)[0]
+    db.release_expired_leases(db._now_ms() + 1)
+    assert db.claim_due_jobs("u", 1)[0].id == jid  # the sweep gave it to another runner
+
+    monkeypatch.setattr(runner, "PREFETCH", prefetch.Prefetcher(db, lambda: ["A"]))
+    runner.process_job(None, stale, runner.load_client_config("A"), False)
+
+    row = db.get_job(jid)
+    assert (row.status, row.lease_owner, row.attempts) == ("in_progress", "u", 0)
+
+def test_take_counts_hits_and_misses(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"\xff\xd8\xff" + b"\0" * 64)
+    job = SimpleNamespace(id=1, path=str(path), content_type="feed")
+
+    p = prefetch.Prefetcher(None, list)
+    p._ready[1] = prefetch.inspect(str(path), "feed")
+    assert p.take(job).error is None
+    p.take(job)
+    assert (p.hits, p.misses) == (1, 1)
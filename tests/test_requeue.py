@@ -0,0 +1,23 @@
+# tests/test_requeue.py
+def _dead(db, path, *, uploading):
+    jid = db.add_job("A", path, content_type="feed")
+    db.claim_due_jobs("t", 1, lease_sec=0)
+    if uploading:  # runner died mid-upload: the sweep holds it as maybe posted
+        assert db.mark_upload_started(jid, "t")
+        assert db.release_expired_leases(db._now_ms() + 1) == (0, 1)
+    else:
+        db.fail_job(jid, "gave up", None)
+    return jid
+
+def test_maybe_posted_jobs_are_not_bulk_requeued(make_runner):
+    db = make_runner().db
+    live = _dead(db, "/m/live.jpg", uploading=True)
+    failed = _dead(db, "/m/failed.jpg", uploading=False)
+
+    assert db.requeue_failed() == 1
+    assert db.get_job(failed).status == "queued"
+    assert (db.get_job(live).status, db.get_job(live).reschedule_reason) == ("failed", "maybe_posted")
+
+    assert db.requeue_failed(job_ids=[live]) == 0
+    assert db.requeue_failed(job_ids=[live], include_maybe_posted=True) == 1
+    assert db.get_job(live).status == "queued"
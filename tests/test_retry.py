@@ -0,0 +1,41 @@
+# tests/test_retry.py
+import pytest
+
+from conftest import load_script
+
+retry = load_script("retry")
+
+class StatusError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+@pytest.mark.parametrize("text, kind", [
+    # numbers in paths, ids and sizes are not HTTP codes
+    ("unsupported file /content/A/feed/500.jpg", "permanent"),
+    ("aspect ratio 429x1500 not accepted", "permanent"),
+    ("media 5021503 not found", "permanent"),
+    # "password" / "connection" in captions or file names don't make it an auth or network error
+    ("unsupported caption: 'reset your password here'", "permanent"),
+    ("unsupported media: connection_tour.mp4", "permanent"),
+])
+def test_text_false_positives(text, kind):
+    assert retry.classify(text) == kind
+    assert retry.classify(RuntimeError(text)) == kind
+
+@pytest.mark.parametrize("text, kind", [
+    ("HTTP 503", "transient"),
+    ("status code: 502", "transient"),
+    ("500 Internal Server Error", "transient"),
+    ("429 Too Many Requests", "transient"),
+    ("Connection reset by peer", "transient"),
+    ("challenge_required", "auth"),
+    ("The password you entered is incorrect.", "auth"),
+])
+def test_text_matches(text, kind):
+    assert retry.classify(text) == kind
+
+def test_status_attribute_wins_over_text():
+    assert retry.classify(StatusError("unsupported thing", 503)) == "transient"
+    assert retry.classify(StatusError("nothing useful", 401)) == "auth"
+    assert retry.classify(StatusError("unsupported /500/x.jpg", 400)) == "permanent"
@@ -0,0 +1,70 @@
+# tests/test_throttle.py
+from datetime import datetime, timedelta, timezone
+
+def _hhmm(dt: datetime) -> str:
+    return dt.strftime("%H:%M")
+
+def test_egress_block_does_not_carry_one_clients_window(make_runner):
+    now = datetime.now(timezone.utc)
+    # A's posting window opens in 3h; egress allows one post per hour for everyone
+    closed = {"hours": {"timezone": "UTC", "start": _hhmm(now + timedelta(hours=3)),
+                        "end": _hhmm(now + timedelta(hours=4))}}
+    runner = make_runner({"A": closed, "B": {}}, {"timezone": "UTC", "egress": {"per_hour": 1, "burst": 1}})
+    db = runner.db
+    a = db.add_job("A", "/m/a.jpg", content_type="feed")
+    b = db.add_job("B", "/m/b.jpg", content_type="feed")
+    assert runner.LIMITER.acquire("B", "feed", runner.load_client_config("B")) is None  # egress used up
+
+    job = db.claim_due_jobs("t", 1, client="A")[0]
+    runner.process_job(None, job, runner.load_client_config("A"), True)
+
+    egress_free = db._now_ms() + 3_600_000
+    b_eta = db.get_job(b).eta_ms
+    assert abs(b_eta - egress_free) < 60_000  # the shared budget's release, not A's window
+    assert db.get_job(a).eta_ms >= db.to_ms(now + timedelta(hours=3)) - 60_000
+    assert db.get_job(a).status == db.get_job(b).status == "queued"
+
+def test_rate_block_spreads_the_backlog_over_token_releases(make_runner):
+    runner = make_runner({"A": {"rate": {"per_hour": 2, "burst": 1}}})
+    db = runner.db
+    cfg = runner.load_client_config("A")
+    ids = [db.add_job("A", f"/m/{i}.jpg", content_type="feed", eta=db._now_ms() - 1000 + i) for i in range(4)]
+    assert runner.LIMITER.acquire("A", "feed", cfg) is None  # the only token
+
+    job = db.claim_due_jobs("t", 1, client="A")[0]
+    runner.process_job(None, job, cfg, True)
+
+    etas = [db.get_job(i).eta_ms for i in ids]
+    assert all(db.get_job(i).status == "queued" for i in ids)
+    assert abs(etas[0] - (db._now_ms() + 1_800_000)) < 60_000  # next token in 30 min
+    assert [b - a for a, b in zip(etas, etas[1:])] == [1_800_000] * 3
+    assert db.get_job(ids[1]).eta == db.ms_to_iso(etas[1])
+
+def test_rate_stagger_stops_at_the_window_close(make_runner):
+    now = datetime.now(timezone.utc)
+    # window open now and closing in 45 min: only the first two half-hourly slots fit
+    hours = {"timezone": "UTC", "start": _hhmm(now - timedelta(hours=1)), "end": _hhmm(now + timedelta(minutes=45))}
+    runner = make_runner({"A": {"rate": {"per_hour": 2, "burst": 1}, "hours": hours}})
+    db = runner.db
+    cfg = runner.load_client_config("A")
+    ids = [db.add_job("A", f"/m/{i}.jpg", content_type="feed", eta=db._now_ms() - 1000 + i) for i in range(4)]
+    assert runner.LIMITER.acquire("A", "feed", cfg) is None
+
+    runner.process_job(None, db.claim_due_jobs("t", 1, client="A")[0], cfg, True)
+
+    reopens = (now - timedelta(hours=1)).replace(second=0, microsecond=0) + timedelta(days=1)
+    etas = [db.get_job(i).eta_ms for i in ids]
+    assert etas[0] < runner.ratelimit.window_close_ms(cfg, db._now_ms())
+    assert etas[1] == etas[2] == etas[3] == db.to_ms(reopens)  # spread again from there
+
+def test_rate_buckets_survive_a_restart(make_runner):
+    limits = {"A": {"rate": {"per_hour": 1, "burst": 1}}}
+    runner = make_runner(limits)
+    assert runner.LIMITER.acquire("A", "feed", runner.load_client_config("A")) is None
+    runner.db.close_all()
+
+    restarted = make_runner(limits)  # fresh modules and connections, same DB
+    assert restarted.db is not runner.db and restarted.ratelimit.db is restarted.db
+    blocked = restarted.LIMITER.acquire("A", "feed", restarted.load_client_config("A"))
+    assert blocked and blocked.kind == "rate"
+    assert abs(blocked.until_ms - (restarted.db._now_ms() + 3_600_000)) < 60_000